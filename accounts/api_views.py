@@ -2,10 +2,18 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
 
+from .passwords import BUSY_MESSAGE, HashingBusy, authenticate_user, check_user_password, set_password
 from .serializers import UserSerializer, RegisterSerializer, ChangePasswordSerializer, LoginSerializer
+from .thumbnails import schedule_thumbnails
+from .tokens import RefreshToken, token_pair
+
+
+def busy_response():
+    return Response({
+        'success': False,
+        'message': BUSY_MESSAGE
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
 
 
 class LoginAPIView(APIView):
@@ -14,20 +22,20 @@ class LoginAPIView(APIView):
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
-            user = authenticate(
-                username=serializer.validated_data['username'],
-                password=serializer.validated_data['password']
-            )
+            try:
+                user = authenticate_user(
+                    request,
+                    serializer.validated_data['username'],
+                    serializer.validated_data['password']
+                )
+            except HashingBusy:
+                return busy_response()
             if user:
-                refresh = RefreshToken.for_user(user)
                 return Response({
                     'success': True,
                     'message': 'Login successful',
                     'user': UserSerializer(user).data,
-                    'tokens': {
-                        'refresh': str(refresh),
-                        'access': str(refresh.access_token),
-                    }
+                    'tokens': token_pair(user)
                 })
             return Response({
                 'success': False,
@@ -45,16 +53,15 @@ class RegisterAPIView(APIView):
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            try:
+                user = serializer.save()
+            except HashingBusy:
+                return busy_response()
             return Response({
                 'success': True,
                 'message': 'Registration successful',
                 'user': UserSerializer(user).data,
-                'tokens': {
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token),
-                }
+                'tokens': token_pair(user)
             }, status=status.HTTP_201_CREATED)
         return Response({
             'success': False,
@@ -75,7 +82,10 @@ class ProfileAPIView(APIView):
     def put(self, request):
         serializer = UserSerializer(request.user, data=request.data, partial=True)
         if serializer.is_valid():
+            previous_image = request.user.profile_image.name
             serializer.save()
+            if request.user.profile_image.name != previous_image:
+                schedule_thumbnails(request.user)
             return Response({
                 'success': True,
                 'message': 'Profile updated successfully',
@@ -94,13 +104,15 @@ class ChangePasswordAPIView(APIView):
         serializer = ChangePasswordSerializer(data=request.data)
         if serializer.is_valid():
             user = request.user
-            if not user.check_password(serializer.validated_data['old_password']):
-                return Response({
-                    'success': False,
-                    'message': 'Current password is incorrect'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            user.set_password(serializer.validated_data['new_password'])
+            try:
+                if not check_user_password(user, serializer.validated_data['old_password']):
+                    return Response({
+                        'success': False,
+                        'message': 'Current password is incorrect'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                set_password(user, serializer.validated_data['new_password'])
+            except HashingBusy:
+                return busy_response()
             user.save()
             return Response({
                 'success': True,
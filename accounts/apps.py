@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+    
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,59 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+
+from core.async_api import async_api_view
+
+from .passwords import BUSY_MESSAGE, HashingBusy, aauthenticate_user, ahash_password, build_user
+from .serializers import LoginSerializer, RegisterSerializer, UserSerializer
+from .tokens import token_pair
+
+
+def busy_response():
+    return JsonResponse({'success': False, 'message': BUSY_MESSAGE}, status=503, headers={'Retry-After': '1'})
+
+
+@async_api_view(allow_anonymous=True)
+async def login(request):
+    """Async ``POST /api/auth/login/``: the password check waits on the hashing executor, not a worker thread."""
+    serializer = LoginSerializer(data=request.data)
+    if not serializer.is_valid():
+        return JsonResponse({'success': False, 'errors': serializer.errors}, status=400)
+    
+    try:
+        user = await aauthenticate_user(request, serializer.validated_data['username'], serializer.validated_data['password'])
+    except HashingBusy:
+        return busy_response()
+    if user is None:
+        return JsonResponse({'success': False, 'message': 'Invalid credentials'}, status=401)
+    
+    return {
+        'success': True,
+        'message': 'Login successful',
+        'user': UserSerializer(user).data,
+        'tokens': await sync_to_async(token_pair)(user),
+    }
+
+
+@async_api_view(allow_anonymous=True)
+async def register(request):
+    """Async ``POST /api/auth/register/``, same validation and response as RegisterAPIView."""
+    serializer = RegisterSerializer(data=request.data)
+    # Password validators and the unique checks use the sync ORM
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse({'success': False, 'errors': serializer.errors}, status=400)
+    
+    fields = dict(serializer.validated_data)
+    fields.pop('password2')
+    try:
+        password_hash = await ahash_password(fields.pop('password'))
+    except HashingBusy:
+        return busy_response()
+    user = build_user(password_hash=password_hash, **fields)
+    await user.asave()
+    
+    return JsonResponse({
+        'success': True,
+        'message': 'Registration successful',
+        'user': UserSerializer(user).data,
+        'tokens': await sync_to_async(token_pair)(user),
+    }, status=201)
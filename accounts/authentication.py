@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.cache import get_version, invalidate_version, is_shared_cache
+from core.routers import primary_reads
+
+
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+USER_LOCAL_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_LOCAL_CACHE_TIMEOUT', 5)
+
+
+def user_version_key(user_id):
+    return f'auth_user:version:{user_id}'
+
+
+def user_cache_key(user_id, version):
+    return f'auth_user:{user_id}:{version}'
+
+
+def user_cache_timeout():
+    # A per-process cache never hears of changes saved by other processes
+    return USER_CACHE_TIMEOUT if is_shared_cache() else min(USER_CACHE_TIMEOUT, USER_LOCAL_CACHE_TIMEOUT)
+
+
+def invalidate_cached_user(user_id):
+    """Drop the cached copy of a user; called whenever the user row is saved or deleted."""
+    invalidate_version(user_version_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps the resolved user in the cache for a short time.
+    
+    Entries are keyed by user id and a per-user version that is bumped when the
+    user is saved or deleted, so profile and password changes and deactivation
+    take effect on the next request. Writes that skip ``save()`` (``update()``
+    on a queryset) are only picked up once ``AUTH_USER_CACHE_TIMEOUT`` expires.
+    
+    The version bump only reaches other processes through a shared cache.
+    With a per-process cache, entries are kept for
+    ``AUTH_USER_LOCAL_CACHE_TIMEOUT`` seconds instead, which is how long
+    another worker may still accept a user deactivated, or a token revoked
+    by a password change, in this one.
+    """
+    
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Token contained no recognizable user identification') from e
+        
+        key = user_cache_key(user_id, get_version(user_version_key(user_id)))
+        user = cache.get(key)
+        if user is None:
+            user = self.load_user(user_id)
+            cache.set(key, user, user_cache_timeout())
+        self.check_user(user, validated_token)
+        return user
+    
+    @primary_reads()
+    def load_user(self, user_id):
+        try:
+            return self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise exceptions.AuthenticationFailed('User not found', code='user_not_found') from e
+    
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise exceptions.AuthenticationFailed(
+                    "The user's password has been changed.", code='password_changed'
+                )
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from core.cache import is_shared_cache
+
+
+@register(Tags.caches, Tags.security)
+def check_blacklist_filter_cache(app_configs, **kwargs):
+    # Other processes would never hear of tokens blacklisted here and keep accepting them
+    if getattr(settings, 'TOKEN_BLACKLIST_FILTER', False) and not is_shared_cache():
+        return [Error(
+            'TOKEN_BLACKLIST_FILTER needs a cache shared by all processes.',
+            hint='Point CACHES["default"] at Redis or Memcached (EMS_REDIS_URL), or turn the filter off.',
+            id='accounts.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, Tags.security, deploy=True)
+def check_user_cache(app_configs, **kwargs):
+    if not is_shared_cache():
+        return [Warning(
+            'Users resolved from JWTs are cached per process.',
+            hint=(
+                'Deactivation and password changes reach the other worker processes only after '
+                'AUTH_USER_LOCAL_CACHE_TIMEOUT seconds. Point CACHES["default"] at Redis or '
+                'Memcached (EMS_REDIS_URL) to apply them on the next request.'
+            ),
+            id='accounts.W001',
+        )]
+    return []
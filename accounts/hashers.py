@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from ``PASSWORD_HASH_ITERATIONS``.
+    
+    Hashes stored with another iteration count still verify, and are
+    re-hashed with the current count on the user's next successful login,
+    so the cost can be tuned without resetting passwords.
+    """
+    
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or super().iterations
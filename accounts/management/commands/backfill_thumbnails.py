@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import CustomUser
+from accounts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate profile image thumbnails for users that have none for their current image'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate for every user with a profile image')
+    
+    def handle(self, *args, **options):
+        users = CustomUser.objects.exclude(profile_image='').exclude(profile_image__isnull=True)
+        generated = failed = 0
+        for user_id, image, thumbnails in users.values_list('id', 'profile_image', 'profile_thumbnails').iterator():
+            if not options['all'] and (thumbnails or {}).get('source') == image:
+                continue
+            if generate_thumbnails(user_id):
+                generated += 1
+            else:
+                failed += 1
+                self.stderr.write(f'Could not make thumbnails for user {user_id} ({image})')
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {generated} users, {failed} failed'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.tokens import prune_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted JWT refresh tokens, in small chunks'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Tokens deleted per transaction')
+    
+    def handle(self, *args, **options):
+        deleted = prune_tokens(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired tokens'))
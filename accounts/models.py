@@ -6,6 +6,8 @@ class CustomUser(AbstractUser):
     phone = models.CharField(max_length=15, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     profile_image = models.ImageField(upload_to='profile_images/', blank=True, null=True)
+    # Written by accounts.thumbnails: {'source': image name, 'sizes': {size: {format: file name}}}
+    profile_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     
     class Meta:
         db_table = 'accounts_customuser'
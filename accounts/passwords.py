@@ -0,0 +1,139 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password, verify_password
+from django.db import close_old_connections
+
+
+BUSY_MESSAGE = 'Too many sign-in requests right now, please try again shortly'
+
+
+class HashingBusy(Exception):
+    """The password hashing executor has no free slot."""
+
+
+class HashingExecutor:
+    """
+    Thread pool dedicated to password hashing, with a bounded queue.
+    
+    PBKDF2 releases the GIL, so hashing on a few dedicated threads keeps a
+    burst of logins from occupying every request worker. When ``workers``
+    jobs are running and ``queue_size`` more are waiting, ``submit`` raises
+    HashingBusy at once and the caller answers 503 instead of queueing.
+    """
+    
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+    
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+    
+    def call(self, fn, *args):
+        return self.submit(fn, *args).result()
+    
+    async def acall(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+hashing_executor = HashingExecutor(
+    getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 2,
+    getattr(settings, 'PASSWORD_HASHING_QUEUE', 32),
+)
+
+
+def check(raw_password, encoded):
+    """
+    Runs on the executor: ``(matches, new_hash)``.
+    
+    ``new_hash`` is set when the password matched but was stored with an
+    outdated hasher or work factor. With no stored hash, a hash is still
+    computed so unknown usernames take as long as wrong passwords.
+    """
+    if encoded is None:
+        make_password(raw_password)
+        return False, None
+    matches, must_update = verify_password(raw_password, encoded)
+    return matches, make_password(raw_password) if matches and must_update else None
+
+
+def hash_password(raw_password):
+    return hashing_executor.call(make_password, raw_password)
+
+
+async def ahash_password(raw_password):
+    return await hashing_executor.acall(make_password, raw_password)
+
+
+def set_password(user, raw_password):
+    """
+    ``user.set_password`` with the hashing on the executor. Raises HashingBusy.
+    
+    Keeps the raw password on the user like ``set_password`` does, so that
+    saving the user calls ``password_changed`` on the configured validators.
+    """
+    user.password = hash_password(raw_password)
+    user._password = raw_password
+
+
+def check_user_password(user, raw_password):
+    """``user.check_password`` on the hashing executor. Raises HashingBusy."""
+    matches, new_hash = hashing_executor.call(check, raw_password, user.password)
+    if new_hash:
+        user.password = new_hash
+        user.save(update_fields=['password'])
+    return matches
+
+
+def authenticate_user(request, username, password):
+    """
+    ``authenticate()`` run on the hashing executor. Raises HashingBusy.
+    
+    Every configured backend is tried, inactive users are refused and
+    ``user_login_failed`` is sent, as with a plain ``authenticate()``; the
+    model backend upgrades outdated hashes. The calling thread still waits
+    for the result, but a burst of logins queues on the executor's few
+    threads, and is turned away once its queue is full, instead of hashing
+    on every request worker.
+    """
+    return hashing_executor.call(run_authenticate, request, username, password)
+
+
+async def aauthenticate_user(request, username, password):
+    """Async ``authenticate_user``: the event loop is free while the executor authenticates."""
+    return await hashing_executor.acall(run_authenticate, request, username, password)
+
+
+def run_authenticate(request, username, password):
+    """Runs on the executor; its threads query with their own connections, managed like a request's."""
+    close_old_connections()
+    try:
+        return authenticate(request, username=username, password=password)
+    finally:
+        close_old_connections()
+
+
+def build_user(username, email, password_hash, **fields):
+    """An unsaved user with an already hashed password, normalized like ``create_user``."""
+    User = get_user_model()
+    user = User(
+        username=User.normalize_username(username),
+        email=User._default_manager.normalize_email(email),
+        **fields
+    )
+    user.password = password_hash
+    return user
@@ -1,16 +1,28 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+
+from .passwords import build_user, hash_password
+from .thumbnails import thumbnail_urls
+from .tokens import RefreshToken
 
 User = get_user_model()
 
 
 class UserSerializer(serializers.ModelSerializer):
+    # Fixed-size derivatives of profile_image, for lists of avatars
+    thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone', 'address', 'profile_image']
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name', 'phone', 'address', 'profile_image', 'thumbnails'
+        ]
         read_only_fields = ['id']
+    
+    def get_thumbnails(self, user):
+        return thumbnail_urls(user, self.context.get('request'))
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -28,7 +40,10 @@ class RegisterSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password2')
-        user = User.objects.create_user(**validated_data)
+        password = validated_data.pop('password')
+        # Hashed on the bounded executor; raises HashingBusy when it is saturated
+        user = build_user(password_hash=hash_password(password), **validated_data)
+        user.save()
         return user
 
 
@@ -46,3 +61,7 @@ class ChangePasswordSerializer(serializers.Serializer):
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True, write_only=True)
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
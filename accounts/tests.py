@@ -1,3 +1,326 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.conf import settings
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from PIL import Image
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import async_api_views
+from .authentication import CachedJWTAuthentication
+from .checks import check_blacklist_filter_cache, check_user_cache
+from .models import CustomUser
+from .passwords import HashingExecutor
+from .thumbnails import thumbnail_executor
+from .tokens import BlacklistFilter, RefreshToken, blacklist_filter, prune_tokens
+from .views import serve_thumbnail
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', password='pass12345!')
+    
+    def setUp(self):
+        # Versions bumped by rolled back tests never reach their on_commit bump
+        cache.clear()
+        self.token = AccessToken.for_user(self.user)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {self.token}'
+    
+    def resolve(self):
+        return CachedJWTAuthentication().get_user(AccessToken(str(self.token)))
+    
+    def test_user_is_loaded_once(self):
+        self.client.get(reverse('api_profile'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.resolve().pk, self.user.pk)
+    
+    def test_profile_update_invalidates(self):
+        self.client.get(reverse('api_profile'))
+        self.client.put(reverse('api_profile'), {'first_name': 'Ada'}, content_type='application/json')
+        response = self.client.get(reverse('api_profile'))
+        self.assertEqual(response.json()['user']['first_name'], 'Ada')
+    
+    def test_password_changes_invalidate(self):
+        self.resolve()
+        response = self.client.post(reverse('api_change_password'), {
+            'old_password': 'pass12345!', 'new_password': 'Api-pass-678!', 'new_password2': 'Api-pass-678!'
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.resolve().check_password('Api-pass-678!'))
+        
+        self.user.refresh_from_db()
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('change_password'), {
+            'old_password': 'Api-pass-678!', 'new_password': 'Web-pass-678!', 'new_password2': 'Web-pass-678!'
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(self.resolve().check_password('Web-pass-678!'))
+    
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('api_profile')).status_code, 200)
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get(reverse('api_profile')).status_code, 401)
+    
+    def test_per_process_cache_keeps_users_briefly(self):
+        self.resolve()
+        # Deactivated by another process: its version bump never reaches this process's cache
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('api_profile')).status_code, 200)
+        
+        with mock.patch('time.time', return_value=time.time() + 6):
+            self.assertEqual(self.client.get(reverse('api_profile')).status_code, 401)
+        self.assertEqual([warning.id for warning in check_user_cache(None)], ['accounts.W001'])
+
+
+@override_settings(TOKEN_BLACKLIST_FILTER=True)
+class TokenBlacklistTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', password='pass12345!')
+    
+    def setUp(self):
+        cache.clear()
+        blacklist_filter.reset()
+    
+    def refresh(self, token):
+        return self.client.post(reverse('token_refresh'), {'refresh': str(token)}, content_type='application/json')
+    
+    def test_rotated_token_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(response.json()['refresh']).status_code, 200)
+    
+    def test_logged_out_token_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token.access_token}'
+        self.client.post(reverse('api_logout'), {'refresh': str(token)}, content_type='application/json')
+        with self.assertRaises(TokenError):
+            RefreshToken(str(token))
+    
+    def test_unlisted_token_skips_the_blacklist_query(self):
+        # Only a cache shared by all processes proves the filter current
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir
+        }}):
+            RefreshToken.for_user(self.user).blacklist()
+            token = str(RefreshToken.for_user(self.user))
+            RefreshToken(token)
+            with self.assertNumQueries(0):
+                RefreshToken(token)
+    
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'first-process'},
+        'other': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'second-process'},
+    })
+    def test_other_process_with_its_own_cache_rejects_blacklisted_token(self):
+        token = RefreshToken.for_user(self.user)
+        # A second worker process: its own cache, its own filter, warmed before the logout
+        other_process = BlacklistFilter(cache_alias='other', sync_interval=3600)
+        self.assertFalse(other_process.might_contain(token['jti']))
+        
+        token.blacklist()
+        with mock.patch('accounts.tokens.blacklist_filter', other_process):
+            with self.assertRaises(TokenError):
+                RefreshToken(str(token))
+    
+    def test_filter_requires_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_blacklist_filter_cache(None)], ['accounts.E001'])
+        with self.settings(TOKEN_BLACKLIST_FILTER=False):
+            self.assertEqual(check_blacklist_filter_cache(None), [])
+    
+    def test_prune_deletes_expired_tokens_only(self):
+        expired = RefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(minutes=1))
+        current = RefreshToken.for_user(self.user)
+        
+        self.assertEqual(prune_tokens(chunk_size=1), 1)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [current['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class PasswordHashingTests(TransactionTestCase):
+    """Logins authenticate on the executor's threads, which only see committed rows."""
+    
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='reader', password='pass12345!')
+    
+    def login(self, password='pass12345!'):
+        return self.client.post(reverse('api_login'), {'username': 'reader', 'password': password},
+                                content_type='application/json')
+    
+    def test_login_rehashes_with_new_work_factor(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertEqual(self.login('wrong-pass').status_code, 401)
+    
+    def test_login_goes_through_authenticate(self):
+        failures = []
+        
+        def login_failed(sender, credentials, **kwargs):
+            failures.append(credentials['username'])
+        
+        user_login_failed.connect(login_failed)
+        self.addCleanup(user_login_failed.disconnect, login_failed)
+        self.assertEqual(self.login('wrong-pass').status_code, 401)
+        self.assertEqual(failures, ['reader'])
+        
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.login().status_code, 401)
+        self.client.post(reverse('login'), {'username': 'reader', 'password': 'pass12345!'})
+        self.assertNotIn('_auth_user_id', self.client.session)
+    
+    def test_password_change_notifies_the_validators(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        with mock.patch('django.contrib.auth.base_user.password_validation.password_changed') as password_changed:
+            response = self.client.post(reverse('api_change_password'), {
+                'old_password': 'pass12345!', 'new_password': 'New-pass-678!', 'new_password2': 'New-pass-678!'
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        password_changed.assert_called_once_with('New-pass-678!', mock.ANY)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('New-pass-678!'))
+    
+    def test_saturated_executor_rejects_at_once(self):
+        executor = HashingExecutor(workers=1, queue_size=0)
+        release = threading.Event()
+        executor.submit(release.wait)
+        try:
+            with mock.patch('accounts.passwords.hashing_executor', executor):
+                response = self.login()
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response['Retry-After'], '1')
+                
+                response = self.client.post(reverse('register'), {
+                    'username': 'writer', 'email': 'writer@example.com',
+                    'password': 'pass12345!', 'password2': 'pass12345!'
+                })
+                self.assertEqual(response.status_code, 503)
+                self.assertFalse(CustomUser.objects.filter(username='writer').exists())
+        finally:
+            release.set()
+        self.assertEqual(self.login().status_code, 200)
+    
+    async def test_async_login_and_register(self):
+        factory = AsyncRequestFactory()
+        
+        def post(path, data):
+            return factory.post(path, json.dumps(data), content_type='application/json')
+        
+        response = await async_api_views.login(post('/api/auth/login/', {'username': 'reader', 'password': 'pass12345!'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', json.loads(response.content)['tokens'])
+        response = await async_api_views.login(post('/api/auth/login/', {'username': 'reader', 'password': 'nope'}))
+        self.assertEqual(response.status_code, 401)
+        
+        response = await async_api_views.register(post('/api/auth/register/', {
+            'username': 'writer', 'email': 'writer@example.com',
+            'password': 'Writer-pass-678!', 'password2': 'Writer-pass-678!'
+        }))
+        self.assertEqual(response.status_code, 201)
+        user = await CustomUser.objects.aget(username='writer')
+        self.assertTrue(user.check_password('Writer-pass-678!'))
+
+
+def image_upload(name='avatar.png', size=(640, 480), mode='RGBA'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 40, 40, 128) if mode == 'RGBA' else (200, 40, 40)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ProfileThumbnailTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', password='pass12345!')
+    
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Run the background job inline, right after the commit
+        submit = mock.patch.object(thumbnail_executor, 'submit', side_effect=lambda func, *args: func(*args))
+        submit.start()
+        self.addCleanup(submit.stop)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(self.user)}'
+    
+    def upload(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put(reverse('api_profile'), encode_multipart(BOUNDARY, {'profile_image': image}),
+                                   content_type=MULTIPART_CONTENT)
+    
+    def test_api_upload_makes_hashed_thumbnails(self):
+        response = self.upload(image_upload())
+        self.assertEqual(response.status_code, 200)
+        
+        thumbnails = self.client.get(reverse('api_profile')).json()['user']['thumbnails']
+        self.assertEqual(set(thumbnails), {'small', 'medium'})
+        self.user.refresh_from_db()
+        for size_name, size in (('small', 64), ('medium', 256)):
+            for extension, pil_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+                name = self.user.profile_thumbnails['sizes'][size_name][extension]
+                self.assertRegex(name, rf'^profile_images/thumbnails/[0-9a-f]{{24}}\.{extension}$')
+                self.assertTrue(thumbnails[size_name][extension].endswith(name))
+                with Image.open(os.path.join(settings.MEDIA_ROOT, name)) as image:
+                    self.assertEqual((image.format, image.size), (pil_format, (size, size)))
+        
+        # A new image hides the old thumbnails until its own are made
+        with mock.patch.object(thumbnail_executor, 'submit'):
+            self.upload(image_upload('other.png', mode='RGB'))
+        self.assertEqual(self.client.get(reverse('api_profile')).json()['user']['thumbnails'], {})
+    
+    def test_web_upload_and_backfill(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('profile'), {'first_name': 'Ada', 'profile_image': image_upload()},
+                                        HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['success'], True)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_thumbnails['source'], self.user.profile_image.name)
+        
+        response = self.client.post(reverse('profile'), {'profile_image': SimpleUploadedFile('bad.png', b'not an image')},
+                                    HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+        CustomUser.objects.filter(pk=self.user.pk).update(profile_thumbnails={})
+        call_command('backfill_thumbnails', stdout=io.StringIO())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_thumbnails['source'], self.user.profile_image.name)
+    
+    def test_thumbnails_are_served_with_far_future_caching(self):
+        self.upload(image_upload())
+        self.user.refresh_from_db()
+        name = self.user.profile_thumbnails['sizes']['small']['webp']
+        response = serve_thumbnail(RequestFactory().get('/'), os.path.basename(name))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
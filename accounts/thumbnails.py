@@ -0,0 +1,130 @@
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .authentication import invalidate_cached_user
+
+
+logger = logging.getLogger(__name__)
+
+# Square sizes in pixels; every size is stored as WebP and as JPEG for older clients
+THUMBNAIL_SIZES = getattr(settings, 'PROFILE_THUMBNAIL_SIZES', {'small': 64, 'medium': 256})
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+THUMBNAIL_DIR = 'profile_images/thumbnails'
+
+thumbnail_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PROFILE_THUMBNAIL_WORKERS', 2), thread_name_prefix='thumbnails'
+)
+
+
+def render_thumbnails(image_file):
+    """``{size name: {format: encoded bytes}}`` for an uploaded image file."""
+    with Image.open(image_file) as image:
+        # Let the JPEG decoder scale down while decoding, a lot cheaper for camera photos
+        largest = max(THUMBNAIL_SIZES.values())
+        image.draft('RGB', (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            # Transparent areas become white, as neither JPEG nor the page background has alpha
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+            image = background
+        
+        rendered = {}
+        for name, size in sorted(THUMBNAIL_SIZES.items(), key=lambda item: -item[1]):
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            rendered[name] = {}
+            for extension, (pil_format, options) in THUMBNAIL_FORMATS.items():
+                buffer = io.BytesIO()
+                thumbnail.save(buffer, pil_format, **options)
+                rendered[name][extension] = buffer.getvalue()
+        return rendered
+
+
+def store(content, extension):
+    """Save under a name derived from the content, so the file never changes and can be cached forever."""
+    name = posixpath.join(THUMBNAIL_DIR, f'{hashlib.sha256(content).hexdigest()[:24]}.{extension}')
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def generate_thumbnails(user_id):
+    """
+    Render and store the thumbnails of a user's current profile image.
+    
+    Records them in ``profile_thumbnails`` together with the image they were
+    made from, unless the image was replaced in the meantime. Returns True if
+    thumbnails were stored.
+    """
+    from .models import CustomUser
+    
+    user = CustomUser.objects.filter(pk=user_id).only('id', 'profile_image').first()
+    if user is None or not user.profile_image:
+        return False
+    source = user.profile_image.name
+    try:
+        with user.profile_image.open('rb') as image_file:
+            rendered = render_thumbnails(image_file)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning('Could not make thumbnails of %s for user %s: %s', source, user_id, e)
+        return False
+    
+    thumbnails = {
+        name: {extension: store(content, extension) for extension, content in formats.items()}
+        for name, formats in rendered.items()
+    }
+    updated = CustomUser.objects.filter(pk=user_id, profile_image=source).update(
+        profile_thumbnails={'source': source, 'sizes': thumbnails}
+    )
+    # update() skips the post_save signal that normally drops the cached user
+    invalidate_cached_user(user_id)
+    return bool(updated)
+
+
+def run_in_background(user_id):
+    close_old_connections()
+    try:
+        generate_thumbnails(user_id)
+    except Exception:
+        logger.exception('Thumbnail generation failed for user %s', user_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnails(user):
+    """Generate the thumbnails on the thumbnail thread pool once the current transaction commits."""
+    user_id = user.pk
+    transaction.on_commit(lambda: thumbnail_executor.submit(run_in_background, user_id))
+
+
+def thumbnail_urls(user, request=None):
+    """
+    ``{size name: {format: url}}`` of a user's thumbnails.
+    
+    Empty while the thumbnails of the current image are being made, or when
+    there is no image; clients fall back to ``profile_image`` then.
+    """
+    thumbnails = user.profile_thumbnails or {}
+    if not user.profile_image or thumbnails.get('source') != user.profile_image.name:
+        return {}
+    
+    def url(name):
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    
+    return {
+        size: {extension: url(name) for extension, name in formats.items()}
+        for size, formats in thumbnails.get('sizes', {}).items()
+    }
@@ -0,0 +1,178 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core.cache import get_version, invalidate_version, is_shared_cache
+from core.routers import primary_reads
+
+
+BLACKLIST_VERSION_KEY = 'token_blacklist:version'
+
+# Blacklist rows younger than this are read again on every sync, so rows whose
+# transaction commits after a row with a higher id are not missed
+BLACKLIST_SYNC_OVERLAP = timedelta(seconds=getattr(settings, 'TOKEN_BLACKLIST_SYNC_OVERLAP', 60))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings: no false negatives, ``error_rate`` false positives at capacity."""
+    
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+    
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+
+class BlacklistFilter:
+    """
+    Per-process Bloom filter in front of the token blacklist.
+    
+    A jti that is not in the filter is certainly not blacklisted, so the
+    refresh check only queries the blacklist table for the rare jti the
+    filter reports. Blacklisting a token bumps a version counter in the
+    shared cache; each process then reads the rows added since its last sync
+    (by primary key, with an overlap for late commits). The filter is rebuilt
+    from the unexpired rows once it reaches its capacity, which also drops
+    the rows removed by ``prune_tokens``.
+    
+    The counter only proves the filter current when the cache is shared by
+    all processes. With a per-process cache, a bump made by another worker
+    would never be seen, so the filter then reads the new rows from the
+    database on every check instead. It also does so every ``sync_interval``
+    seconds, in case a bump was lost (cache restarted or evicted).
+    """
+    
+    def __init__(self, min_capacity=1024, cache_alias=DEFAULT_CACHE_ALIAS, sync_interval=None):
+        self.min_capacity = min_capacity
+        self.cache_alias = cache_alias
+        self.sync_interval = (
+            sync_interval if sync_interval is not None
+            else getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 5)
+        )
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._version = None
+        self._synced_at = 0
+        self._count = 0
+        self._max_id = 0
+        self._floor = 0
+    
+    def might_contain(self, jti):
+        shared = is_shared_cache(self.cache_alias)
+        version = get_version(BLACKLIST_VERSION_KEY, using=self.cache_alias) if shared else None
+        with self._lock:
+            if self._bloom is None or self._count >= self._bloom.capacity:
+                self._rebuild(version)
+            elif not shared or version != self._version or self._stale():
+                self._sync(version)
+            return jti in self._bloom
+    
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+    
+    def _stale(self):
+        return time.monotonic() - self._synced_at >= self.sync_interval
+    
+    @primary_reads()
+    def _rows(self, since_id):
+        now = timezone.now()
+        rows = BlacklistedToken.objects.filter(id__gt=since_id, token__expires_at__gt=now)
+        return now, list(rows.values_list('id', 'token__jti', 'blacklisted_at').order_by('id'))
+    
+    def _rebuild(self, version):
+        now, rows = self._rows(0)
+        self._bloom = BloomFilter(max(2 * len(rows), self.min_capacity))
+        self._count = 0
+        self._max_id = 0
+        self._floor = 0
+        self._add(now, rows, version)
+    
+    def _sync(self, version):
+        now, rows = self._rows(self._floor)
+        self._add(now, rows, version)
+    
+    def _add(self, now, rows, version):
+        settled = now - BLACKLIST_SYNC_OVERLAP
+        for row_id, jti, blacklisted_at in rows:
+            self._bloom.add(jti)
+            if row_id > self._max_id:
+                self._max_id = row_id
+                self._count += 1
+            if blacklisted_at <= settled:
+                self._floor = max(self._floor, row_id)
+        self._version = version
+        self._synced_at = time.monotonic()
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    RefreshToken whose blacklist check is skipped for jtis the blacklist filter rules out.
+    
+    Only with ``TOKEN_BLACKLIST_FILTER``; otherwise every check queries the blacklist.
+    """
+    
+    def check_blacklist(self):
+        if (
+            not getattr(settings, 'TOKEN_BLACKLIST_FILTER', False)
+            or blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM])
+        ):
+            super().check_blacklist()
+
+
+def token_pair(user):
+    refresh = RefreshToken.for_user(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def invalidate_blacklist():
+    invalidate_version(BLACKLIST_VERSION_KEY)
+
+
+def prune_tokens(chunk_size=1000):
+    """
+    Delete expired outstanding tokens, and with them their blacklist entries.
+    
+    Each chunk of ``chunk_size`` tokens is deleted in its own transaction.
+    Expired tokens are rejected by signature checks anyway, so the rows only
+    cost space and index size. Returns the number of tokens deleted.
+    """
+    deleted = 0
+    expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now())
+    while True:
+        ids = list(expired.values_list('id', flat=True).order_by('id')[:chunk_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+    return deleted
@@ -1,5 +1,6 @@
 from django.urls import path
-from . import views, api_views
+from core.async_api import async_methods
+from . import views, api_views, async_api_views
 
 urlpatterns = [
     # Web views
@@ -12,8 +13,10 @@ urlpatterns = [
 
 # API URL patterns
 api_urlpatterns = [
-    path('login/', api_views.LoginAPIView.as_view(), name='api_login'),
-    path('register/', api_views.RegisterAPIView.as_view(), name='api_register'),
+    path('login/', async_methods(api_views.LoginAPIView.as_view(), post=async_api_views.login),
+         name='api_login'),
+    path('register/', async_methods(api_views.RegisterAPIView.as_view(), post=async_api_views.register),
+         name='api_register'),
     path('profile/', api_views.ProfileAPIView.as_view(), name='api_profile'),
     path('change-password/', api_views.ChangePasswordAPIView.as_view(), name='api_change_password'),
     path('logout/', api_views.LogoutAPIView.as_view(), name='api_logout'),
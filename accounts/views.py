@@ -1,14 +1,30 @@
 from django.shortcuts import render, redirect
 from django.views import View
-from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
+from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.http import JsonResponse
+from django.views.static import serve
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import json
+import os
 
 from .models import CustomUser
+from .passwords import BUSY_MESSAGE, HashingBusy, authenticate_user, build_user, hash_password
+from .thumbnails import THUMBNAIL_DIR, schedule_thumbnails, thumbnail_urls
+
+
+def busy_response(request, template_name):
+    if request.headers.get('Content-Type') == 'application/json':
+        return JsonResponse({'success': False, 'message': BUSY_MESSAGE}, status=503, headers={'Retry-After': '1'})
+    messages.error(request, BUSY_MESSAGE)
+    response = render(request, template_name, status=503)
+    response['Retry-After'] = '1'
+    return response
 
 
 class LoginView(View):
@@ -28,7 +44,10 @@ class LoginView(View):
             username = request.POST.get('username')
             password = request.POST.get('password')
         
-        user = authenticate(request, username=username, password=password)
+        try:
+            user = authenticate_user(request, username, password)
+        except HashingBusy:
+            return busy_response(request, 'accounts/login.html')
         
         if user is not None:
             login(request, user)
@@ -91,13 +110,12 @@ class RegisterView(View):
             return render(request, 'accounts/register.html')
         
         # Create user
-        user = CustomUser.objects.create_user(
-            username=username,
-            email=email,
-            password=password,
-            first_name=first_name,
-            last_name=last_name
-        )
+        try:
+            password_hash = hash_password(password)
+        except HashingBusy:
+            return busy_response(request, 'accounts/register.html')
+        user = build_user(username, email, password_hash, first_name=first_name, last_name=last_name)
+        user.save()
         
         login(request, user)
         
@@ -118,25 +136,41 @@ class LogoutView(View):
 class ProfileView(LoginRequiredMixin, View):
     
     def get(self, request):
-        return render(request, 'accounts/profile.html', {'user': request.user})
+        return render(request, 'accounts/profile.html', {
+            'user': request.user,
+            'thumbnails': thumbnail_urls(request.user)
+        })
     
     def post(self, request):
         user = request.user
         
-        # Handle AJAX request
+        # Handle AJAX request (JSON, or multipart when a new image is uploaded)
         if request.headers.get('Content-Type') == 'application/json':
             data = json.loads(request.body)
         else:
             data = request.POST
+        is_ajax = 'application/json' in (request.headers.get('Content-Type'), request.headers.get('Accept'))
         
         user.first_name = data.get('first_name', user.first_name)
         user.last_name = data.get('last_name', user.last_name)
         user.email = data.get('email', user.email)
         user.phone = data.get('phone', user.phone)
         user.address = data.get('address', user.address)
+        
+        image = request.FILES.get('profile_image')
+        if image is not None:
+            try:
+                user.profile_image = forms.ImageField().clean(image)
+            except ValidationError as e:
+                if is_ajax:
+                    return JsonResponse({'success': False, 'message': e.messages[0]}, status=400)
+                messages.error(request, e.messages[0])
+                return redirect('profile')
         user.save()
+        if image is not None:
+            schedule_thumbnails(user)
         
-        if request.headers.get('Content-Type') == 'application/json':
+        if is_ajax:
             return JsonResponse({'success': True, 'message': 'Profile updated successfully'})
         
         messages.success(request, 'Profile updated successfully!')
@@ -188,3 +222,10 @@ class ChangePasswordView(LoginRequiredMixin, View):
         
         messages.success(request, 'Password changed successfully!')
         return redirect('profile')
+
+
+def serve_thumbnail(request, path):
+    """Serve a thumbnail in development, with the far-future caching its content-hashed name allows."""
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, THUMBNAIL_DIR))
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
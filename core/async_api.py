@@ -0,0 +1,115 @@
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.authentication import CachedJWTAuthentication, user_cache_key, user_version_key
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """CachedJWTAuthentication with the cache and user lookups done asynchronously."""
+    
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+    
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Token contained no recognizable user identification') from e
+        
+        version = await cache.aget(user_version_key(user_id))
+        user = await cache.aget(user_cache_key(user_id, version)) if version is not None else None
+        if user is None:
+            user = await sync_to_async(self.get_user)(validated_token)
+        else:
+            self.check_user(user, validated_token)
+        return user
+
+
+def error_response(exc):
+    response = JsonResponse({'detail': exc.detail}, status=exc.status_code, encoder=DjangoJSONEncoder)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = AsyncJWTAuthentication().authenticate_header(None)
+    return response
+
+
+def async_api_view(handler=None, *, allow_anonymous=False):
+    """
+    Turn ``async def handler(request, *args)`` into an authenticated JSON view.
+    
+    Mirrors what the DRF views do: JWT or session authentication,
+    ``IsAuthenticated`` unless ``allow_anonymous``, and API exceptions
+    rendered as ``{'detail': ...}``. The handler receives a DRF ``Request``
+    for ``data``, ``query_params`` and the paginators, and returns either a
+    response or a dict that is sent as JSON.
+    """
+    if handler is None:
+        return partial(async_api_view, allow_anonymous=allow_anonymous)
+    
+    @wraps(handler)
+    async def view(request, *args, **kwargs):
+        try:
+            if not allow_anonymous:
+                authenticated = await AsyncJWTAuthentication().aauthenticate(request)
+                user = authenticated[0] if authenticated else await request.auser()
+                if not user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                request.user = user
+            parsers = [parser() for parser in drf_settings.DEFAULT_PARSER_CLASSES]
+            result = await handler(Request(request, parsers=parsers), *args, **kwargs)
+        except exceptions.APIException as exc:
+            return error_response(exc)
+        if isinstance(result, HttpResponse):
+            return result
+        return JsonResponse(result, encoder=DjangoJSONEncoder)
+    
+    if allow_anonymous:
+        # Like the AllowAny DRF views, these never act on a session
+        view.csrf_exempt = True
+    return view
+
+
+def async_methods(sync_view, **handlers):
+    """
+    Serve the given methods with async handlers when ``ASYNC_API_VIEWS`` is on.
+    
+    ``handlers`` maps lowercase method names to async views; other methods
+    still go to the DRF view. The choice is made once, when the URLconf is
+    loaded: an async view served by WSGI would pay an event loop per
+    request, so keep the setting off unless running under ASGI.
+    """
+    if not getattr(settings, 'ASYNC_API_VIEWS', False):
+        return sync_view
+    
+    sync_dispatch = sync_to_async(sync_view)
+    
+    async def view(request, *args, **kwargs):
+        handler = handlers.get(request.method.lower())
+        if handler is not None:
+            return await handler(request, *args, **kwargs)
+        return await sync_dispatch(request, *args, **kwargs)
+    
+    # DRF enforces CSRF itself for session-authenticated writes
+    view.csrf_exempt = True
+    return view
+
+
+def read_view(sync_view, async_get):
+    """Serve GET requests with ``async_get`` when ``ASYNC_API_VIEWS`` is on."""
+    return async_methods(sync_view, get=async_get)
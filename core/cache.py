@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import transaction
+
+
+# Backends whose entries only the process that wrote them can see
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Whether every process sees what one of them writes to the cache.
+    
+    Version counters only invalidate the copies held by other processes
+    (gunicorn workers, job workers) through a shared cache.
+    """
+    backend = caches[alias]
+    return f'{type(backend).__module__}.{type(backend).__name__}' not in PROCESS_LOCAL_BACKENDS
+
+
+def get_version(key, using=DEFAULT_CACHE_ALIAS):
+    """
+    Current value of a version counter kept in the shared cache.
+    
+    Counters start from a time-based seed rather than 1, so entries cached
+    under an old version can never be mistaken for current ones after the
+    counter itself was evicted.
+    """
+    backend = caches[using]
+    version = backend.get(key)
+    if version is None:
+        seed = time.time_ns()
+        backend.add(key, seed, timeout=None)
+        version = backend.get(key)
+        if version is None:
+            # Cache backend that does not store anything (e.g. DummyCache)
+            return seed
+    return version
+
+
+def bump_version(key, using=DEFAULT_CACHE_ALIAS):
+    backend = caches[using]
+    try:
+        backend.incr(key)
+    except ValueError:
+        backend.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_version(key):
+    """
+    Bump a version counter now and again once the current transaction commits.
+    
+    The second bump stops readers that rebuilt from the not yet committed
+    state in between from keeping that stale copy under the new version.
+    """
+    bump_version(key)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+class LocalLRUCache:
+    """
+    Small thread-safe in-process LRU, for values that are immutable once built.
+    
+    With ``ttl`` (seconds) entries also expire, which bounds how long a
+    process can keep a copy that another process has invalidated without
+    it knowing.
+    """
+    
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            expires, value = self._data[key]
+            if expires is not None and time.monotonic() >= expires:
+                del self._data[key]
+                return None
+            return value
+    
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,53 @@
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+logger = logging.getLogger(__name__)
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_locked(error):
+    """True for the OperationalError SQLite raises when its busy timeout ran out."""
+    return isinstance(error, OperationalError) and any(message in str(error) for message in LOCKED_MESSAGES)
+
+
+def retry_on_lock(func=None, *, attempts=None, delay=None, using=DEFAULT_DB_ALIAS):
+    """
+    Run a write again, with exponential backoff, when the database is locked.
+    
+    For SQLite with several worker processes: the busy timeout already waits
+    for the write lock, this covers the writes that still time out under
+    heavy contention. The wrapped function must hold its whole transaction
+    (``transaction.atomic`` inside it) so that each attempt starts from
+    scratch. Called inside an outer transaction it runs once, since only the
+    outermost block can be retried. ``attempts`` and ``delay`` (seconds,
+    doubled after each attempt) default to the ``DATABASE_WRITE_RETRIES``
+    and ``DATABASE_WRITE_RETRY_DELAY`` settings.
+    """
+    if func is None:
+        return functools.partial(retry_on_lock, attempts=attempts, delay=delay, using=using)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if connections[using].in_atomic_block:
+            return func(*args, **kwargs)
+        
+        tries = attempts or getattr(settings, 'DATABASE_WRITE_RETRIES', 5)
+        wait = delay or getattr(settings, 'DATABASE_WRITE_RETRY_DELAY', 0.05)
+        for attempt in range(1, tries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == tries or not is_locked(e):
+                    raise
+                logger.info('%s: database locked, retrying (attempt %d of %d)', func.__qualname__, attempt, tries)
+            # Jitter so that writers that collided don't collide again
+            time.sleep(wait * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+    
+    return wrapper
@@ -0,0 +1,158 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger('ems.queries')
+
+
+# QueryStats collecting the queries of the current request (or capture_queries block).
+# A context variable rather than a thread-local, so that queries run through
+# sync_to_async on behalf of an async view are counted for that view.
+_active_stats = ContextVar('query_stats', default=())
+
+
+class QueryStats:
+    """
+    Query count, total time and slowest statement of a block of code.
+    
+    Filled by a database execute wrapper, so it works with DEBUG off and
+    does not keep every executed statement around.
+    """
+    
+    def __init__(self, keep_statements=False):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql = None
+        self.slowest_duration = 0.0
+        self.statements = [] if keep_statements else None
+    
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        if self.slowest_sql is None or duration > self.slowest_duration:
+            self.slowest_sql = sql
+            self.slowest_duration = duration
+        if self.statements is not None:
+            self.statements.append(sql)
+    
+    def as_headers(self):
+        headers = {
+            'X-DB-Query-Count': str(self.count),
+            'X-DB-Time-Ms': f'{self.duration * 1000:.2f}',
+            'Server-Timing': f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"',
+        }
+        if self.slowest_sql is not None:
+            headers['X-DB-Slowest-Ms'] = f'{self.slowest_duration * 1000:.2f}'
+            # Header values must be a single line
+            headers['X-DB-Slowest-Query'] = ' '.join(self.slowest_sql.split())[:500]
+        return headers
+
+
+def record_query(execute, sql, params, many, context):
+    active = _active_stats.get()
+    if not active:
+        return execute(sql, params, many, context)
+    
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for stats in active:
+            stats.add(sql, duration)
+
+
+def install_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Connections opened later (e.g. by the worker threads of sync_to_async) get it too
+connection_created.connect(install_wrapper)
+
+
+@contextmanager
+def capture_queries(keep_statements=False):
+    """Record the queries run on every database connection inside the block."""
+    stats = QueryStats(keep_statements)
+    for connection in connections.all():
+        install_wrapper(connection)
+    token = _active_stats.set(_active_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+
+
+def get_query_budget(view_name, method='GET'):
+    """
+    Budget of a view from ``QUERY_BUDGETS``.
+    
+    Keys are URL names, which budget GET and HEAD requests, or
+    ``'<METHOD> <URL name>'`` for the other methods.
+    """
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    if method in ('GET', 'HEAD'):
+        return budgets.get(f'{method} {view_name}', budgets.get(view_name))
+    return budgets.get(f'{method} {view_name}')
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record the queries of each request and report them per view.
+    
+    Enabled by the ``QUERY_INSTRUMENTATION`` setting. Adds ``X-DB-*`` and
+    ``Server-Timing`` headers to the response and logs a warning when a view
+    runs more queries than its entry in ``QUERY_BUDGETS``.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_INSTRUMENTATION', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        
+        with capture_queries() as stats:
+            response = self.get_response(request)
+        return self.report(request, response, stats)
+    
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        
+        with capture_queries() as stats:
+            response = await self.get_response(request)
+        return self.report(request, response, stats)
+    
+    def report(self, request, response, stats):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        for header, value in stats.as_headers().items():
+            response[header] = value
+        
+        budget = get_query_budget(view_name, request.method)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                '%s ran %d queries (budget %d) in %.1f ms, slowest %.1f ms: %s',
+                view_name, stats.count, budget, stats.duration * 1000,
+                stats.slowest_duration * 1000, stats.slowest_sql,
+            )
+        else:
+            logger.debug('%s ran %d queries in %.1f ms', view_name, stats.count, stats.duration * 1000)
+        return response
@@ -0,0 +1,161 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+class StandardPagination(PageNumberPagination):
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    
+    async def apaginate_queryset(self, queryset, request):
+        """``paginate_queryset`` for async views, with ``acount`` and ``async for``."""
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property: set it so that it never queries synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        self.request = request
+        return self.page.object_list
+    
+    def get_page_info(self):
+        return {
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+
+
+class KeysetPagination:
+    """
+    Cursor pagination over ``(-created_at, -id)``.
+    
+    Each page is fetched with a range condition on the ordering columns
+    instead of an OFFSET, and no COUNT query is run, so every page costs
+    the same as the first one. The pages always follow that order, which
+    replaces any other ordering of the queryset.
+    """
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    
+    @classmethod
+    def requested(cls, request):
+        return cls.requested_in(request.query_params)
+    
+    @classmethod
+    def requested_in(cls, params):
+        return cls.cursor_query_param in params or params.get('pagination') == 'cursor'
+    
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+    
+    def encode_cursor(self, obj, reverse):
+        payload = json.dumps({'c': obj.created_at.isoformat(), 'i': obj.pk, 'r': int(reverse)})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created_at = parse_datetime(payload['c'])
+            pk = int(payload['i'])
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk, reverse
+    
+    def filter_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        
+        if self.cursor is None:
+            return queryset.order_by('-created_at', '-id')
+        
+        created_at, pk, reverse = self.cursor
+        if reverse:
+            return queryset.filter(
+                Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+            ).order_by('created_at', 'id')
+        return queryset.filter(
+            Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+        ).order_by('-created_at', '-id')
+    
+    def set_page(self, results):
+        """Trim the ``page_size + 1`` rows fetched to one page and work out the links."""
+        reverse = self.cursor is not None and self.cursor[2]
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        
+        self.page = results
+        return results
+    
+    def paginate_queryset(self, queryset, request):
+        queryset = self.filter_queryset(queryset, request)
+        return self.set_page(list(queryset[:self.page_size + 1]))
+    
+    async def apaginate_queryset(self, queryset, request):
+        queryset = self.filter_queryset(queryset, request)
+        return self.set_page([obj async for obj in queryset[:self.page_size + 1]])
+    
+    def build_link(self, cursor):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'pagination')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+    
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.build_link(self.encode_cursor(self.page[-1], reverse=False))
+    
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.build_link(self.encode_cursor(self.page[0], reverse=True))
+    
+    def get_page_info(self):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+
+
+def get_paginator(request):
+    if KeysetPagination.requested(request):
+        return KeysetPagination()
+    return StandardPagination()
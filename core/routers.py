@@ -0,0 +1,115 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+STICKY_COOKIE = 'ems_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Always read from the primary: a session read from a lagging replica right
+# after login would look logged out
+PRIMARY_APPS = {'sessions'}
+
+# Whether reads of the current request may go to a replica. A context variable,
+# so that sync_to_async worker threads of async views see the request's value.
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Let the reads inside the block go to a replica (or, with ``enabled=False``, not)."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_reads():
+    """
+    Read from the primary inside the block; also usable as a decorator.
+    
+    For code that fills a versioned cache entry: a replica that has not
+    caught up yet would store the old data under the new version.
+    """
+    return replica_reads(False)
+
+
+class ReplicaRouter:
+    """
+    Send reads to a random ``DATABASE_REPLICAS`` alias while replica reads are on.
+    
+    ``ReplicaRoutingMiddleware`` turns them on for safe requests. Writes, and
+    every read once the current request has written, go to the primary.
+    """
+    
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and _replica_reads.get() and model._meta.app_label not in PRIMARY_APPS:
+            return random.choice(aliases)
+        return DEFAULT_DB_ALIAS
+    
+    def db_for_write(self, model, **hints):
+        # Reads that follow a write in the same request must see it
+        _replica_reads.set(False)
+        return DEFAULT_DB_ALIAS
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary and get its schema with the data
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of GET, HEAD and OPTIONS requests to the replicas.
+    
+    A request with another method marks the client with the ``ems_primary``
+    cookie for ``REPLICA_STICKY_SECONDS``; until it expires all of that
+    client's requests read from the primary, so users see their own changes
+    even while the replicas lag behind.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def use_replicas(self, request):
+        return bool(replicas()) and request.method in SAFE_METHODS and STICKY_COOKIE not in request.COOKIES
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.use_replicas(request)):
+            response = self.get_response(request)
+        return self.mark(request, response)
+    
+    async def __acall__(self, request):
+        with replica_reads(self.use_replicas(request)):
+            response = await self.get_response(request)
+        return self.mark(request, response)
+    
+    def mark(self, request, response):
+        if replicas() and request.method not in SAFE_METHODS:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
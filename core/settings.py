@@ -2,6 +2,7 @@
 Django settings for core project.
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -30,9 +31,12 @@ INSTALLED_APPS = [
     'accounts',
     'forms_builder',
     'employees',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.QueryInstrumentationMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,10 +71,95 @@ WSGI_APPLICATION = 'core.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('EMS_SQLITE_PATH') or BASE_DIR / 'db.sqlite3',
     }
 }
 
+# Production SQLite profile (EMS_SQLITE_PRODUCTION=1), for several worker processes
+# sharing the database file: WAL so readers never wait for the writer, a busy timeout
+# instead of failing at once on the write lock, and BEGIN IMMEDIATE so a transaction
+# takes the write lock up front rather than failing when it upgrades from a read.
+# Writes that still time out are retried by core.db.retry_on_lock.
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('EMS_SQLITE_BUSY_TIMEOUT', 5))
+if os.environ.get('EMS_SQLITE_PRODUCTION', '') == '1':
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA mmap_size=268435456;'
+            'PRAGMA cache_size=-65536;'
+            'PRAGMA temp_store=MEMORY;'
+        ),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': SQLITE_BUSY_TIMEOUT,
+    }
+
+DATABASE_WRITE_RETRIES = 5
+DATABASE_WRITE_RETRY_DELAY = 0.05
+
+# Read replicas (core.routers): EMS_SQLITE_REPLICAS lists SQLite files that are copies
+# of the primary, e.g. kept up to date by `manage.py sync_replicas`. Reads of GET
+# requests go to a random replica, except for clients that wrote in the last
+# REPLICA_STICKY_SECONDS. Tests run the replicas as mirrors of the test database.
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get('EMS_SQLITE_REPLICAS', '').split(',')), 1):
+    DATABASE_REPLICAS.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'OPTIONS': {
+            key: value for key, value in DATABASES['default'].get('OPTIONS', {}).items() if key != 'transaction_mode'
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('EMS_REPLICA_STICKY_SECONDS', 10))
+
+# Shared cache. Compiled form schemas and other versioned entries live here,
+# so with several worker processes point this at Redis (EMS_REDIS_URL, needs the
+# redis package); the in-process default only suits a single process. `manage.py
+# check --deploy` reports the features that need a shared cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ems-default',
+    }
+}
+if os.environ.get('EMS_REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['EMS_REDIS_URL'],
+    }
+
+# Compiled form schemas (forms_builder.schema)
+FORM_SCHEMA_CACHE_TIMEOUT = 60 * 60
+FORM_SCHEMA_LRU_SIZE = 256
+# Seconds a process keeps its own copy of a schema; bounds staleness with a per-process cache
+FORM_SCHEMA_LOCAL_TTL = 5
+
+# Seconds a user resolved from a JWT stays cached (accounts.authentication)
+AUTH_USER_CACHE_TIMEOUT = 60
+# Used instead with a per-process cache, which other processes' invalidations never reach
+AUTH_USER_LOCAL_CACHE_TIMEOUT = 5
+
+# Per-request query instrumentation (core.instrumentation): X-DB-* response headers,
+# and a logged warning when a view runs more queries than its budget.
+# The budgets are also enforced by tests using core.testing.QueryBudgetMixin.
+QUERY_INSTRUMENTATION = DEBUG
+QUERY_BUDGETS = {
+    'api_employee_list': 6,
+    'api_employee_detail': 4,
+    'api_employee_history': 5,
+    'api_form_list': 5,
+    'api_form_detail': 3,
+    'api_form_aggregations': 8,
+    'employee_list': 7,
+    'api_employee_stats': 6,
+    'dashboard': 7,
+    'api_job_detail': 3,
+}
+
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -88,6 +177,23 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'accounts.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# PBKDF2 work factor; existing hashes are upgraded on the next login after a change.
+# Unset uses Django's default for the installed version.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('EMS_PASSWORD_HASH_ITERATIONS', 0)) or None
+
+# Password hashing runs on its own thread pool (accounts.passwords); logins and
+# registrations beyond workers + queue are answered with 503 straight away.
+PASSWORD_HASHING_WORKERS = int(os.environ.get('EMS_PASSWORD_HASHING_WORKERS', 0)) or None
+PASSWORD_HASHING_QUEUE = 32
+
 
 
 LANGUAGE_CODE = 'en-us'
@@ -107,6 +213,28 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Profile image thumbnails (accounts.thumbnails): square sizes in pixels, each stored
+# as WebP and JPEG, made on a background thread pool after the upload
+PROFILE_THUMBNAIL_SIZES = {'small': 64, 'medium': 256}
+PROFILE_THUMBNAIL_WORKERS = 2
+
+# Background jobs (jobs app), run by `manage.py run_jobs`: threads per worker, base
+# retry delay in seconds (doubled per attempt) and how long a running job may go
+# without reporting progress before it is taken for lost and queued again.
+# EMS_JOBS_EAGER=1 runs jobs in the web process after the request's commit instead,
+# for development without a worker.
+JOBS_WORKERS = int(os.environ.get('EMS_JOBS_WORKERS', 2))
+JOBS_RETRY_DELAY = 10
+JOBS_STALE_TIMEOUT = 3600
+JOBS_EAGER = os.environ.get('EMS_JOBS_EAGER', '') == '1'
+# Finished jobs, and the export files they wrote, are deleted after this many days by `manage.py prune_jobs`
+JOBS_RETENTION_DAYS = 7
+
+# Uploads for `file` form fields (employees.files) are streamed to a temporary file
+# while being hashed; keep FILE_UPLOAD_TEMP_DIR on the same filesystem as MEDIA_ROOT
+# so that storing them is a rename
+EMPLOYEE_FILE_MAX_SIZE = 25 * 1024 * 1024
+
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -120,7 +248,7 @@ LOGIN_REDIRECT_URL = '/'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -130,6 +258,10 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Serve the read-heavy API endpoints (employee and form template list/detail GETs)
+# with native async views. Only useful when running under ASGI (core.asgi).
+ASYNC_API_VIEWS = os.environ.get('EMS_ASYNC_API_VIEWS', '') == '1'
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -140,4 +272,13 @@ SIMPLE_JWT = {
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # Checks the blacklist through accounts.tokens.blacklist_filter
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
 }
+
+# Bloom filter in front of the refresh token blacklist (accounts.tokens). Each process
+# learns about newly blacklisted tokens through a version counter in the cache, so it
+# needs a shared cache (enforced by a system check); it also resyncs from the database
+# every TOKEN_BLACKLIST_SYNC_INTERVAL seconds.
+TOKEN_BLACKLIST_FILTER = os.environ.get('EMS_TOKEN_BLACKLIST_FILTER', '') == '1'
+TOKEN_BLACKLIST_SYNC_INTERVAL = 5
@@ -0,0 +1,32 @@
+from .instrumentation import capture_queries, get_query_budget
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that fails when an endpoint runs more queries than its budget.
+    
+    Budgets come from ``query_budgets`` on the test class, falling back to
+    the ``QUERY_BUDGETS`` setting, and are looked up by the URL name of the
+    view that handled the request (see ``get_query_budget``).
+    """
+    query_budgets = {}
+    
+    def get_query_budget(self, view_name, method='GET'):
+        for key in (f'{method} {view_name}', view_name if method in ('GET', 'HEAD') else None):
+            if key in self.query_budgets:
+                return self.query_budgets[key]
+        return get_query_budget(view_name, method)
+    
+    def assertWithinQueryBudget(self, method, path, *args, client=None, **kwargs):
+        client = client or self.client
+        with capture_queries(keep_statements=True) as stats:
+            response = getattr(client, method)(path, *args, **kwargs)
+        
+        view_name = response.resolver_match.view_name
+        budget = self.get_query_budget(view_name, method.upper())
+        if budget is None:
+            self.fail(f'No query budget declared for {method.upper()} {view_name}')
+        if stats.count > budget:
+            statements = '\n'.join(f'{i}. {sql}' for i, sql in enumerate(stats.statements, start=1))
+            self.fail(f'{view_name} ran {stats.count} queries, budget is {budget}:\n{statements}')
+        return response
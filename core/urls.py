@@ -9,8 +9,11 @@ from rest_framework_simplejwt.views import TokenRefreshView
 
 from employees.views import DashboardView
 from accounts.urls import api_urlpatterns as accounts_api_urls
+from accounts.thumbnails import THUMBNAIL_DIR
+from accounts.views import serve_thumbnail
 from forms_builder.urls import api_urlpatterns as forms_api_urls
 from employees.urls import api_urlpatterns as employees_api_urls
+from jobs.urls import api_urlpatterns as jobs_api_urls
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -28,9 +31,13 @@ urlpatterns = [
     path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/forms/', include(forms_api_urls)),
     path('api/employees/', include(employees_api_urls)),
+    path('api/jobs/', include(jobs_api_urls)),
 ]
 
 # Serve media files in development
 if settings.DEBUG:
+    urlpatterns.append(
+        path(f'{settings.MEDIA_URL.strip("/")}/{THUMBNAIL_DIR}/<path:path>', serve_thumbnail, name='thumbnail')
+    )
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
@@ -2,46 +2,98 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from django.db.models import Q, Prefetch
 
-from .models import Employee, EmployeeFieldValue
-from .serializers import EmployeeSerializer, EmployeeCreateSerializer
+from .models import Employee, EmployeeFieldValue, FieldChange, StoredFile
+from .serializers import (
+    EmployeeSerializer, EmployeeSnapshotSerializer, EmployeeCreateSerializer, EmployeeImportSerializer,
+    FieldChangeSerializer
+)
+from .importers import EmployeeImporter, detect_format, open_text_stream
+from .files import (
+    HashingFileUploadHandler, clean_file_name, file_reference, file_response, parse_file_reference, store_upload
+)
+from .exporters import EmployeeExporter, EXPORT_FORMATS, EXPORT_CONTENT_TYPES
+from .search import search_employees
+from .services import delete_employee
+from .stats import dashboard_stats
+from .filters import apply_field_filters, FieldFilterError
+from core.pagination import KeysetPagination, get_paginator
 from forms_builder.models import FormTemplate
+from jobs.queue import enqueue
+from jobs.serializers import JobSerializer
+
+
+def employee_queryset():
+    """Everything EmployeeSerializer reads, in a fixed number of queries."""
+    return Employee.objects.select_related('form_template', 'created_by').prefetch_related(
+        Prefetch('field_values', queryset=EmployeeFieldValue.objects.current().select_related('form_field'))
+    )
+
+
+def filter_employees(employees, params):
+    """Apply the list API's search, template and field filters; raises FieldFilterError."""
+    search = params.get('search', '')
+    form_filter = params.get('form_template', '')
+    
+    if params.get('ordering') == 'relevance' and KeysetPagination.requested_in(params):
+        # Cursor pages follow (created_at, id) and would silently drop the ranking
+        raise FieldFilterError({'ordering': 'Relevance ordering cannot be combined with cursor pagination'})
+    
+    if search:
+        # Full-text search in field values, optionally limited to some fields
+        search_fields = [
+            int(field_id) for field_id in params.get('search_fields', '').split(',')
+            if field_id.strip().isdigit()
+        ]
+        employees = search_employees(
+            employees,
+            search,
+            field_ids=search_fields,
+            order_by_relevance=params.get('ordering') == 'relevance'
+        )
+    
+    if form_filter:
+        employees = employees.filter(form_template_id=form_filter)
+    
+    # Typed field filters, e.g. ?field:3__gte=2024-01-01
+    return apply_field_filters(employees, params, form_template_id=form_filter if form_filter.isdigit() else None)
+
+
+def use_snapshot(request):
+    """``?mode=snapshot`` serves employees from their ``data`` column, without joins."""
+    return request.query_params.get('mode') == 'snapshot'
 
 
 class EmployeeListAPIView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        employees = Employee.objects.all().prefetch_related('field_values__form_field')
-        
-        # Search functionality
-        search = request.query_params.get('search', '')
-        form_filter = request.query_params.get('form_template', '')
-        
-        if search:
-            # Search in field values
-            employee_ids = EmployeeFieldValue.objects.filter(
-                value__icontains=search
-            ).values_list('employee_id', flat=True)
-            employees = employees.filter(id__in=employee_ids)
+        if use_snapshot(request):
+            employees = Employee.objects.all()
+        else:
+            employees = employee_queryset()
         
-        if form_filter:
-            employees = employees.filter(form_template_id=form_filter)
+        try:
+            employees = filter_employees(employees, request.query_params)
+        except FieldFilterError as e:
+            return Response({
+                'success': False,
+                'errors': e.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Pagination
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
+        # Pagination (page numbers by default, keyset with ?cursor= or ?pagination=cursor)
+        paginator = get_paginator(request)
         paginated_employees = paginator.paginate_queryset(employees, request)
-        serializer = EmployeeSerializer(paginated_employees, many=True)
+        serializer_class = EmployeeSnapshotSerializer if use_snapshot(request) else EmployeeSerializer
+        serializer = serializer_class(paginated_employees, many=True)
         
         return Response({
             'success': True,
-            'count': paginator.page.paginator.count,
-            'next': paginator.get_next_link(),
-            'previous': paginator.get_previous_link(),
+            **paginator.get_page_info(),
             'employees': serializer.data
         })
     
@@ -52,7 +104,7 @@ class EmployeeListAPIView(APIView):
             return Response({
                 'success': True,
                 'message': 'Employee created successfully',
-                'employee': EmployeeSerializer(employee).data
+                'employee': EmployeeSerializer(employee_queryset().get(pk=employee.pk)).data
             }, status=status.HTTP_201_CREATED)
         return Response({
             'success': False,
@@ -64,8 +116,13 @@ class EmployeeDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, pk):
-        employee = get_object_or_404(Employee, pk=pk)
-        serializer = EmployeeSerializer(employee)
+        if use_snapshot(request):
+            employee = get_object_or_404(Employee, pk=pk)
+            serializer_class = EmployeeSnapshotSerializer
+        else:
+            employee = get_object_or_404(employee_queryset(), pk=pk)
+            serializer_class = EmployeeSerializer
+        serializer = serializer_class(employee)
         return Response({
             'success': True,
             'employee': serializer.data
@@ -75,11 +132,11 @@ class EmployeeDetailAPIView(APIView):
         employee = get_object_or_404(Employee, pk=pk)
         serializer = EmployeeCreateSerializer(employee, data=request.data)
         if serializer.is_valid():
-            employee = serializer.save(created_by=request.user)
+            employee = serializer.save(changed_by=request.user)
             return Response({
                 'success': True,
                 'message': 'Employee updated successfully',
-                'employee': EmployeeSerializer(employee).data
+                'employee': EmployeeSerializer(employee_queryset().get(pk=employee.pk)).data
             })
         return Response({
             'success': False,
@@ -88,8 +145,152 @@ class EmployeeDetailAPIView(APIView):
     
     def delete(self, request, pk):
         employee = get_object_or_404(Employee, pk=pk)
-        employee.delete()
+        delete_employee(employee)
         return Response({
             'success': True,
             'message': 'Employee deleted successfully'
         })
+
+
+class EmployeeHistoryAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        if not Employee.objects.filter(pk=pk).exists():
+            raise Http404
+        changes = FieldChange.objects.filter(employee_id=pk).select_related('form_field', 'changed_by')
+        form_field = request.query_params.get('form_field', '')
+        if form_field.isdigit():
+            changes = changes.filter(form_field_id=form_field)
+        
+        # Newest first; keyset pagination with ?cursor= or ?pagination=cursor, like the list
+        paginator = get_paginator(request)
+        page = paginator.paginate_queryset(changes.order_by('-created_at', '-id'), request)
+        return Response({
+            'success': True,
+            **paginator.get_page_info(),
+            'changes': FieldChangeSerializer(page, many=True).data
+        })
+
+
+class EmployeeImportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def post(self, request):
+        serializer = EmployeeImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        upload = serializer.validated_data['file']
+        fmt = serializer.validated_data.get('format') or detect_format(upload.name)
+        form_template = FormTemplate.objects.get(id=serializer.validated_data['form_template'])
+        
+        importer = EmployeeImporter(
+            form_template,
+            created_by=request.user,
+            chunk_size=serializer.validated_data['chunk_size']
+        )
+        report = importer.run(open_text_stream(upload.file), fmt=fmt)
+        
+        return Response({
+            'success': report['failed'] == 0 and not report['aborted'],
+            'message': f"Imported {report['created']} employees, {report['failed']} rows failed",
+            'report': report
+        })
+
+
+class EmployeeFileUploadAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    
+    def initialize_request(self, request, *args, **kwargs):
+        # Before anything (the CSRF check included) reads the body
+        self.upload_handler = HashingFileUploadHandler(request)
+        request.upload_handlers = [self.upload_handler]
+        return super().initialize_request(request, *args, **kwargs)
+    
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            message = 'File is too large.' if self.upload_handler.too_large else 'No file was submitted.'
+            return Response({
+                'success': False,
+                'errors': {'file': [message]}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        stored_file, created = store_upload(upload)
+        return Response({
+            'success': True,
+            'file': {
+                'reference': file_reference(stored_file, upload.name),
+                'name': clean_file_name(upload.name),
+                'size': stored_file.size,
+                'sha256': stored_file.sha256,
+            },
+            'deduplicated': not created
+        }, status=status.HTTP_201_CREATED)
+
+
+class EmployeeFileDownloadAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk, field_id):
+        field_value = get_object_or_404(
+            EmployeeFieldValue.objects.current(), employee_id=pk, form_field_id=field_id, form_field__field_type='file'
+        )
+        reference = parse_file_reference(field_value.value)
+        if reference is None:
+            raise Http404
+        stored_file = get_object_or_404(StoredFile, sha256=reference[0])
+        return file_response(request, stored_file, reference[1])
+
+
+class EmployeeExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        # ``format`` is reserved by DRF for renderer selection
+        fmt = request.query_params.get('file_format', 'csv')
+        form_template_id = request.query_params.get('form_template')
+        
+        errors = {}
+        if fmt not in EXPORT_FORMATS:
+            errors['file_format'] = [f'Must be one of: {", ".join(EXPORT_FORMATS)}']
+        if not form_template_id:
+            errors['form_template'] = ['This parameter is required.']
+        if errors:
+            return Response({
+                'success': False,
+                'errors': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        form_template = get_object_or_404(FormTemplate, pk=form_template_id)
+        if request.query_params.get('background') == '1':
+            # Written to a file by a job, downloaded from /api/jobs/{id}/download/ once finished
+            job = enqueue('employees.export', created_by=request.user, template_id=form_template.pk, file_format=fmt)
+            return Response({
+                'success': True,
+                'message': 'Export queued',
+                'job': JobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        exporter = EmployeeExporter(form_template)
+        
+        response = StreamingHttpResponse(exporter.stream(fmt), content_type=EXPORT_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="employees-{form_template.id}.{fmt}"'
+        return response
+
+
+class EmployeeStatsAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        # Read from the trigger-maintained counters, not COUNT/GROUP BY over employees
+        return Response({
+            'success': True,
+            'stats': dashboard_stats()
+        })
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class EmployeesConfig(AppConfig):
     name = 'employees'
+    
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .search import install_search_index
+        from .stats import install_counters
+        
+        post_migrate.connect(install_search_index, sender=self)
+        post_migrate.connect(install_counters, sender=self)
@@ -0,0 +1,62 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.exceptions import NotFound
+
+from core.async_api import async_api_view
+from core.pagination import get_paginator
+from forms_builder.schema import aget_form_schema
+
+from .api_views import employee_queryset, filter_employees, use_snapshot
+from .filters import FieldFilterError, parse_field_filters
+from .models import Employee
+from .serializers import EmployeeSerializer, EmployeeSnapshotSerializer
+
+
+async def load_schemas(employees):
+    return {
+        template_id: await aget_form_schema(template_id)
+        for template_id in {employee.form_template_id for employee in employees}
+    }
+
+
+async def serialize(request, employees, many=False):
+    if not use_snapshot(request):
+        return EmployeeSerializer(employees, many=many).data
+    schemas = await load_schemas(employees if many else [employees])
+    return EmployeeSnapshotSerializer(employees, many=many, context={'schemas': schemas}).data
+
+
+@async_api_view
+async def employee_list(request):
+    """Async ``GET /api/employees/``, same parameters and response as EmployeeListAPIView."""
+    employees = Employee.objects.all() if use_snapshot(request) else employee_queryset()
+    
+    try:
+        if request.query_params.get('search') or parse_field_filters(request.query_params):
+            # Search backend detection and field lookups use the sync ORM
+            employees = await sync_to_async(filter_employees)(employees, request.query_params)
+        else:
+            employees = filter_employees(employees, request.query_params)
+    except FieldFilterError as e:
+        return JsonResponse({'success': False, 'errors': e.errors}, status=400)
+    
+    paginator = get_paginator(request)
+    page = await paginator.apaginate_queryset(employees, request)
+    return {
+        'success': True,
+        **paginator.get_page_info(),
+        'employees': await serialize(request, page, many=True)
+    }
+
+
+@async_api_view
+async def employee_detail(request, pk):
+    queryset = Employee.objects.all() if use_snapshot(request) else employee_queryset()
+    try:
+        employee = await queryset.aget(pk=pk)
+    except Employee.DoesNotExist:
+        raise NotFound('No Employee matches the given query.')
+    return {
+        'success': True,
+        'employee': await serialize(request, employee)
+    }
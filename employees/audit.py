@@ -0,0 +1,55 @@
+import functools
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.db import retry_on_lock
+
+from .models import FieldChange
+
+
+FLUSH_BATCH_SIZE = 500
+
+
+def field_changes(employee_id, old_data, cleaned, changed_by=None):
+    """
+    Unsaved FieldChange rows for the values of ``cleaned`` that differ from ``old_data``.
+    
+    ``old_data`` is the ``{field id: value}`` snapshot from before the write,
+    which the write services have at hand, so working out the diff costs no
+    query. Blank values of fields that had none are not changes.
+    """
+    now = timezone.now()
+    changes = []
+    for field, value in cleaned.items():
+        old_value = old_data.get(str(field.id))
+        if (old_value or '') == value:
+            continue
+        changes.append(FieldChange(
+            employee_id=employee_id,
+            form_field_id=field.id,
+            old_value=old_value,
+            new_value=value,
+            changed_by=changed_by,
+            created_at=now
+        ))
+    return changes
+
+
+def record_changes(changes):
+    """
+    Keep field changes in memory and write them once the current transaction commits.
+    
+    The audit INSERT then never runs inside the write transaction, so it does
+    not hold the write lock any longer. The changes are dropped with a
+    rollback (of the transaction or of the savepoint they were recorded in).
+    A failing flush is logged rather than raised: the change itself has
+    committed by then.
+    """
+    if changes:
+        transaction.on_commit(functools.partial(flush_changes, changes), robust=True)
+
+
+@retry_on_lock
+def flush_changes(changes):
+    FieldChange.objects.bulk_create(changes, batch_size=FLUSH_BATCH_SIZE)
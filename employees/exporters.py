@@ -0,0 +1,90 @@
+import csv
+import json
+
+from forms_builder.schema import get_form_schema
+
+from .models import Employee, EmployeeFieldValue
+
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class Echo:
+    """File-like object that hands back what is written, for csv.writer."""
+    
+    def write(self, value):
+        return value
+
+
+class EmployeeExporter:
+    """
+    Pivots the EAV rows of one form template into one wide row per employee.
+    
+    Employees are walked in primary key order with keyset chunks, and the
+    values of each chunk come from a single query sorted by employee, so
+    memory stays bounded by the chunk size regardless of the table size.
+    Values an employee does not have are left blank (null in JSONL).
+    CSV columns are headed with the field labels; JSONL objects are keyed by
+    field id, like the ``data`` snapshot, since labels need not be unique
+    (and a field may be labelled ``id``).
+    """
+    
+    def __init__(self, form_template, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.form_template = form_template
+        self.chunk_size = chunk_size
+        # Columns in form order, from the cached schema rather than the form tables
+        fields = sorted(get_form_schema(form_template.id).fields, key=lambda field: (field.order, field.id))
+        self.fields = [(field.id, field.label) for field in fields]
+    
+    @property
+    def columns(self):
+        return ['id', 'created_at'] + [label for field_id, label in self.fields]
+    
+    def employee_chunks(self):
+        employees = Employee.objects.filter(form_template=self.form_template).order_by('id')
+        last_id = 0
+        while True:
+            chunk = list(employees.filter(id__gt=last_id).values_list('id', 'created_at')[:self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1][0]
+    
+    def iter_rows(self):
+        field_ids = [field_id for field_id, label in self.fields]
+        for chunk in self.employee_chunks():
+            values = EmployeeFieldValue.objects.filter(
+                employee_id__in=[employee_id for employee_id, created_at in chunk],
+                form_field_id__in=field_ids,
+            ).order_by('employee_id').values_list('employee_id', 'form_field_id', 'value')
+            
+            # Both sides are sorted by employee id, so pivot them in one pass
+            values = iter(values)
+            pending = next(values, None)
+            for employee_id, created_at in chunk:
+                row = {}
+                while pending is not None and pending[0] == employee_id:
+                    row[pending[1]] = pending[2]
+                    pending = next(values, None)
+                yield [employee_id, created_at.isoformat()] + [row.get(field_id) for field_id in field_ids]
+    
+    def stream_csv(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.columns)
+        for row in self.iter_rows():
+            yield writer.writerow(row)
+    
+    def stream_jsonl(self):
+        columns = ['id', 'created_at'] + [str(field_id) for field_id, label in self.fields]
+        for row in self.iter_rows():
+            yield json.dumps(dict(zip(columns, row))) + '\n'
+    
+    def stream(self, fmt='csv'):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f'Unsupported export format: {fmt}')
+        return self.stream_csv() if fmt == 'csv' else self.stream_jsonl()
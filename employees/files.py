@@ -0,0 +1,222 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, quote_etag
+
+from .models import EmployeeFieldValue, StoredFile
+
+
+READ_CHUNK_SIZE = 64 * 1024
+FILE_DIR = 'employee_files'
+
+REFERENCE_RE = re.compile(r'^([0-9a-f]{64})/([^/]+)$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Write uploads to a temporary file chunk by chunk, hashing them on the way.
+    
+    Nothing is held in memory whatever the file size, and storing the file
+    afterwards is a rename. Files over ``max_size`` are skipped, with
+    ``too_large`` set.
+    """
+    
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or getattr(settings, 'EMPLOYEE_FILE_MAX_SIZE', 25 * 1024 * 1024)
+        self.too_large = False
+    
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+    
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.too_large = True
+            self.file.close()
+            raise SkipFile()
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+    
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+def clean_file_name(name):
+    name = os.path.basename((name or '').replace('\\', '/')).strip()
+    return name[-200:] or 'file'
+
+
+def file_reference(stored_file, name):
+    return f'{stored_file.sha256}/{clean_file_name(name)}'
+
+
+def parse_file_reference(value):
+    """``(sha256, file name)`` of a file field value, or None if it is not a reference."""
+    match = REFERENCE_RE.match(value or '')
+    return match.groups() if match else None
+
+
+def file_value_error(field):
+    return f'{field.label} must be a file uploaded to /api/employees/files/'
+
+
+def unresolved_file_values(values):
+    """
+    The ``(field id, value)`` pairs among ``values`` that refer to no stored file.
+    
+    ``values`` are ``(field, value)`` pairs of non-blank file field values.
+    References are looked up with a single query, however many there are.
+    Free-text values from before uploads were stored (file names or paths)
+    are accepted where the field already holds them, so that employees
+    keeping such a value can still be saved and exports re-imported; that
+    costs a second query, only when such values are submitted.
+    """
+    references = {}
+    legacy = set()
+    for field, value in values:
+        reference = parse_file_reference(value)
+        if reference is None:
+            legacy.add((field.id, value))
+        else:
+            references[(field.id, value)] = reference[0]
+    
+    unresolved = set()
+    if references:
+        stored = set(StoredFile.objects.filter(sha256__in=set(references.values())).values_list('sha256', flat=True))
+        unresolved.update(key for key, sha256 in references.items() if sha256 not in stored)
+    if legacy:
+        existing = set(EmployeeFieldValue.objects.filter(
+            form_field_id__in={field_id for field_id, value in legacy},
+            value__in={value for field_id, value in legacy}
+        ).values_list('form_field_id', 'value'))
+        unresolved.update(legacy - existing)
+    return unresolved
+
+
+def hash_file(file):
+    hasher = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks(READ_CHUNK_SIZE):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def store_upload(upload):
+    """
+    Store an uploaded file unless the same content is stored already.
+    
+    Returns ``(StoredFile, created)``. Uploads that did not go through
+    HashingFileUploadHandler are hashed here.
+    """
+    sha256 = getattr(upload, 'sha256', None) or hash_file(upload)
+    stored_file = StoredFile.objects.filter(sha256=sha256).first()
+    if stored_file is not None:
+        return stored_file, False
+    
+    name = posixpath.join(FILE_DIR, sha256[:2], sha256)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+    try:
+        with transaction.atomic():
+            return StoredFile.objects.create(sha256=sha256, file=name, size=upload.size), True
+    except IntegrityError:
+        # The same content was stored concurrently; keep the other copy
+        if name != posixpath.join(FILE_DIR, sha256[:2], sha256):
+            default_storage.delete(name)
+        return StoredFile.objects.get(sha256=sha256), False
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) of a single-range ``Range`` header.
+    
+    None when the whole file should be sent (no header, several ranges or a
+    malformed one, which RFC 9110 allows ignoring), and ``()`` when the range
+    cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length and size else ()
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return ()
+    return start, end
+
+
+def read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(READ_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def file_response(request, stored_file, name):
+    """
+    Send a stored file as an attachment named ``name``, honouring ``Range``.
+    
+    Single byte ranges are answered with 206 (or 416), with ``If-Range``
+    checked against the ETag, which is the content hash. ``If-None-Match``
+    gives 304. Full downloads go through FileResponse, so WSGI servers can
+    use sendfile.
+    """
+    etag = quote_etag(stored_file.sha256)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, no-cache',
+        'Content-Disposition': content_disposition_header(True, name),
+    }
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponse(status=304, headers=headers)
+    
+    size = stored_file.size
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range is not None and if_range is not None and if_range != etag:
+        byte_range = None
+    
+    if byte_range == ():
+        return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+    file = stored_file.file.open('rb')
+    if byte_range is None:
+        return FileResponse(file, as_attachment=True, filename=name, content_type=content_type, headers=headers)
+    
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        read_range(file, start, end - start + 1), status=206, content_type=content_type, headers=headers
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
@@ -0,0 +1,77 @@
+import re
+
+from forms_builder.models import FormField
+
+from .models import EmployeeFieldValue
+from .validation import TYPED_COLUMNS, to_python
+
+
+FIELD_FILTER_RE = re.compile(r'^field:(?P<field_id>\d+)(?:__(?P<op>[a-z]+))?$')
+RANGE_OPERATORS = ('exact', 'gt', 'gte', 'lt', 'lte')
+TEXT_OPERATORS = ('exact', 'iexact', 'icontains')
+
+
+class FieldFilterError(ValueError):
+    
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def parse_field_filters(params):
+    """Collect ``field:<id>__<op>=<value>`` query parameters as (field_id, op, raw value)."""
+    filters = []
+    for key in params:
+        match = FIELD_FILTER_RE.match(key)
+        if match:
+            filters.append((int(match['field_id']), match['op'] or 'exact', params[key], key))
+    return filters
+
+
+def apply_field_filters(queryset, params, form_template_id=None):
+    """
+    Filter employees on individual field values.
+    
+    Number, date and checkbox fields are compared on their typed shadow
+    column, so each filter is an index range scan on (form_field, column).
+    Other field types support exact/iexact/icontains on the text value.
+    With ``form_template_id`` only fields of that template can be filtered on.
+    """
+    filters = parse_field_filters(params)
+    if not filters:
+        return queryset
+    
+    fields = FormField.objects.all()
+    if form_template_id is not None:
+        fields = fields.filter(form_template_id=form_template_id)
+    fields = fields.in_bulk({field_id for field_id, op, raw, key in filters})
+    errors = {}
+    for field_id, op, raw, key in filters:
+        field = fields.get(field_id)
+        if field is None:
+            errors[key] = 'Unknown form field'
+            continue
+        
+        column = TYPED_COLUMNS.get(field.field_type)
+        if column:
+            if op not in RANGE_OPERATORS:
+                errors[key] = f'Operator must be one of: {", ".join(RANGE_OPERATORS)}'
+                continue
+            value = to_python(field.field_type, raw)
+            if value is None:
+                errors[key] = f'Invalid {field.field_type} value'
+                continue
+        else:
+            if op not in TEXT_OPERATORS:
+                errors[key] = f'Operator must be one of: {", ".join(TEXT_OPERATORS)}'
+                continue
+            column, value = 'value', raw
+        
+        matching = EmployeeFieldValue.objects.filter(
+            form_field_id=field_id, **{f'{column}__{op}': value}
+        ).values('employee_id')
+        queryset = queryset.filter(id__in=matching)
+    
+    if errors:
+        raise FieldFilterError(errors)
+    return queryset
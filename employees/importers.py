@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+
+from .files import file_value_error, unresolved_file_values
+from .models import Employee, EmployeeFieldValue
+from .validation import clean_field_value
+from core.db import retry_on_lock
+from forms_builder.aggregations import invalidate_aggregations
+from forms_builder.schema import get_form_schema
+
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_csv_rows(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        # Row numbers match the line in the file, the header being line 1
+        yield reader.line_num, row
+
+
+def iter_jsonl_rows(stream):
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValidationError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(row, dict):
+            yield line_no, ValidationError('Each line must be a JSON object')
+            continue
+        yield line_no, row
+
+
+def open_text_stream(fileobj):
+    """Wrap a binary upload in a decoding stream without reading it into memory."""
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+
+
+class EmployeeImporter:
+    """
+    Streams CSV/JSONL rows into employees of a single form template.
+    
+    Columns are matched to form fields by id or (case-insensitive) label.
+    Rows are validated one by one and written in chunks, each chunk in its
+    own transaction, so a bad row only ends up in the error report.
+    """
+    
+    def __init__(self, form_template, created_by, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.form_template = form_template
+        self.created_by = created_by
+        self.chunk_size = max(1, min(int(chunk_size), MAX_CHUNK_SIZE))
+        
+        self.fields = get_form_schema(form_template.id).fields
+        self.field_types = {field.id: field.field_type for field in self.fields}
+        self.file_fields = [field for field in self.fields if field.field_type == 'file']
+        self.fields_by_key = {}
+        for field in self.fields:
+            self.fields_by_key[str(field.id)] = field
+            self.fields_by_key.setdefault(field.label.strip().lower(), field)
+        self._column_cache = {}
+        
+        self.created = 0
+        self.failed = 0
+        self.rows_processed = 0
+        self.errors = []
+        self.unknown_columns = set()
+        self.aborted = None
+    
+    def resolve_column(self, column):
+        if column is None:
+            # csv.DictReader puts surplus cells of a row under the None key
+            return None
+        if column not in self._column_cache:
+            field = self.fields_by_key.get(str(column).strip().lower())
+            if field is None:
+                self.unknown_columns.add(str(column))
+            self._column_cache[column] = field
+        return self._column_cache[column]
+    
+    def clean_row(self, row):
+        values = {}
+        errors = {}
+        for column, raw in row.items():
+            field = self.resolve_column(column)
+            if field is None:
+                continue
+            try:
+                value = clean_field_value(field, raw)
+            except ValidationError as e:
+                errors[field.label] = e.messages[0]
+                continue
+            if value != '':
+                values[field.id] = value
+        
+        for field in self.fields:
+            if field.required and field.id not in values and field.label not in errors:
+                errors[field.label] = f'{field.label} is required'
+        
+        if errors:
+            raise ValidationError(errors)
+        return values
+    
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+    
+    def run(self, stream, fmt='csv'):
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f'Unsupported import format: {fmt}')
+        
+        rows = iter_csv_rows(stream) if fmt == 'csv' else iter_jsonl_rows(stream)
+        chunk = []
+        try:
+            for row_number, row in rows:
+                self.rows_processed += 1
+                if isinstance(row, ValidationError):
+                    self.add_error(row_number, {'row': row.messages[0]})
+                    continue
+                try:
+                    values = self.clean_row(row)
+                except ValidationError as e:
+                    self.add_error(row_number, {k: v[0] for k, v in e.message_dict.items()})
+                    continue
+                
+                chunk.append((row_number, values))
+                if len(chunk) >= self.chunk_size:
+                    self.write_chunk(chunk)
+                    chunk = []
+        except (csv.Error, UnicodeDecodeError) as e:
+            # The rest of the stream is unreadable; keep what was already parsed
+            self.aborted = f'Could not read file after row {self.rows_processed}: {e}'
+        
+        if chunk:
+            self.write_chunk(chunk)
+        
+        return self.report()
+    
+    def check_files(self, chunk):
+        """The rows of ``chunk`` whose file values all resolve; the others are reported."""
+        values = [
+            (field, values[field.id])
+            for row_number, values in chunk
+            for field in self.file_fields if field.id in values
+        ]
+        unresolved = unresolved_file_values(values) if values else set()
+        if not unresolved:
+            return chunk
+        
+        kept = []
+        for row_number, values in chunk:
+            errors = {
+                field.label: file_value_error(field)
+                for field in self.file_fields if (field.id, values.get(field.id)) in unresolved
+            }
+            if errors:
+                self.add_error(row_number, errors)
+            else:
+                kept.append((row_number, values))
+        return kept
+    
+    def write_chunk(self, chunk):
+        try:
+            # One lookup of the referenced files for the whole chunk
+            chunk = self.check_files(chunk)
+            if not chunk:
+                return
+            self.insert_chunk(chunk)
+        except DatabaseError as e:
+            for row_number, values in chunk:
+                self.add_error(row_number, {'row': f'Database error: {e}'})
+            return
+        self.created += len(chunk)
+    
+    @retry_on_lock
+    def insert_chunk(self, chunk):
+        with transaction.atomic():
+            employees = self.create_employees([values for row_number, values in chunk])
+            field_values = [
+                EmployeeFieldValue.build(
+                    self.field_types[field_id], employee=employee, form_field_id=field_id, value=value
+                )
+                for employee, (row_number, values) in zip(employees, chunk)
+                for field_id, value in values.items()
+            ]
+            EmployeeFieldValue.objects.bulk_create(field_values, batch_size=1000)
+            invalidate_aggregations(self.form_template.id)
+    
+    def create_employees(self, rows):
+        employees = [
+            Employee(
+                form_template=self.form_template,
+                created_by=self.created_by,
+                data={str(field_id): value for field_id, value in values.items()}
+            )
+            for values in rows
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            return Employee.objects.bulk_create(employees)
+        # Without RETURNING support bulk_create leaves pks unset
+        for employee in employees:
+            employee.save()
+        return employees
+    
+    def report(self):
+        return {
+            'form_template': self.form_template.id,
+            'rows_processed': self.rows_processed,
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'unknown_columns': sorted(self.unknown_columns),
+            'aborted': self.aborted,
+        }
@@ -0,0 +1,341 @@
+import hashlib
+import io
+import json
+import platform
+import posixpath
+import statistics
+import time
+import tracemalloc
+import uuid
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.instrumentation import capture_queries
+from employees.files import FILE_DIR, parse_file_reference
+from employees.models import Employee, StoredFile
+from employees.services import build_snapshot, create_employee
+from forms_builder.models import FormTemplate
+from forms_builder.schema import get_form_schema
+from jobs.queue import claim_jobs, enqueue, run_job, worker_name
+
+
+BENCHMARK_PASSWORD = 'bench-pass-123!'
+OTHER_PASSWORD = 'bench-pass-456!'
+# Committed before the measured (rolled back) transaction: logins authenticate
+# on the hashing executor's threads, which do not see uncommitted rows
+LOGIN_USERNAME = 'benchmark_login'
+UPLOAD_CONTENT = b'%PDF-1.4 benchmark upload'
+
+
+def api_route_names(patterns=None, prefix=''):
+    """URL names of every route mounted under ``api/``, in URLconf order."""
+    names = []
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            names += api_route_names(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern) and pattern.name and route.startswith('api/'):
+            names.append(pattern.name)
+    return names
+
+
+def percentile(timings, pct):
+    if len(timings) == 1:
+        return timings[0]
+    return statistics.quantiles(timings, n=100, method='inclusive')[pct - 1]
+
+
+class Command(BaseCommand):
+    help = 'Time every API route through the test client and write latency, query and memory figures as JSON'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='User to authenticate as (defaults to the first seeded user)')
+        parser.add_argument('--template', type=int, help='Form template used by the employee routes')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', action='append', default=[], help='Only run these URL names')
+        parser.add_argument('--output', default='benchmark.json')
+    
+    def handle(self, *args, **options):
+        self.setup(options)
+        
+        results = {}
+        self.stdout.write(f'{"scenario":<32}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>8}{"peak memory":>15}')
+        setup_test_environment()
+        try:
+            # Everything the write scenarios change is rolled back at the end
+            with transaction.atomic():
+                for label, url_name, method, prepare in self.scenarios():
+                    if options['only'] and url_name not in options['only']:
+                        continue
+                    results[label] = self.measure(url_name, method, prepare, options['repeat'], options['warmup'])
+                    self.report_line(label, results[label])
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+            self.cleanup()
+        
+        covered = {result['route'] for result in results.values()}
+        missing = [name for name in api_route_names() if name not in covered]
+        if missing and not options['only']:
+            self.stdout.write(self.style.WARNING(f'No scenario for: {", ".join(missing)}'))
+        
+        output = {
+            'created_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': self.form_template._state.db,
+                'employees': Employee.objects.count(),
+                'employees_in_template': Employee.objects.filter(form_template=self.form_template).count(),
+                'fields_in_template': len(self.schema.fields),
+            },
+            'repeat': options['repeat'],
+            'routes_without_scenario': missing,
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+    
+    def setup(self, options):
+        User = get_user_model()
+        users = User.objects.order_by('id')
+        self.user = users.filter(username=options['user'] or 'seed_user_0').first()
+        if self.user is None:
+            raise CommandError('No benchmark user found; pass --user or run seed_ems first')
+        
+        templates = FormTemplate.objects.filter(employees__isnull=False).distinct().order_by('id')
+        if options['template']:
+            templates = FormTemplate.objects.filter(pk=options['template'])
+        self.form_template = templates.first()
+        if self.form_template is None:
+            raise CommandError('No form template with employees found; run seed_ems first')
+        
+        self.schema = get_form_schema(self.form_template.id)
+        self.employee = Employee.objects.filter(form_template=self.form_template).order_by('id').first()
+        if self.employee is None:
+            raise CommandError(f'Form template {self.form_template.id} has no employees')
+        self.values = self.employee.data or build_snapshot([self.employee.id])[self.employee.id]
+        self.search_term = next((value.split()[0] for value in self.values.values() if value.strip()), 'a')
+        
+        self.file_field = next(
+            (field for field in self.schema.fields
+             if field.field_type == 'file' and parse_file_reference(self.values.get(str(field.id), ''))),
+            None
+        )
+        self.login_user = User.objects.filter(username=LOGIN_USERNAME).first() or User.objects.create_user(
+            username=LOGIN_USERNAME, password=BENCHMARK_PASSWORD
+        )
+        self.export_job = None
+        
+        self.client = Client()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+    
+    def cleanup(self):
+        # Files written to storage outlive the rolled back rows that name them
+        names = []
+        if self.export_job is not None:
+            names.append(self.export_job.result['file'])
+        sha256 = hashlib.sha256(UPLOAD_CONTENT).hexdigest()
+        if not StoredFile.objects.filter(sha256=sha256).exists():
+            names.append(posixpath.join(FILE_DIR, sha256[:2], sha256))
+        for name in names:
+            if default_storage.exists(name):
+                default_storage.delete(name)
+        self.login_user.delete()
+    
+    def scenarios(self):
+        """(label, URL name, method, prepare); ``prepare`` returns the URL args and request kwargs."""
+        employee_id = self.employee.id
+        template_id = self.form_template.id
+        first_field = self.schema.fields[0]
+        as_json = {'content_type': 'application/json'}
+        
+        def static(args=(), **kwargs):
+            return lambda: (args, kwargs)
+        
+        def set_password():
+            self.user.set_password(BENCHMARK_PASSWORD)
+            self.user.save(update_fields=['password'])
+        
+        def login():
+            return (), {'data': {'username': LOGIN_USERNAME, 'password': BENCHMARK_PASSWORD}, **as_json}
+        
+        def change_password():
+            set_password()
+            data = {'old_password': BENCHMARK_PASSWORD, 'new_password': OTHER_PASSWORD, 'new_password2': OTHER_PASSWORD}
+            return (), {'data': data, **as_json}
+        
+        def register():
+            username = f'bench_{uuid.uuid4().hex[:12]}'
+            data = {
+                'username': username,
+                'email': f'{username}@example.com',
+                'password': BENCHMARK_PASSWORD,
+                'password2': BENCHMARK_PASSWORD,
+            }
+            return (), {'data': data, **as_json}
+        
+        def refresh_token():
+            return (), {'data': {'refresh': str(RefreshToken.for_user(self.user))}, **as_json}
+        
+        def throwaway_employee():
+            cleaned = {self.schema.get_field(field_id): value for field_id, value in self.values.items()}
+            cleaned = {field: value for field, value in cleaned.items() if field is not None}
+            return (create_employee(self.schema, cleaned, self.user).id,), {}
+        
+        def template_body(name):
+            return {
+                'name': name,
+                'description': 'Benchmark template',
+                'fields': [
+                    {'label': f'Field {i}', 'field_type': 'text', 'required': False, 'order': i}
+                    for i in range(10)
+                ],
+            }
+        
+        def throwaway_template():
+            response = self.client.post(reverse('api_form_list'), template_body('Benchmark'), **as_json)
+            return response.json()['form_template']
+        
+        def update_template():
+            form_template = throwaway_template()
+            return (form_template['id'],), {'data': template_body('Benchmark (edited)'), **as_json}
+        
+        def delete_template():
+            return (throwaway_template()['id'],), {}
+        
+        def reorder():
+            form_template = throwaway_template()
+            field_order = [field['id'] for field in reversed(form_template['fields'])]
+            return (form_template['id'],), {'data': {'field_order': field_order}, **as_json}
+        
+        def import_file():
+            fields = [field for field in self.schema.fields if str(field.id) in self.values]
+            buffer = io.StringIO()
+            buffer.write(','.join(str(field.id) for field in fields) + '\n')
+            row = ','.join(json.dumps(self.values[str(field.id)]) for field in fields)
+            for _ in range(100):
+                buffer.write(row + '\n')
+            upload = SimpleUploadedFile('employees.csv', buffer.getvalue().encode(), content_type='text/csv')
+            return (), {'data': {'file': upload, 'form_template': template_id}}
+        
+        def upload_file():
+            upload = SimpleUploadedFile('benchmark.pdf', UPLOAD_CONTENT, content_type='application/pdf')
+            return (), {'data': {'file': upload}}
+        
+        def export_job():
+            # One finished export, written by the task itself, for the job routes
+            if self.export_job is None:
+                job = enqueue('employees.export', created_by=self.user, template_id=template_id)
+                self.export_job = run_job(claim_jobs(worker_name('benchmark'), ids=[job.pk])[0])
+            return (self.export_job.pk,), {}
+        
+        employee_body = {'form_template': template_id, 'field_values': self.values}
+        file_scenarios = []
+        if self.file_field is not None:
+            file_scenarios.append(('employees.file', 'api_employee_file', 'get', static((employee_id, self.file_field.id))))
+        return [
+            ('auth.login', 'api_login', 'post', login),
+            ('auth.register', 'api_register', 'post', register),
+            ('auth.profile', 'api_profile', 'get', static()),
+            ('auth.profile.update', 'api_profile', 'put', static(data={'first_name': 'Bench'}, **as_json)),
+            ('auth.change_password', 'api_change_password', 'post', change_password),
+            ('auth.logout', 'api_logout', 'post', refresh_token),
+            ('auth.token_refresh', 'token_refresh', 'post', refresh_token),
+            ('forms.list', 'api_form_list', 'get', static()),
+            ('forms.list.cursor', 'api_form_list', 'get', static(data={'pagination': 'cursor'})),
+            ('forms.create', 'api_form_list', 'post', static(data=template_body('Benchmark'), **as_json)),
+            ('forms.detail', 'api_form_detail', 'get', static((template_id,))),
+            ('forms.update', 'api_form_detail', 'put', update_template),
+            ('forms.delete', 'api_form_detail', 'delete', delete_template),
+            ('forms.reorder', 'api_form_reorder', 'post', reorder),
+            ('forms.aggregations', 'api_form_aggregations', 'get', static((template_id,))),
+            ('employees.list', 'api_employee_list', 'get', static()),
+            ('employees.list.page_100', 'api_employee_list', 'get', static(data={'page_size': 100})),
+            ('employees.list.cursor', 'api_employee_list', 'get', static(data={'pagination': 'cursor'})),
+            ('employees.list.snapshot', 'api_employee_list', 'get', static(data={'mode': 'snapshot'})),
+            ('employees.list.template', 'api_employee_list', 'get', static(data={'form_template': template_id})),
+            ('employees.list.search', 'api_employee_list', 'get', static(data={'search': self.search_term})),
+            ('employees.list.field_filter', 'api_employee_list', 'get',
+             static(data={f'field:{first_field.id}__exact': self.values.get(str(first_field.id), '')})),
+            ('employees.create', 'api_employee_list', 'post', static(data=employee_body, **as_json)),
+            ('employees.detail', 'api_employee_detail', 'get', static((employee_id,))),
+            ('employees.detail.snapshot', 'api_employee_detail', 'get', static((employee_id,), data={'mode': 'snapshot'})),
+            ('employees.update', 'api_employee_detail', 'put', static((employee_id,), data=employee_body, **as_json)),
+            ('employees.delete', 'api_employee_detail', 'delete', throwaway_employee),
+            ('employees.import', 'api_employee_import', 'post', import_file),
+            ('employees.export', 'api_employee_export', 'get', static(data={'form_template': template_id})),
+            ('employees.export.background', 'api_employee_export', 'get',
+             static(data={'form_template': template_id, 'background': 1})),
+            ('employees.files.upload', 'api_employee_file_upload', 'post', upload_file),
+            *file_scenarios,
+            ('employees.history', 'api_employee_history', 'get', static((employee_id,))),
+            ('employees.stats', 'api_employee_stats', 'get', static()),
+            ('jobs.list', 'api_job_list', 'get', static()),
+            ('jobs.detail', 'api_job_detail', 'get', export_job),
+            ('jobs.download', 'api_job_download', 'get', export_job),
+        ]
+    
+    def request(self, url_name, method, prepare):
+        args, kwargs = prepare()
+        url = reverse(url_name, args=args)
+        with capture_queries() as stats:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, **kwargs)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = (time.perf_counter() - started) * 1000
+        return response, elapsed, stats.count
+    
+    def measure(self, url_name, method, prepare, repeat, warmup):
+        for _ in range(warmup):
+            self.request(url_name, method, prepare)
+        
+        timings = []
+        queries = []
+        statuses = set()
+        for _ in range(repeat):
+            response, elapsed, count = self.request(url_name, method, prepare)
+            timings.append(elapsed)
+            queries.append(count)
+            statuses.add(response.status_code)
+        
+        # Separate run, tracemalloc slows everything down too much to time with it on
+        tracemalloc.start()
+        try:
+            self.request(url_name, method, prepare)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        
+        return {
+            'route': url_name,
+            'method': method.upper(),
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'max_ms': round(max(timings), 3),
+            'queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+    
+    def report_line(self, label, result):
+        style = self.style.WARNING if any(code >= 400 for code in result['status']) else (lambda text: text)
+        self.stdout.write(style(
+            f'{label:<32}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+            f'{result["queries"]:>8}{result["peak_memory_kb"]:>12.1f} KB  {result["status"]}'
+        ))
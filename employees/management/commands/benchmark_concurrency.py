@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+from employees.models import Employee
+from forms_builder.models import FormTemplate
+
+from .benchmark_api import percentile
+
+
+MODES = {
+    # mode: (entry point, ASYNC_API_VIEWS)
+    'wsgi': ('wsgi', False),
+    'asgi-sync': ('asgi', False),
+    'asgi-async': ('asgi', True),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare API throughput under many slow clients for WSGI workers, ASGI with the sync views '
+        'and ASGI with the async views'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, action='append',
+                            help='Modes to run (default: all, each in its own process)')
+        parser.add_argument('--clients', type=int, default=100, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=5, help='Requests per client')
+        parser.add_argument('--client-delay', type=float, default=50,
+                            help='Milliseconds each client takes to send its request and again to read the response')
+        parser.add_argument('--wsgi-workers', type=int, default=8,
+                            help='Worker threads of the simulated WSGI server')
+        parser.add_argument('--user', help='User to authenticate as (defaults to the first user)')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+        parser.add_argument('--child', action='store_true', help='Internal: run one mode and print JSON')
+    
+    def handle(self, *args, **options):
+        modes = options['mode'] or list(MODES)
+        if options['child']:
+            self.stdout.write(json.dumps(self.run_mode(modes[0], options)))
+            return
+        
+        results = {}
+        for mode in modes:
+            results[mode] = self.spawn(mode, options)
+            self.report_line(mode, results[mode])
+        
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'options': self.describe(options), 'results': results}, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+    
+    def describe(self, options):
+        return {key: options[key] for key in ('clients', 'requests', 'client_delay', 'wsgi_workers')}
+    
+    def spawn(self, mode, options):
+        """Run one mode in a fresh process: ASYNC_API_VIEWS is read when the URLconf is loaded."""
+        command = [sys.executable, sys.argv[0], 'benchmark_concurrency', '--child', '--mode', mode]
+        for key, value in self.describe(options).items():
+            command += [f'--{key.replace("_", "-")}', str(value)]
+        if options['user']:
+            command += ['--user', options['user']]
+        
+        env = {**os.environ, 'EMS_ASYNC_API_VIEWS': '1' if MODES[mode][1] else '0'}
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise CommandError(f'{mode} run failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    
+    def report_line(self, mode, result):
+        self.stdout.write(
+            f'{mode:<12}{result["throughput"]:>10.1f} req/s   p50 {result["p50_ms"]:>8.1f} ms   '
+            f'p95 {result["p95_ms"]:>8.1f} ms   errors {result["errors"]}'
+        )
+    
+    def paths(self):
+        employee = Employee.objects.order_by('id').first()
+        form_template = FormTemplate.objects.order_by('id').first()
+        if employee is None or form_template is None:
+            raise CommandError('Nothing to request; run seed_ems first')
+        return [
+            '/api/employees/',
+            f'/api/employees/{employee.id}/',
+            '/api/employees/?mode=snapshot',
+            '/api/forms/',
+            f'/api/forms/{form_template.id}/',
+        ]
+    
+    def run_mode(self, mode, options):
+        server, async_views = MODES[mode]
+        if settings.ASYNC_API_VIEWS != async_views:
+            raise CommandError(f'{mode} needs EMS_ASYNC_API_VIEWS={int(async_views)}')
+        
+        users = CustomUser.objects.order_by('id')
+        user = users.filter(username=options['user']).first() if options['user'] else users.first()
+        if user is None:
+            raise CommandError('No user to authenticate as')
+        token = str(RefreshToken.for_user(user).access_token)
+        paths = self.paths()
+        delay = options['client_delay'] / 1000
+        requests = [paths[i % len(paths)] for i in range(options['requests'])]
+        
+        if server == 'wsgi':
+            timings, errors, elapsed = self.run_wsgi(requests, token, delay, options)
+        else:
+            timings, errors, elapsed = asyncio.run(self.run_asgi(requests, token, delay, options))
+        
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'elapsed_s': round(elapsed, 3),
+            'throughput': round(len(timings) / elapsed, 2),
+            'p50_ms': round(percentile(timings, 50) * 1000, 2),
+            'p95_ms': round(percentile(timings, 95) * 1000, 2),
+        }
+    
+    def run_wsgi(self, requests, token, delay, options):
+        """
+        Thread pool standing in for a synchronous WSGI server.
+        
+        A sync worker is tied up while its client is slowly sending the request
+        and reading the response, so the client delay is spent inside the worker.
+        """
+        from core.wsgi import application
+        
+        timings = []
+        errors = []
+        lock = threading.Lock()
+        
+        def handle(path):
+            path, _, query = path.partition('?')
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'wsgi.input': BytesIO(b''), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            statuses = []
+            time.sleep(delay)
+            body = application(environ, lambda status, headers: statuses.append(status))
+            for _ in body:
+                pass
+            body.close()
+            time.sleep(delay)
+            return statuses[0]
+        
+        def client(executor):
+            # Each client waits for its previous response before sending the next request,
+            # and the time spent queueing for a free worker counts towards its latency
+            for path in requests:
+                started = time.perf_counter()
+                status = executor.submit(handle, path).result()
+                with lock:
+                    timings.append(time.perf_counter() - started)
+                    if not status.startswith('200'):
+                        errors.append(status)
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['wsgi_workers']) as executor:
+            with ThreadPoolExecutor(max_workers=options['clients']) as clients:
+                list(clients.map(lambda _: client(executor), range(options['clients'])))
+        return timings, len(errors), time.perf_counter() - started
+    
+    async def run_asgi(self, requests, token, delay, options):
+        """Drive the ASGI application directly, with clients that are slow to send and to read."""
+        from core.asgi import application
+        
+        timings = []
+        errors = []
+        
+        async def handle(path):
+            path, _, query = path.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+                'root_path': '', 'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+            }
+            status = []
+            disconnect = asyncio.Event()
+            
+            async def receive():
+                if status:
+                    await disconnect.wait()
+                    return {'type': 'http.disconnect'}
+                await asyncio.sleep(delay)
+                status.append(None)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status[0] = message['status']
+                elif not message.get('more_body'):
+                    await asyncio.sleep(delay)
+            
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            disconnect.set()
+            timings.append(time.perf_counter() - started)
+            if status[0] != 200:
+                errors.append(status[0])
+        
+        async def client():
+            for path in requests:
+                await handle(path)
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        return timings, len(errors), time.perf_counter() - started
@@ -0,0 +1,50 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from employees.models import Employee, EmployeeFieldValue
+from employees.search import IContainsSearchBackend, get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Compare the full-text search index with the icontains scan on the current data'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='+', help='Search terms to time')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+    
+    def handle(self, *args, **options):
+        using = options['database']
+        fulltext = get_search_backend(using)
+        if fulltext.name == 'icontains':
+            raise CommandError('No full-text index is available; run rebuild_search_index first')
+        
+        self.stdout.write(
+            f'{Employee.objects.using(using).count()} employees, '
+            f'{EmployeeFieldValue.objects.using(using).count()} values, '
+            f'{options["repeat"]} runs per query\n'
+        )
+        self.stdout.write(f'{"query":<24}{"backend":<14}{"matches":>10}{"p50 ms":>10}{"max ms":>10}')
+        for query in options['queries']:
+            for backend in (IContainsSearchBackend(using), fulltext):
+                matches, timings = self.run(backend, query, options['repeat'], options['page_size'], using)
+                self.stdout.write(
+                    f'{query[:23]:<24}{backend.name:<14}{matches:>10}'
+                    f'{statistics.median(timings):>10.2f}{max(timings):>10.2f}'
+                )
+    
+    def run(self, backend, query, repeat, page_size, using):
+        timings = []
+        matches = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            employees = backend.filter(Employee.objects.using(using).all(), query)
+            # What a list request does: count the matches and load one page
+            matches = employees.count()
+            list(employees[:page_size])
+            timings.append((time.perf_counter() - started) * 1000)
+        return matches, timings
@@ -0,0 +1,66 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.importers import (
+    IMPORT_FORMATS, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE, EmployeeImporter, detect_format,
+)
+from forms_builder.models import FormTemplate
+
+
+class Command(BaseCommand):
+    help = 'Stream employees from a CSV or JSONL file into a form template'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file, or - for stdin')
+        parser.add_argument('--template', type=int, required=True, help='Form template id')
+        parser.add_argument('--user', required=True, help='Username recorded as created_by')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f'Rows per transaction (max {MAX_CHUNK_SIZE})')
+        parser.add_argument('--report', help='Write the full JSON report to this file')
+    
+    def handle(self, *args, **options):
+        try:
+            form_template = FormTemplate.objects.get(pk=options['template'])
+        except FormTemplate.DoesNotExist:
+            raise CommandError(f"Form template {options['template']} does not exist")
+        
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+        
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        importer = EmployeeImporter(form_template, created_by=user, chunk_size=options['chunk_size'])
+        
+        if path == '-':
+            report = importer.run(sys.stdin, fmt=fmt)
+        else:
+            try:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    report = importer.run(stream, fmt=fmt)
+            except OSError as e:
+                raise CommandError(str(e))
+        
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
+        
+        for error in report['errors'][:20]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if report['errors_truncated'] or len(report['errors']) > 20:
+            self.stderr.write('... more errors omitted, use --report for the full list')
+        if report['unknown_columns']:
+            self.stdout.write(f"Ignored columns: {', '.join(report['unknown_columns'])}")
+        if report['aborted']:
+            self.stderr.write(report['aborted'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {report['rows_processed']} rows: "
+            f"{report['created']} created, {report['failed']} failed"
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from employees.services import purge_deleted_fields
+
+
+class Command(BaseCommand):
+    help = 'Delete the employee values of form fields removed from their template, in small chunks'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows deleted per transaction')
+    
+    def handle(self, *args, **options):
+        purged = purge_deleted_fields(chunk_size=options['chunk_size'])
+        for field_id, deleted in purged.items():
+            self.stdout.write(f'Field {field_id}: deleted {deleted} values')
+        self.stdout.write(self.style.SUCCESS(f'Purged {len(purged)} removed fields'))
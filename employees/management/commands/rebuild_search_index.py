@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from employees.search import get_search_backend, install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Create the employee full-text search index if missing and rebuild it from the value table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+    
+    def handle(self, *args, **options):
+        using = options['database']
+        backend = get_search_backend(using, check_available=False)
+        if backend.name == 'icontains':
+            raise CommandError('The configured database has no full-text search backend')
+        
+        install_search_index(sender=None, using=using)
+        if not backend.is_available():
+            raise CommandError(f'Could not install the {backend.name} search index')
+        
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the {backend.name} employee search index'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from employees.stats import TriggerCounters, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount employees per template, creator and day, and report drift from the counters table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite the counters table with the recount')
+    
+    def handle(self, *args, **options):
+        if not TriggerCounters().is_available():
+            self.stdout.write(self.style.WARNING(
+                'Counter triggers are not installed on this database; the dashboard counts live'
+            ))
+        
+        drift = reconcile(fix=options['fix'])
+        for (kind, key), (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'{kind} {key}: stored {stored}, actual {actual}')
+        
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Counters match'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} counters'))
+        else:
+            self.stdout.write(self.style.ERROR(f'{len(drift)} counters drifted; run with --fix to rewrite them'))
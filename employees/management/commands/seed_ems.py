@@ -0,0 +1,174 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from employees.files import file_reference, store_upload
+from employees.models import Employee, EmployeeFieldValue
+from forms_builder.aggregations import invalidate_aggregations
+from forms_builder.models import FormTemplate, FormField
+
+
+FIRST_NAMES = ['James', 'Mary', 'Aisha', 'Wei', 'Carlos', 'Fatima', 'Ivan', 'Priya', 'Kenji', 'Olivia', 'Omar', 'Sofia']
+LAST_NAMES = ['Smith', 'Khan', 'Garcia', 'Chen', 'Nair', 'Ivanova', 'Okafor', 'Muller', 'Tanaka', 'Rossi', 'Silva']
+DEPARTMENTS = ['Engineering', 'Sales', 'Marketing', 'Finance', 'HR', 'Support', 'Operations']
+JOB_TITLES = ['Engineer', 'Senior Engineer', 'Manager', 'Analyst', 'Designer', 'Accountant', 'Recruiter']
+WORDS = ['reliable', 'team', 'project', 'customer', 'remote', 'training', 'review', 'onboarding', 'goals', 'quarterly']
+
+# Labels used for each field type, cycled through when a template has several fields of a type
+FIELD_LABELS = {
+    'text': ['Full name', 'Job title', 'City', 'Manager'],
+    'number': ['Salary', 'Age', 'Years of experience', 'Leave balance'],
+    'email': ['Work email', 'Personal email'],
+    'password': ['Portal password'],
+    'date': ['Date of joining', 'Date of birth', 'Contract end'],
+    'textarea': ['Notes', 'Address'],
+    'select': ['Department', 'Employment type'],
+    'checkbox': ['Remote', 'Probation completed'],
+    'file': ['Resume'],
+}
+SELECT_OPTIONS = {
+    'Department': DEPARTMENTS,
+    'Employment type': ['Full time', 'Part time', 'Contract', 'Intern'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Generate users, form templates with every field type, and employees with realistic values'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--templates', type=int, default=5)
+        parser.add_argument('--fields', type=int, default=len(FormField.FIELD_TYPES),
+                            help='Fields per template; every field type is used at least once')
+        parser.add_argument('--employees', type=int, default=1000, help='Employees per template')
+        parser.add_argument('--password', default='seed-pass-123', help='Password of the generated users')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        if options['fields'] < len(FormField.FIELD_TYPES):
+            raise CommandError(f'--fields must be at least {len(FormField.FIELD_TYPES)} to cover every field type')
+        
+        self.random = random.Random(options['seed'])
+        users = self.create_users(options['users'], options['password'])
+        self.stored_files = self.create_files()
+        
+        for n in range(options['templates']):
+            form_template, fields = self.create_template(n, self.random.choice(users), options['fields'])
+            self.create_employees(form_template, fields, users, options['employees'], options['chunk_size'])
+            self.stdout.write(f'{form_template.name}: {len(fields)} fields, {options["employees"]} employees')
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users, {options["templates"]} templates and '
+            f'{options["templates"] * options["employees"]} employees'
+        ))
+    
+    def create_users(self, count, password):
+        User = get_user_model()
+        users = []
+        for n in range(count):
+            user, created = User.objects.get_or_create(
+                username=f'seed_user_{n}',
+                defaults={'email': f'seed_user_{n}@example.com'}
+            )
+            if created:
+                user.set_password(password)
+                user.save(update_fields=['password'])
+            users.append(user)
+        return users
+    
+    def create_files(self, count=20):
+        """Small stored files for the file fields to refer to, as if they had been uploaded."""
+        files = []
+        for n in range(count):
+            content = f'%PDF-1.4\n% Seed resume {n}\n'.encode() + self.random.randbytes(512)
+            stored_file, created = store_upload(ContentFile(content, name=f'resume_{n}.pdf'))
+            files.append(stored_file)
+        return files
+    
+    def create_template(self, n, user, field_count):
+        field_types = [field_type for field_type, _ in FormField.FIELD_TYPES]
+        field_types += [self.random.choice(field_types) for _ in range(field_count - len(field_types))]
+        
+        with transaction.atomic():
+            form_template = FormTemplate.objects.create(
+                name=f'Seed template {FormTemplate.objects.count() + 1}',
+                description=f'Generated by seed_ems (template {n + 1})',
+                created_by=user
+            )
+            used = {}
+            fields = []
+            for order, field_type in enumerate(field_types):
+                labels = FIELD_LABELS[field_type]
+                index = used.get(field_type, 0)
+                used[field_type] = index + 1
+                label = labels[index % len(labels)]
+                if index >= len(labels):
+                    label = f'{label} {index // len(labels) + 1}'
+                fields.append(FormField(
+                    form_template=form_template,
+                    label=label,
+                    field_type=field_type,
+                    options=SELECT_OPTIONS.get(label, DEPARTMENTS) if field_type == 'select' else None,
+                    required=order < 3,
+                    order=order,
+                ))
+            fields = FormField.objects.bulk_create(fields)
+        return form_template, fields
+    
+    def create_employees(self, form_template, fields, users, count, chunk_size):
+        for start in range(0, count, chunk_size):
+            with transaction.atomic():
+                rows = [
+                    {field: self.value_for(field) for field in fields}
+                    for _ in range(min(chunk_size, count - start))
+                ]
+                employees = Employee.objects.bulk_create([
+                    Employee(
+                        form_template=form_template,
+                        created_by=self.random.choice(users),
+                        data={str(field.id): value for field, value in row.items()}
+                    )
+                    for row in rows
+                ])
+                EmployeeFieldValue.objects.bulk_create([
+                    EmployeeFieldValue.build(field.field_type, employee=employee, form_field=field, value=value)
+                    for employee, row in zip(employees, rows)
+                    for field, value in row.items()
+                ], batch_size=chunk_size)
+        invalidate_aggregations(form_template.id)
+    
+    def value_for(self, field):
+        rnd = self.random
+        label = field.label
+        if field.field_type == 'number':
+            if label.startswith('Salary'):
+                return str(rnd.randrange(30000, 250000, 500))
+            if label.startswith('Age'):
+                return str(rnd.randint(20, 65))
+            return str(rnd.randint(0, 30))
+        if field.field_type == 'date':
+            return (date(1990, 1, 1) + timedelta(days=rnd.randint(0, 12000))).isoformat()
+        if field.field_type == 'email':
+            return f'{rnd.choice(FIRST_NAMES).lower()}.{rnd.choice(LAST_NAMES).lower()}{rnd.randint(1, 999)}@example.com'
+        if field.field_type == 'select':
+            return rnd.choice(field.options)
+        if field.field_type == 'checkbox':
+            return rnd.choice(['true', 'false'])
+        if field.field_type == 'password':
+            return ''.join(rnd.choices('abcdefghijkmnpqrstuvwxyz23456789', k=12))
+        if field.field_type == 'textarea':
+            return ' '.join(rnd.choices(WORDS, k=rnd.randint(5, 20))).capitalize() + '.'
+        if field.field_type == 'file':
+            return file_reference(rnd.choice(self.stored_files), f'{rnd.choice(LAST_NAMES).lower()}_resume.pdf')
+        if label.startswith('Full name') or label.startswith('Manager'):
+            return f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}'
+        if label.startswith('Job title'):
+            return rnd.choice(JOB_TITLES)
+        return rnd.choice(['London', 'Dubai', 'Bangalore', 'Toronto', 'Berlin', 'Tokyo', 'Nairobi'])
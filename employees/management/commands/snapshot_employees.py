@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from employees.models import Employee
+from employees.services import build_snapshot
+from forms_builder.models import FormField
+
+
+class Command(BaseCommand):
+    help = 'Backfill missing employee data snapshots and report snapshots that drifted from the value rows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Compare every existing snapshot with the value rows')
+        parser.add_argument('--fix', action='store_true',
+                            help='With --verify, rewrite the snapshots that differ')
+        parser.add_argument('--chunk-size', type=int, default=500)
+    
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        
+        backfilled = 0
+        for ids in self.chunks(Employee.objects.filter(data__isnull=True), chunk_size):
+            with transaction.atomic():
+                for employee_id, data in build_snapshot(ids).items():
+                    # Skip rows written by the app since the chunk was read
+                    backfilled += Employee.objects.filter(pk=employee_id, data__isnull=True).update(data=data)
+        self.stdout.write(f'Backfilled {backfilled} snapshots')
+        
+        if not options['verify']:
+            return
+        
+        # Keys of removed fields stay in the snapshots until purge_deleted_fields drops them
+        deleted_keys = {
+            str(field_id)
+            for field_id in FormField.all_objects.filter(deleted_at__isnull=False).values_list('id', flat=True)
+        }
+        drifted = []
+        for ids in self.chunks(Employee.objects.filter(data__isnull=False), chunk_size):
+            with transaction.atomic():
+                current = dict(
+                    Employee.objects.select_for_update().filter(pk__in=ids).values_list('id', 'data')
+                )
+                for employee_id, data in build_snapshot(ids).items():
+                    if employee_id not in current:
+                        continue
+                    stored = {key: value for key, value in current[employee_id].items() if key not in deleted_keys}
+                    if stored != data:
+                        drifted.append(employee_id)
+                        if options['fix']:
+                            pending = {
+                                key: value for key, value in current[employee_id].items() if key in deleted_keys
+                            }
+                            Employee.objects.filter(pk=employee_id).update(data={**data, **pending})
+        
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All snapshots match the value rows'))
+            return
+        
+        shown = ', '.join(str(employee_id) for employee_id in drifted[:20])
+        more = f' and {len(drifted) - 20} more' if len(drifted) > 20 else ''
+        action = 'Rewrote' if options['fix'] else 'Found'
+        self.stdout.write(self.style.WARNING(f'{action} {len(drifted)} drifted snapshots: {shown}{more}'))
+    
+    def chunks(self, queryset, chunk_size):
+        last_id = 0
+        while True:
+            ids = list(
+                queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
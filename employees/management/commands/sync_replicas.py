@@ -0,0 +1,43 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary database into the read replica files (EMS_SQLITE_REPLICAS)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Copy again every N seconds until interrupted, to simulate replication lag')
+    
+    def handle(self, *args, **options):
+        aliases = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not aliases:
+            raise CommandError('No replicas configured; set EMS_SQLITE_REPLICAS')
+        for alias in [DEFAULT_DB_ALIAS, *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias} is not an SQLite database')
+        
+        while True:
+            self.sync(aliases)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+    
+    def sync(self, aliases):
+        connection = connections[DEFAULT_DB_ALIAS]
+        connection.ensure_connection()
+        start = time.perf_counter()
+        for alias in aliases:
+            # The backup API copies a consistent snapshot, even while the primary is written to
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                connection.connection.backup(target)
+            finally:
+                target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Copied the primary to {", ".join(aliases)} in {(time.perf_counter() - start) * 1000:.0f} ms'
+        ))
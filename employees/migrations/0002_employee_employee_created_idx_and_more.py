@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0001_initial'),
+        ('forms_builder', '0002_formtemplate_formtemplate_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['-created_at', '-id'], name='employee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['form_template', '-created_at', '-id'], name='employee_template_created_idx'),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:54
+
+from django.db import migrations, models
+from django.utils.dateparse import parse_date
+
+
+# Frozen copies of employees.validation as of this migration, so that later
+# changes to the conversion do not change what this migration does
+CHECKBOX_TRUE = {'1', 'true', 'yes', 'on', 'y', 't'}
+CHECKBOX_FALSE = {'0', 'false', 'no', 'off', 'n', 'f'}
+
+TYPED_COLUMNS = {
+    'number': 'value_number',
+    'date': 'value_date',
+    'checkbox': 'value_bool',
+}
+
+
+def to_python(field_type, value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    if field_type == 'number':
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        return number if number - number == 0 else None
+    if field_type == 'date':
+        try:
+            return parse_date(value)
+        except ValueError:
+            return None
+    if field_type == 'checkbox':
+        if value.lower() in CHECKBOX_TRUE:
+            return True
+        if value.lower() in CHECKBOX_FALSE:
+            return False
+    return None
+
+
+def backfill_typed_columns(apps, schema_editor):
+    EmployeeFieldValue = apps.get_model('employees', 'EmployeeFieldValue')
+    db_alias = schema_editor.connection.alias
+
+    for field_type, column in TYPED_COLUMNS.items():
+        values = EmployeeFieldValue.objects.using(db_alias).filter(
+            form_field__field_type=field_type
+        ).only('id', 'value').order_by('id')
+        last_id = 0
+        while True:
+            batch = list(values.filter(id__gt=last_id)[:2000])
+            if not batch:
+                break
+            for field_value in batch:
+                setattr(field_value, column, to_python(field_type, field_value.value))
+            EmployeeFieldValue.objects.using(db_alias).bulk_update(batch, [column])
+            last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_employee_employee_created_idx_and_more'),
+        ('forms_builder', '0002_formtemplate_formtemplate_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeefieldvalue',
+            name='value_bool',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='employeefieldvalue',
+            name='value_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='employeefieldvalue',
+            name='value_number',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_typed_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='employeefieldvalue',
+            index=models.Index(fields=['form_field', 'value_number'], name='fieldvalue_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeefieldvalue',
+            index=models.Index(fields=['form_field', 'value_date'], name='fieldvalue_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeefieldvalue',
+            index=models.Index(fields=['form_field', 'value_bool'], name='fieldvalue_bool_idx'),
+        ),
+    ]
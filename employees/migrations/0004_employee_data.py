@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_fieldvalue_typed_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_employee_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('template', 'Employees per form template'), ('creator', 'Employees per creator'), ('day', 'Employees created per day')], max_length=16)),
+                ('key', models.CharField(max_length=32)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'employees_counter',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'key'), name='employee_counter_kind_key_uniq')],
+            },
+        ),
+    ]
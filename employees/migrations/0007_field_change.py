@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0006_stored_file'),
+        ('forms_builder', '0003_formfield_deleted_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FieldChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_value', models.TextField(blank=True, null=True)),
+                ('new_value', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='employees.employee')),
+                ('form_field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='forms_builder.formfield')),
+            ],
+            options={
+                'db_table': 'employees_fieldchange',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['employee', '-created_at', '-id'], name='fieldchange_employee_idx')],
+            },
+        ),
+    ]
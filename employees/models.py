@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 from forms_builder.models import FormTemplate, FormField
+from forms_builder.schema import get_form_schema
+from .validation import typed_values
 
 
 class Employee(models.Model):
@@ -16,10 +18,17 @@ class Employee(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Snapshot of the field values as {field id: value}, written together with them
+    data = models.JSONField(blank=True, null=True)
     
     class Meta:
         db_table = 'employees_employee'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination walks (-created_at, -id), optionally per template
+            models.Index(fields=['-created_at', '-id'], name='employee_created_idx'),
+            models.Index(fields=['form_template', '-created_at', '-id'], name='employee_template_created_idx'),
+        ]
     
     def __str__(self):
         # Try to get the first text field value as display name
@@ -29,7 +38,21 @@ class Employee(models.Model):
         return f"Employee #{self.id}"
     
     def get_field_values_dict(self):
-        return {fv.form_field.label: fv.value for fv in self.field_values.all()}
+        if self.data is not None:
+            schema = get_form_schema(self.form_template_id)
+            if schema is not None:
+                return {
+                    field.label: self.data[str(field.id)]
+                    for field in schema.fields if str(field.id) in self.data
+                }
+        return {fv.form_field.label: fv.value for fv in self.field_values.current().select_related('form_field')}
+
+
+class EmployeeFieldValueQuerySet(models.QuerySet):
+    
+    def current(self):
+        """Values of fields that have not been removed from their template."""
+        return self.filter(form_field__deleted_at__isnull=True)
 
 
 class EmployeeFieldValue(models.Model):
@@ -44,10 +67,109 @@ class EmployeeFieldValue(models.Model):
         related_name='employee_values'
     )
     value = models.TextField(blank=True, null=True)
+    # Typed copies of ``value`` for number/date/checkbox fields, for range filters
+    value_number = models.FloatField(blank=True, null=True)
+    value_date = models.DateField(blank=True, null=True)
+    value_bool = models.BooleanField(blank=True, null=True)
+    
+    objects = EmployeeFieldValueQuerySet.as_manager()
     
     class Meta:
         db_table = 'employees_employeefieldvalue'
         unique_together = ['employee', 'form_field']
+        indexes = [
+            models.Index(fields=['form_field', 'value_number'], name='fieldvalue_number_idx'),
+            models.Index(fields=['form_field', 'value_date'], name='fieldvalue_date_idx'),
+            models.Index(fields=['form_field', 'value_bool'], name='fieldvalue_bool_idx'),
+        ]
     
     def __str__(self):
         return f"{self.form_field.label}: {self.value}"
+    
+    @classmethod
+    def build(cls, field_type, **kwargs):
+        """Instantiate a value row with its typed columns filled from ``field_type``."""
+        return cls(**kwargs, **typed_values(field_type, kwargs.get('value')))
+
+
+class EmployeeCounter(models.Model):
+    """
+    Running employee counts, maintained by database triggers (see employees.stats).
+    
+    ``key`` is a template id, a user id or an ISO date (UTC) depending on ``kind``.
+    """
+    KINDS = [
+        ('template', 'Employees per form template'),
+        ('creator', 'Employees per creator'),
+        ('day', 'Employees created per day'),
+    ]
+    
+    kind = models.CharField(max_length=16, choices=KINDS)
+    key = models.CharField(max_length=32)
+    count = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'employees_counter'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='employee_counter_kind_key_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.key}: {self.count}"
+
+
+class StoredFile(models.Model):
+    """
+    Content of an uploaded file, stored once however many employees refer to it.
+    
+    File field values refer to it as ``<sha256>/<file name>`` (see employees.files).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='employee_files/', max_length=255)
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'employees_storedfile'
+    
+    def __str__(self):
+        return self.sha256
+
+
+class FieldChange(models.Model):
+    """
+    One field of an employee changing value, written after the change commits (see employees.audit).
+    
+    ``old_value`` is None when the employee had no value for the field yet.
+    """
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='changes'
+    )
+    form_field = models.ForeignKey(
+        FormField,
+        on_delete=models.CASCADE,
+        related_name='changes'
+    )
+    old_value = models.TextField(blank=True, null=True)
+    new_value = models.TextField(blank=True)
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    # When the change was made, not when it was written
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'employees_fieldchange'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['employee', '-created_at', '-id'], name='fieldchange_employee_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Employee #{self.employee_id} field {self.form_field_id}: {self.old_value} -> {self.new_value}"
@@ -0,0 +1,236 @@
+import logging
+import re
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models.expressions import RawSQL
+
+from forms_builder.models import FormField
+
+from .models import EmployeeFieldValue
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+VALUE_TABLE = EmployeeFieldValue._meta.db_table
+# Values of soft-deleted fields stay in the index until purge_deleted_fields removes them
+CURRENT_FIELDS_SQL = (
+    f"form_field_id NOT IN (SELECT id FROM {FormField._meta.db_table} WHERE deleted_at IS NOT NULL)"
+)
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+class IContainsSearchBackend:
+    """The original substring scan over every value row."""
+    name = 'icontains'
+    
+    def __init__(self, using='default'):
+        self.using = using
+    
+    def is_available(self):
+        return True
+    
+    def install(self):
+        return False
+    
+    def rebuild(self):
+        pass
+    
+    def matching_employee_ids(self, query, field_ids=None):
+        values = EmployeeFieldValue.objects.using(self.using).current().filter(value__icontains=query)
+        if field_ids:
+            values = values.filter(form_field_id__in=field_ids)
+        return values.values_list('employee_id', flat=True)
+    
+    def filter(self, queryset, query, field_ids=None, order_by_relevance=False):
+        # Substring matching has no notion of relevance
+        return queryset.filter(id__in=self.matching_employee_ids(query, field_ids))
+
+
+class SQLiteFTSSearchBackend(IContainsSearchBackend):
+    """
+    FTS5 index over employee field values.
+    
+    The virtual table uses the value table as external content and is kept
+    in sync by triggers, so bulk_create, upserts and cascade deletes are
+    indexed without any application code on the write path.
+    """
+    name = 'sqlite_fts5'
+    table = 'employees_fieldvalue_fts'
+    
+    def is_available(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                [self.table, f'{self.table}_ai', f'{self.table}_ad', f'{self.table}_au']
+            )
+            return cursor.fetchone()[0] == 4
+    
+    def install(self):
+        """Create the index and its triggers if missing. Returns True if it had to be rebuilt."""
+        if self.is_available():
+            return False
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                f"value, employee_id UNINDEXED, form_field_id UNINDEXED, "
+                f"content='{VALUE_TABLE}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_ai AFTER INSERT ON {VALUE_TABLE} BEGIN "
+                f"INSERT INTO {self.table}(rowid, value, employee_id, form_field_id) "
+                f"VALUES (new.id, new.value, new.employee_id, new.form_field_id); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_ad AFTER DELETE ON {VALUE_TABLE} BEGIN "
+                f"INSERT INTO {self.table}({self.table}, rowid, value, employee_id, form_field_id) "
+                f"VALUES ('delete', old.id, old.value, old.employee_id, old.form_field_id); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.table}_au AFTER UPDATE ON {VALUE_TABLE} BEGIN "
+                f"INSERT INTO {self.table}({self.table}, rowid, value, employee_id, form_field_id) "
+                f"VALUES ('delete', old.id, old.value, old.employee_id, old.form_field_id); "
+                f"INSERT INTO {self.table}(rowid, value, employee_id, form_field_id) "
+                f"VALUES (new.id, new.value, new.employee_id, new.form_field_id); END"
+            )
+        # Rows written while the triggers were missing are not indexed yet
+        self.rebuild()
+        return True
+    
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+    
+    def match_expression(self, tokens):
+        # Every token must match (implicit AND), each as a prefix
+        return ' '.join('"%s"*' % token.replace('"', '""') for token in tokens)
+    
+    def match_sql(self, tokens, field_ids):
+        sql = f"SELECT employee_id FROM {self.table} WHERE {self.table} MATCH %s AND {CURRENT_FIELDS_SQL}"
+        params = [self.match_expression(tokens)]
+        if field_ids:
+            sql += f" AND form_field_id IN ({', '.join(['%s'] * len(field_ids))})"
+            params += list(field_ids)
+        return sql, params
+    
+    def rank_sql(self, tokens, field_ids, employee_column):
+        sql, params = self.match_sql(tokens, field_ids)
+        sql = sql.replace('SELECT employee_id', 'SELECT MIN(rank)', 1)
+        return f"{sql} AND employee_id = {employee_column}", params
+    
+    def filter(self, queryset, query, field_ids=None, order_by_relevance=False):
+        tokens = tokenize(query)
+        if not tokens:
+            # Nothing the tokenizer can match on (e.g. only punctuation)
+            return super().filter(queryset, query, field_ids)
+        
+        sql, params = self.match_sql(tokens, field_ids)
+        queryset = queryset.filter(id__in=RawSQL(sql, params))
+        if order_by_relevance:
+            employee_column = '%s.%s' % (
+                connections[self.using].ops.quote_name(queryset.model._meta.db_table),
+                connections[self.using].ops.quote_name('id'),
+            )
+            rank_sql, rank_params = self.rank_sql(tokens, field_ids, employee_column)
+            queryset = queryset.annotate(
+                search_rank=RawSQL(rank_sql, rank_params)
+            ).order_by('search_rank', '-created_at', '-id')
+        return queryset
+
+
+class PostgresSearchBackend(SQLiteFTSSearchBackend):
+    """Full-text search backed by a GIN expression index on the value column."""
+    name = 'postgres'
+    index = 'employees_fieldvalue_tsv_idx'
+    document = "to_tsvector('simple', COALESCE(value, ''))"
+    
+    def is_available(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [self.index])
+            return cursor.fetchone()[0]
+    
+    def install(self):
+        if self.is_available():
+            return False
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {self.index} ON {VALUE_TABLE} USING GIN ({self.document})")
+        return True
+    
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"REINDEX INDEX {self.index}")
+    
+    def match_expression(self, tokens):
+        return ' & '.join(f'{token}:*' for token in tokens)
+    
+    def match_sql(self, tokens, field_ids):
+        sql = (
+            f"SELECT employee_id FROM {VALUE_TABLE} "
+            f"WHERE {self.document} @@ to_tsquery('simple', %s) AND {CURRENT_FIELDS_SQL}"
+        )
+        params = [self.match_expression(tokens)]
+        if field_ids:
+            sql += f" AND form_field_id IN ({', '.join(['%s'] * len(field_ids))})"
+            params += list(field_ids)
+        return sql, params
+    
+    def rank_sql(self, tokens, field_ids, employee_column):
+        sql, params = self.match_sql(tokens, field_ids)
+        # Negated so that, as with FTS5's rank, lower sorts first
+        sql = sql.replace(
+            'SELECT employee_id',
+            f"SELECT -MAX(ts_rank({self.document}, to_tsquery('simple', %s)))",
+            1
+        )
+        return f"{sql} AND employee_id = {employee_column}", [params[0]] + params
+
+
+SEARCH_BACKENDS = {
+    'icontains': IContainsSearchBackend,
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_available = {}
+
+
+def get_search_backend(using='default', check_available=True):
+    """
+    Pick the full-text backend for the database vendor.
+    
+    ``EMPLOYEE_SEARCH_BACKEND = 'icontains'`` forces the substring scan. If
+    the index has not been installed yet the substring scan is used too.
+    """
+    if getattr(settings, 'EMPLOYEE_SEARCH_BACKEND', 'auto') == 'icontains':
+        return IContainsSearchBackend(using)
+    
+    backend_class = SEARCH_BACKENDS.get(connections[using].vendor, IContainsSearchBackend)
+    backend = backend_class(using)
+    if not check_available:
+        return backend
+    if using not in _available:
+        _available[using] = backend.is_available()
+    if not _available[using]:
+        return IContainsSearchBackend(using)
+    return backend
+
+
+def search_employees(queryset, query, field_ids=None, order_by_relevance=False, using='default'):
+    backend = get_search_backend(using)
+    return backend.filter(queryset, query, field_ids=field_ids, order_by_relevance=order_by_relevance)
+
+
+def install_search_index(sender, using='default', **kwargs):
+    """post_migrate hook: (re)create the index objects if they are missing."""
+    backend = get_search_backend(using, check_available=False)
+    try:
+        backend.install()
+    except DatabaseError as e:
+        # e.g. SQLite built without FTS5; searches fall back to the substring scan
+        logger.warning('Could not install the %s employee search index: %s', backend.name, e)
+    _available.pop(using, None)
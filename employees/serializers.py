@@ -1,7 +1,11 @@
 from rest_framework import serializers
-from django.db import transaction
-from .models import Employee, EmployeeFieldValue
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .models import Employee, EmployeeFieldValue, FieldChange
+from .services import clean_field_values, create_employee, update_employee
+from .importers import IMPORT_FORMATS, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE
+from forms_builder.models import FormTemplate
 from forms_builder.serializers import FormTemplateSerializer
+from forms_builder.schema import get_form_schema
 
 
 class EmployeeFieldValueSerializer(serializers.ModelSerializer):
@@ -25,55 +29,100 @@ class EmployeeSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
 
 
+class EmployeeSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Reads an employee from its ``data`` snapshot and the cached form schema.
+    
+    Needs no join or prefetch; the labels always come from the current
+    schema, so renaming a field never leaves stale labels behind.
+    """
+    field_values = serializers.SerializerMethodField()
+    form_template_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Employee
+        fields = ['id', 'form_template', 'form_template_name', 'field_values',
+                  'created_by', 'created_at', 'updated_at']
+        read_only_fields = fields
+    
+    def get_schema(self, obj):
+        # Async views load the schemas up front and pass them in the context
+        schemas = self.context.get('schemas')
+        if schemas is not None:
+            return schemas.get(obj.form_template_id)
+        return get_form_schema(obj.form_template_id)
+    
+    def get_field_values(self, obj):
+        schema = self.get_schema(obj)
+        data = obj.data or {}
+        if schema is None:
+            return []
+        return [
+            {
+                'form_field': field.id,
+                'field_label': field.label,
+                'field_type': field.field_type,
+                'value': data[str(field.id)],
+            }
+            for field in schema.fields if str(field.id) in data
+        ]
+    
+    def get_form_template_name(self, obj):
+        schema = self.get_schema(obj)
+        return schema.name if schema is not None else None
+
+
 class EmployeeCreateSerializer(serializers.Serializer):
     form_template = serializers.IntegerField()
     field_values = serializers.DictField(child=serializers.CharField(allow_blank=True))
     
-    @transaction.atomic
-    def create(self, validated_data):
-        from forms_builder.models import FormTemplate, FormField
-        
-        form_template_id = validated_data['form_template']
-        field_values_data = validated_data['field_values']
-        created_by = validated_data['created_by']
-        
-        form_template = FormTemplate.objects.get(id=form_template_id)
-        
-        employee = Employee.objects.create(
-            form_template=form_template,
-            created_by=created_by
-        )
-        
-        for field_id, value in field_values_data.items():
-            try:
-                form_field = FormField.objects.get(id=int(field_id))
-                EmployeeFieldValue.objects.create(
-                    employee=employee,
-                    form_field=form_field,
-                    value=value
-                )
-            except FormField.DoesNotExist:
-                pass
+    def validate_form_template(self, value):
+        if get_form_schema(value) is None:
+            raise serializers.ValidationError('Form template not found')
+        return value
+    
+    def validate(self, attrs):
+        if self.instance is not None:
+            self.schema = get_form_schema(self.instance.form_template_id)
+        else:
+            self.schema = get_form_schema(attrs['form_template'])
         
-        return employee
+        # Updates may send only the fields that changed
+        try:
+            attrs['field_values'] = clean_field_values(
+                self.schema, attrs['field_values'], partial=self.instance is not None
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'field_values': e.message_dict})
+        return attrs
+    
+    def create(self, validated_data):
+        return create_employee(self.schema, validated_data['field_values'], validated_data['created_by'])
     
-    @transaction.atomic
     def update(self, instance, validated_data):
-        from forms_builder.models import FormField
-        
-        field_values_data = validated_data.get('field_values', {})
-        
-        # Update field values
-        for field_id, value in field_values_data.items():
-            try:
-                form_field = FormField.objects.get(id=int(field_id))
-                EmployeeFieldValue.objects.update_or_create(
-                    employee=instance,
-                    form_field=form_field,
-                    defaults={'value': value}
-                )
-            except FormField.DoesNotExist:
-                pass
-        
-        instance.save()
-        return instance
+        return update_employee(
+            instance, self.schema, validated_data.get('field_values', {}), validated_data.get('changed_by')
+        )
+
+
+class FieldChangeSerializer(serializers.ModelSerializer):
+    field_label = serializers.CharField(source='form_field.label', read_only=True)
+    changed_by = serializers.CharField(source='changed_by.username', read_only=True, default=None)
+    
+    class Meta:
+        model = FieldChange
+        fields = ['id', 'form_field', 'field_label', 'old_value', 'new_value', 'changed_by', 'created_at']
+
+
+class EmployeeImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    form_template = serializers.IntegerField()
+    format = serializers.ChoiceField(choices=IMPORT_FORMATS, required=False)
+    chunk_size = serializers.IntegerField(
+        required=False, min_value=1, max_value=MAX_CHUNK_SIZE, default=DEFAULT_CHUNK_SIZE
+    )
+    
+    def validate_form_template(self, value):
+        if not FormTemplate.objects.filter(id=value).exists():
+            raise serializers.ValidationError('Form template not found')
+        return value
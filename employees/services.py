@@ -0,0 +1,191 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from core.db import retry_on_lock
+from forms_builder.aggregations import invalidate_aggregations
+from forms_builder.models import FormField
+
+from .audit import field_changes, record_changes
+from .files import file_value_error, unresolved_file_values
+from .models import Employee, EmployeeFieldValue, FieldChange
+from .validation import TYPED_COLUMNS, clean_field_value
+
+
+VALUE_COLUMNS = ['value'] + list(TYPED_COLUMNS.values())
+
+
+def clean_field_values(schema, field_values, partial=False):
+    """
+    Resolve submitted ``{field_id: value}`` pairs against a compiled form schema.
+    
+    Returns ``{FieldSpec: value}``, each value checked against its field's
+    type by ``clean_field_value``. Invalid values, ids that are not fields
+    of this template (including fields of other templates) and missing or
+    blank required fields raise a ValidationError keyed by field id. With
+    ``partial`` only the submitted required fields have to be filled in.
+    """
+    cleaned = {}
+    errors = {}
+    for field_id, value in field_values.items():
+        field = schema.get_field(field_id)
+        if field is None:
+            errors[str(field_id)] = f'Field {field_id} does not belong to this form template'
+            continue
+        try:
+            cleaned[field] = clean_field_value(field, value)
+        except ValidationError as e:
+            cleaned[field] = ''
+            errors[str(field.id)] = e.messages[0]
+    
+    files = [
+        (field, value) for field, value in cleaned.items()
+        if field.field_type == 'file' and value and str(field.id) not in errors
+    ]
+    if files:
+        unresolved = unresolved_file_values(files)
+        for field, value in files:
+            if (field.id, value) in unresolved:
+                errors[str(field.id)] = file_value_error(field)
+    
+    for field in schema.required_fields:
+        if field in cleaned:
+            if not cleaned[field].strip():
+                errors[str(field.id)] = f'{field.label} is required'
+        elif not partial:
+            errors[str(field.id)] = f'{field.label} is required'
+    
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def build_field_values(employee, cleaned):
+    return [
+        EmployeeFieldValue.build(field.field_type, employee=employee, form_field_id=field.id, value=value)
+        for field, value in cleaned.items()
+    ]
+
+
+def snapshot_values(cleaned):
+    return {str(field.id): value for field, value in cleaned.items()}
+
+
+def build_snapshot(employee_ids):
+    """
+    Rebuild ``Employee.data`` from the value rows of the given employees, in one query.
+    
+    Values of soft-deleted fields are left out, as they are once
+    ``purge_deleted_fields`` has run.
+    """
+    snapshots = {employee_id: {} for employee_id in employee_ids}
+    values = EmployeeFieldValue.objects.current().filter(employee_id__in=employee_ids).values_list(
+        'employee_id', 'form_field_id', 'value'
+    )
+    for employee_id, field_id, value in values:
+        snapshots[employee_id][str(field_id)] = value
+    return snapshots
+
+
+@retry_on_lock
+def create_employee(schema, cleaned, created_by):
+    """Insert an employee and all of its values: two INSERTs whatever the number of fields."""
+    with transaction.atomic():
+        employee = Employee.objects.create(
+            form_template_id=schema.template_id,
+            created_by=created_by,
+            data=snapshot_values(cleaned)
+        )
+        EmployeeFieldValue.objects.bulk_create(build_field_values(employee, cleaned))
+        record_changes(field_changes(employee.pk, {}, cleaned, created_by))
+        invalidate_aggregations(schema.template_id)
+    return employee
+
+
+@retry_on_lock
+def update_employee(employee, schema, cleaned, changed_by=None):
+    """
+    Upsert the submitted values in one statement and refresh the snapshot with them.
+    
+    The values that changed are recorded for the employee's history, written
+    after the commit.
+    """
+    with transaction.atomic():
+        # Lock the row so concurrent partial updates don't lose each other's snapshot keys
+        data = Employee.objects.select_for_update().filter(pk=employee.pk).values_list('data', flat=True).first()
+        if data is None:
+            data = build_snapshot([employee.pk])[employee.pk]
+        
+        if cleaned:
+            EmployeeFieldValue.objects.bulk_create(
+                build_field_values(employee, cleaned),
+                update_conflicts=True,
+                unique_fields=['employee', 'form_field'],
+                update_fields=VALUE_COLUMNS,
+            )
+        employee.data = {**data, **snapshot_values(cleaned)}
+        employee.save(update_fields=['data', 'updated_at'])
+        record_changes(field_changes(employee.pk, data, cleaned, changed_by))
+        invalidate_aggregations(schema.template_id)
+    return employee
+
+
+@retry_on_lock
+def delete_employee(employee):
+    with transaction.atomic():
+        employee.delete()
+        invalidate_aggregations(employee.form_template_id)
+
+
+@retry_on_lock
+def delete_employees(employee_ids):
+    """Delete employees, with their values and history, in one transaction; returns how many were deleted."""
+    with transaction.atomic():
+        return Employee.objects.filter(pk__in=employee_ids).delete()[1].get(Employee._meta.label, 0)
+
+
+def purge_deleted_fields(chunk_size=5000):
+    """
+    Delete the values and history of soft-deleted form fields, then the fields themselves.
+    
+    Works in chunks of ``chunk_size`` rows, each in its own short
+    transaction, so purging a field with millions of values never holds a
+    long lock. Snapshots are cleaned up by walking the template's employees
+    in id ranges. Returns ``{field id: number of values deleted}``.
+    """
+    purged = {}
+    fields = FormField.all_objects.filter(deleted_at__isnull=False).values_list('id', 'form_template_id')
+    for field_id, template_id in fields:
+        deleted = delete_in_chunks(EmployeeFieldValue.objects.filter(form_field_id=field_id), chunk_size)
+        # Deleting the field would otherwise cascade to its whole history in one statement
+        delete_in_chunks(FieldChange.objects.filter(form_field_id=field_id), chunk_size)
+        
+        key = str(field_id)
+        employees = Employee.objects.filter(form_template_id=template_id).order_by('id')
+        last_id = 0
+        while True:
+            ids = list(employees.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            with transaction.atomic():
+                stale = list(
+                    Employee.objects.select_for_update().filter(pk__in=ids, data__has_key=key).only('id', 'data')
+                )
+                for employee in stale:
+                    del employee.data[key]
+                Employee.objects.bulk_update(stale, ['data'])
+        
+        FormField.all_objects.filter(pk=field_id).delete()
+        purged[field_id] = deleted
+    return purged
+
+
+def delete_in_chunks(queryset, chunk_size):
+    """Delete the rows of ``queryset`` ``chunk_size`` at a time, each chunk in its own transaction."""
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            deleted += queryset.model.objects.filter(id__in=ids).delete()[0]
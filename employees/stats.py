@@ -0,0 +1,234 @@
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from forms_builder.models import FormTemplate
+
+from .models import Employee, EmployeeCounter
+
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_TABLE = Employee._meta.db_table
+COUNTER_TABLE = EmployeeCounter._meta.db_table
+
+TOP_CREATORS = 5
+RECENT_DAYS = 7
+
+
+def sqlite_trigger_body(row, delta):
+    return ' '.join(
+        f"INSERT INTO {COUNTER_TABLE}(kind, key, count) VALUES ('{kind}', {key}, {delta}) "
+        f"ON CONFLICT(kind, key) DO UPDATE SET count = count + excluded.count;"
+        for kind, key in [
+            ('template', f'{row}.form_template_id'),
+            ('creator', f'{row}.created_by_id'),
+            ('day', f'date({row}.created_at)'),
+        ]
+    )
+
+
+SQLITE_TRIGGERS = {
+    f'{COUNTER_TABLE}_ai': f"AFTER INSERT ON {EMPLOYEE_TABLE} BEGIN {sqlite_trigger_body('new', 1)} END",
+    f'{COUNTER_TABLE}_ad': f"AFTER DELETE ON {EMPLOYEE_TABLE} BEGIN {sqlite_trigger_body('old', -1)} END",
+    f'{COUNTER_TABLE}_au': (
+        f"AFTER UPDATE OF form_template_id, created_by_id, created_at ON {EMPLOYEE_TABLE} "
+        f"BEGIN {sqlite_trigger_body('old', -1)} {sqlite_trigger_body('new', 1)} END"
+    ),
+}
+
+POSTGRES_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION {COUNTER_TABLE}_add(counter_kind text, counter_key text, delta bigint) RETURNS void AS $$
+    INSERT INTO {COUNTER_TABLE}(kind, key, count) VALUES (counter_kind, counter_key, delta)
+    ON CONFLICT (kind, key) DO UPDATE SET count = {COUNTER_TABLE}.count + excluded.count;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION {COUNTER_TABLE}_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM {COUNTER_TABLE}_add('template', OLD.form_template_id::text, -1);
+        PERFORM {COUNTER_TABLE}_add('creator', OLD.created_by_id::text, -1);
+        PERFORM {COUNTER_TABLE}_add('day', (OLD.created_at AT TIME ZONE 'UTC')::date::text, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM {COUNTER_TABLE}_add('template', NEW.form_template_id::text, 1);
+        PERFORM {COUNTER_TABLE}_add('creator', NEW.created_by_id::text, 1);
+        PERFORM {COUNTER_TABLE}_add('day', (NEW.created_at AT TIME ZONE 'UTC')::date::text, 1);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class TriggerCounters:
+    """
+    Keeps EmployeeCounter in step with the employee table through triggers.
+    
+    Like the search index, the triggers run for every row however it is
+    written, so bulk_create, the importer and cascade deletes (of a template
+    or a user) are all counted without code on the write paths.
+    """
+    
+    def __init__(self, using='default'):
+        self.using = using
+        self.vendor = connections[using].vendor
+    
+    def trigger_names(self):
+        if self.vendor == 'sqlite':
+            return list(SQLITE_TRIGGERS)
+        if self.vendor == 'postgresql':
+            return [f'{COUNTER_TABLE}_aiud']
+        return []
+    
+    def is_available(self):
+        names = self.trigger_names()
+        if not names:
+            return False
+        with connections[self.using].cursor() as cursor:
+            if self.vendor == 'sqlite':
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join(['%s'] * len(names))})",
+                    names
+                )
+            else:
+                cursor.execute("SELECT COUNT(*) FROM pg_trigger WHERE tgname = %s AND NOT tgisinternal", names)
+            return cursor.fetchone()[0] == len(names)
+    
+    def install(self):
+        """Create the triggers if missing and recount. Returns True if they had to be created."""
+        if not self.trigger_names() or self.is_available():
+            return False
+        with transaction.atomic(using=self.using), connections[self.using].cursor() as cursor:
+            if self.vendor == 'sqlite':
+                for name, body in SQLITE_TRIGGERS.items():
+                    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+            else:
+                cursor.execute(POSTGRES_FUNCTION)
+                cursor.execute(
+                    f"CREATE TRIGGER {COUNTER_TABLE}_aiud AFTER INSERT OR DELETE OR UPDATE OF "
+                    f"form_template_id, created_by_id, created_at ON {EMPLOYEE_TABLE} "
+                    f"FOR EACH ROW EXECUTE FUNCTION {COUNTER_TABLE}_trigger()"
+                )
+            # Rows written while the triggers were missing are not counted yet
+            reconcile(fix=True, using=self.using)
+        return True
+
+
+_available = {}
+
+
+def counters_available(using='default'):
+    if using not in _available:
+        _available[using] = TriggerCounters(using).is_available()
+    return _available[using]
+
+
+def install_counters(sender, using='default', **kwargs):
+    """post_migrate hook: create the counter triggers if they are missing."""
+    try:
+        TriggerCounters(using).install()
+    except DatabaseError as e:
+        logger.warning('Could not install the employee counter triggers: %s', e)
+    _available.pop(using, None)
+
+
+def count_employees(using='default'):
+    """``{(kind, key): count}`` computed from the employee table, the slow way."""
+    employees = Employee.objects.using(using).order_by()
+    counts = {}
+    for template_id, count in employees.values_list('form_template_id').annotate(n=Count('id')):
+        counts[('template', str(template_id))] = count
+    for user_id, count in employees.values_list('created_by_id').annotate(n=Count('id')):
+        counts[('creator', str(user_id))] = count
+    days = employees.annotate(day=TruncDate('created_at', tzinfo=dt_timezone.utc)).values_list('day')
+    for day, count in days.annotate(n=Count('id')):
+        counts[('day', day.isoformat())] = count
+    return counts
+
+
+def stored_counts(using='default'):
+    counters = EmployeeCounter.objects.using(using).exclude(count=0)
+    return {(kind, key): count for kind, key, count in counters.values_list('kind', 'key', 'count')}
+
+
+def reconcile(fix=False, using='default'):
+    """
+    Recount from scratch and compare with the counters table.
+    
+    Returns ``{(kind, key): (stored, actual)}`` for every counter that
+    drifted. With ``fix`` the table is rewritten with the recount while
+    employee writes are held off: on SQLite by taking the write lock first,
+    on PostgreSQL with a table lock.
+    """
+    with transaction.atomic(using=using):
+        connection = connections[using]
+        if fix and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {EMPLOYEE_TABLE} IN SHARE ROW EXCLUSIVE MODE")
+        stored = stored_counts(using)
+        if fix:
+            EmployeeCounter.objects.using(using).all().delete()
+        actual = count_employees(using)
+        
+        if fix:
+            EmployeeCounter.objects.using(using).bulk_create(
+                [EmployeeCounter(kind=kind, key=key, count=count) for (kind, key), count in actual.items()],
+                batch_size=1000
+            )
+    
+    return {
+        counter: (stored.get(counter, 0), actual.get(counter, 0))
+        for counter in stored.keys() | actual.keys()
+        if stored.get(counter, 0) != actual.get(counter, 0)
+    }
+
+
+def dashboard_stats(using='default'):
+    """Employees per template, created in the last days and top creators."""
+    User = Employee._meta.get_field('created_by').related_model
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    days = [(today - timedelta(days=offset)).isoformat() for offset in range(RECENT_DAYS - 1, -1, -1)]
+    
+    if counters_available(using):
+        counters = EmployeeCounter.objects.using(using).exclude(count=0)
+        rows = counters.filter(Q(kind='template') | Q(kind='day', key__in=days))
+        top = counters.filter(kind='creator').order_by('-count', 'key')[:TOP_CREATORS]
+        counts = {
+            (kind, key): count
+            for queryset in (rows, top)
+            for kind, key, count in queryset.values_list('kind', 'key', 'count')
+        }
+    else:
+        # No triggers for this database vendor: count the slow way
+        counts = count_employees(using)
+    
+    per_template = {int(key): count for (kind, key), count in counts.items() if kind == 'template'}
+    per_creator = sorted(
+        ((int(key), count) for (kind, key), count in counts.items() if kind == 'creator'),
+        key=lambda item: (-item[1], item[0])
+    )[:TOP_CREATORS]
+    per_day = [{'date': day, 'employees': counts.get(('day', day), 0)} for day in days]
+    
+    usernames = dict(User.objects.using(using).filter(
+        pk__in=[user_id for user_id, _ in per_creator]
+    ).values_list('id', 'username'))
+    templates = FormTemplate.objects.using(using).order_by('name').values_list('id', 'name')
+    
+    return {
+        'total_employees': sum(per_template.values()),
+        'created_recently': sum(day['employees'] for day in per_day),
+        'recent_days': per_day,
+        'templates': [
+            {'id': template_id, 'name': name, 'employees': per_template.get(template_id, 0)}
+            for template_id, name in templates
+        ],
+        'top_creators': [
+            {'id': user_id, 'username': usernames.get(user_id, ''), 'employees': count}
+            for user_id, count in per_creator
+        ],
+    }
@@ -0,0 +1,52 @@
+import secrets
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from forms_builder.models import FormTemplate
+from jobs.queue import task
+
+from .exporters import DEFAULT_CHUNK_SIZE, EmployeeExporter
+from .models import Employee
+from .search import get_search_backend, install_search_index
+from .services import purge_deleted_fields
+
+
+EXPORT_DIR = 'exports'
+
+
+@task('employees.export')
+def export_employees(job, template_id, file_format='csv'):
+    """Write an export to storage, under an unguessable name; the job's download endpoint serves it."""
+    form_template = FormTemplate.objects.get(pk=template_id)
+    total = Employee.objects.filter(form_template=form_template).count()
+    job.set_progress(0, total)
+    
+    exporter = EmployeeExporter(form_template)
+    with tempfile.TemporaryFile() as output:
+        written = 0
+        for line in exporter.stream(file_format):
+            output.write(line.encode())
+            written += 1
+            if written % DEFAULT_CHUNK_SIZE == 0:
+                job.set_progress(min(written, total), message=f'Exported {min(written, total)} of {total} employees')
+        output.seek(0)
+        filename = f'employees-{form_template.id}.{file_format}'
+        name = default_storage.save(f'{EXPORT_DIR}/{secrets.token_urlsafe(16)}/{filename}', File(output))
+    job.set_progress(total, message=f'Exported {total} employees')
+    return {'file': name, 'filename': filename, 'employees': total}
+
+
+@task('employees.rebuild_search_index')
+def rebuild_search_index(job):
+    backend = get_search_backend(check_available=False)
+    install_search_index(sender=None)
+    backend.rebuild()
+    return {'backend': backend.name}
+
+
+@task('employees.purge_deleted_fields')
+def purge_fields(job):
+    purged = purge_deleted_fields()
+    return {'values_deleted': {str(field_id): deleted for field_id, deleted in purged.items()}}
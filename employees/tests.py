@@ -1,3 +1,1143 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.contrib.sessions.models import Session
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+from core.routers import STICKY_COOKIE, ReplicaRoutingMiddleware, replica_reads
+from core.testing import QueryBudgetMixin
+from forms_builder.models import FormTemplate, FormField
+from forms_builder.schema import get_form_schema
+
+from . import async_api_views
+from .exporters import EmployeeExporter
+from .files import unresolved_file_values
+from .importers import EmployeeImporter
+from .models import Employee, EmployeeCounter, EmployeeFieldValue, FieldChange, StoredFile
+from .search import SQLiteFTSSearchBackend, get_search_backend
+from .services import clean_field_values, create_employee, purge_deleted_fields, update_employee, snapshot_values
+from .stats import dashboard_stats, reconcile
+from .views import EmployeeListView
+
+
+def make_template(user, field_count, name='Template'):
+    form_template = FormTemplate.objects.create(name=name, created_by=user)
+    FormField.objects.bulk_create([
+        FormField(form_template=form_template, label=f'Field {i}', field_type='text', order=i)
+        for i in range(field_count)
+    ])
+    return form_template
+
+
+class EmployeeWriteServiceTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='writer', password='pass12345!')
+        cls.small = make_template(cls.user, 5, 'Small')
+        cls.large = make_template(cls.user, 40, 'Large')
+    
+    def values_for(self, form_template, suffix=''):
+        return {str(field_id): f'value {field_id}{suffix}' for field_id in form_template.fields.values_list('id', flat=True)}
+    
+    def test_create_query_count_does_not_depend_on_field_count(self):
+        for form_template in (self.small, self.large):
+            schema = get_form_schema(form_template.id)
+            cleaned = clean_field_values(schema, self.values_for(form_template))
+            # SAVEPOINT, INSERT employee, INSERT values, RELEASE
+            with self.assertNumQueries(4):
+                employee = create_employee(schema, cleaned, self.user)
+            self.assertEqual(employee.field_values.count(), len(schema.fields))
+    
+    def test_update_query_count_does_not_depend_on_field_count(self):
+        for form_template in (self.small, self.large):
+            schema = get_form_schema(form_template.id)
+            employee = create_employee(schema, clean_field_values(schema, self.values_for(form_template)), self.user)
+            cleaned = clean_field_values(schema, self.values_for(form_template, ' (edited)'))
+            # SAVEPOINT, lock employee, upsert values, UPDATE employee, RELEASE
+            with self.assertNumQueries(5):
+                update_employee(employee, schema, cleaned)
+            self.assertFalse(employee.field_values.exclude(value__endswith='(edited)').exists())
+    
+    def test_fields_of_other_templates_are_rejected(self):
+        schema = get_form_schema(self.small.id)
+        foreign_field = self.large.fields.first()
+        with self.assertRaises(ValidationError) as ctx:
+            clean_field_values(schema, {str(foreign_field.id): 'x'})
+        self.assertIn(str(foreign_field.id), ctx.exception.message_dict)
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(EmployeeFieldValue.objects.exists())
+    
+    def test_values_are_checked_against_their_field_type(self):
+        form_template = FormTemplate.objects.create(name='Typed', created_by=self.user)
+        fields = {
+            field_type: FormField.objects.create(
+                form_template=form_template, label=field_type.title(), field_type=field_type,
+                options=['Red', 'Blue'] if field_type == 'select' else None
+            )
+            for field_type in ('number', 'date', 'email', 'select')
+        }
+        schema = get_form_schema(form_template.id)
+        with self.assertRaises(ValidationError) as ctx:
+            clean_field_values(schema, {
+                str(fields['number'].id): 'twelve',
+                str(fields['date'].id): '2024-02-30',
+                str(fields['email'].id): 'not-an-email',
+                str(fields['select'].id): 'Green',
+            })
+        self.assertEqual(ctx.exception.message_dict, {
+            str(fields['number'].id): ['Number must be a number'],
+            str(fields['date'].id): ['Date must be a date (YYYY-MM-DD)'],
+            str(fields['email'].id): ['Email must be a valid email address'],
+            str(fields['select'].id): ['Select must be one of: Red, Blue'],
+        })
+        
+        cleaned = clean_field_values(schema, {
+            str(fields['number'].id): ' 12.5 ', str(fields['date'].id): '2024-02-29',
+            str(fields['email'].id): 'ada@example.com', str(fields['select'].id): 'Blue',
+        })
+        self.assertEqual(sorted(cleaned.values()), ['12.5', '2024-02-29', 'Blue', 'ada@example.com'])
+        
+        for value in ['nan', 'inf', '-Infinity', '1e999']:
+            with self.assertRaises(ValidationError) as ctx:
+                clean_field_values(schema, {str(fields['number'].id): value}, partial=True)
+            self.assertEqual(ctx.exception.message_dict, {str(fields['number'].id): ['Number must be a finite number']})
+        
+        # The API answers with the same errors
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        response = self.client.post(reverse('api_employee_list'), {
+            'form_template': form_template.id, 'field_values': {str(fields['number'].id): 'twelve'}
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(fields['number'].id), json.dumps(response.json()))
+
+
+class EmployeeImportTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='importer', password='pass12345!')
+        cls.form_template = FormTemplate.objects.create(name='Imported', created_by=cls.user)
+        cls.name = FormField.objects.create(
+            form_template=cls.form_template, label='Full name', field_type='text', required=True, order=0
+        )
+        cls.age = FormField.objects.create(form_template=cls.form_template, label='Age', field_type='number', order=1)
+        cls.contract = FormField.objects.create(form_template=cls.form_template, label='Contract', field_type='file', order=2)
+    
+    def run_import(self, content, fmt='csv', chunk_size=500):
+        importer = EmployeeImporter(self.form_template, self.user, chunk_size=chunk_size)
+        return importer.run(io.StringIO(content), fmt=fmt)
+    
+    def test_csv_columns_are_matched_by_label_or_id(self):
+        report = self.run_import(f'full NAME,{self.age.id},Team\nAda,36,Core\nGrace,,Core\n')
+        self.assertEqual((report['created'], report['failed'], report['unknown_columns']), (2, 0, ['Team']))
+        self.assertEqual(
+            [employee.data for employee in Employee.objects.order_by('id')],
+            [{str(self.name.id): 'Ada', str(self.age.id): '36'}, {str(self.name.id): 'Grace'}]
+        )
+        self.assertEqual(EmployeeFieldValue.objects.get(form_field=self.age).value_number, 36)
+    
+    def test_invalid_rows_are_reported_with_their_line(self):
+        report = self.run_import('Full name,Age\nAda,36\n,40\nGrace,old\n')
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'], [
+            {'row': 3, 'errors': {'Full name': 'Full name is required'}},
+            {'row': 4, 'errors': {'Age': 'Age must be a number'}},
+        ])
+    
+    def test_rows_are_written_in_chunks(self):
+        rows = ''.join(f'Employee {i},{i}\n' for i in range(5))
+        with mock.patch.object(EmployeeImporter, 'insert_chunk', autospec=True,
+                               side_effect=EmployeeImporter.insert_chunk) as insert_chunk:
+            report = self.run_import('Full name,Age\n' + rows, chunk_size=2)
+        self.assertEqual(report['created'], 5)
+        self.assertEqual([len(call.args[1]) for call in insert_chunk.call_args_list], [2, 2, 1])
+        self.assertEqual(Employee.objects.count(), 5)
+    
+    def test_malformed_jsonl_lines_are_skipped(self):
+        content = '{"Full name": "Ada"}\n{"Full name": \n\n["Grace"]\n{"Full name": "Grace", "Shoe size": 9}\n'
+        report = self.run_import(content, fmt='jsonl')
+        self.assertEqual((report['created'], report['failed']), (2, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 4])
+        self.assertTrue(report['errors'][0]['errors']['row'].startswith('Invalid JSON'))
+        self.assertEqual(report['errors'][1]['errors']['row'], 'Each line must be a JSON object')
+        self.assertEqual(report['unknown_columns'], ['Shoe size'])
+    
+    def test_reported_errors_are_capped(self):
+        with mock.patch('employees.importers.MAX_REPORTED_ERRORS', 2):
+            report = self.run_import('Full name,Age\n' + 'Ada,old\n' * 5)
+        self.assertEqual((report['failed'], len(report['errors']), report['errors_truncated']), (5, 2, True))
+        self.assertFalse(self.run_import('Full name\nAda\n')['errors_truncated'])
+    
+    def test_file_references_are_resolved_once_per_chunk(self):
+        stored = StoredFile.objects.create(sha256='a' * 64, file='employee_files/aa/contract', size=8)
+        reference = f'{stored.sha256}/contract.pdf'
+        rows = ''.join(f'Employee {i},{reference}\n' for i in range(4)) + f'Employee 4,{"b" * 64}/missing.pdf\n'
+        with mock.patch('employees.importers.unresolved_file_values', wraps=unresolved_file_values) as resolve:
+            report = self.run_import('Full name,Contract\n' + rows, chunk_size=3)
+        self.assertEqual(resolve.call_count, 2)
+        self.assertEqual((report['created'], report['failed']), (4, 1))
+        self.assertEqual(report['errors'][0]['row'], 6)
+        self.assertIn('Contract', report['errors'][0]['errors'])
+
+
+class EmployeeListViewTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='viewer', password='pass12345!')
+        cls.form_templates = [make_template(cls.user, 5, f'Template {i}') for i in range(3)]
+    
+    def setUp(self):
+        self.client.force_login(self.user)
+    
+    def add_employees(self, count):
+        employees = []
+        for i in range(count):
+            form_template = self.form_templates[i % len(self.form_templates)]
+            schema = get_form_schema(form_template.id)
+            cleaned = {field: f'{field.label} of {i}' for field in schema.fields}
+            employees.append(Employee(form_template=form_template, created_by=self.user, data=snapshot_values(cleaned)))
+        Employee.objects.bulk_create(employees, batch_size=1000)
+    
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('employee_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+    
+    def test_query_count_does_not_depend_on_employee_count(self):
+        self.add_employees(10)
+        # Warm the schema cache, then count a regular request
+        self.client.get(reverse('employee_list'))
+        small, response = self.count_queries()
+        self.assertEqual(len(response.context['employees']), 10)
+        
+        self.add_employees(9990)
+        large, response = self.count_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.context['employees']), EmployeeListView.paginate_by)
+        self.assertEqual(response.context['page_obj'].paginator.count, 10000)
+    
+    def test_rows_show_template_name_and_first_fields(self):
+        self.add_employees(1)
+        row = self.client.get(reverse('employee_list')).context['employees'][0]
+        self.assertEqual(row['form_template'], 'Template 0')
+        self.assertEqual(row['fields'], {'Field 0': 'Field 0 of 0', 'Field 1': 'Field 1 of 0'})
+
+
+@override_settings(QUERY_INSTRUMENTATION=True)
+class EmployeeAPIQueryBudgetTests(QueryBudgetMixin, TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', password='pass12345!')
+        for form_template in (make_template(cls.user, 5, 'Small'), make_template(cls.user, 40, 'Large')):
+            schema = get_form_schema(form_template.id)
+            for i in range(5):
+                cleaned = clean_field_values(schema, {str(field.id): f'value {i}' for field in schema.fields})
+                create_employee(schema, cleaned, cls.user)
+    
+    def setUp(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    
+    def test_list_within_budget(self):
+        response = self.assertWithinQueryBudget('get', reverse('api_employee_list'))
+        self.assertEqual(len(response.json()['employees']), 10)
+        self.assertWithinQueryBudget('get', reverse('api_employee_list') + '?mode=snapshot')
+    
+    def test_detail_within_budget(self):
+        for employee in Employee.objects.all():
+            self.assertWithinQueryBudget('get', reverse('api_employee_detail', args=[employee.pk]))
+            self.assertWithinQueryBudget('get', reverse('api_employee_detail', args=[employee.pk]) + '?mode=snapshot')
+    
+    def test_exceeding_budget_fails(self):
+        self.query_budgets = {'api_employee_list': 1}
+        with self.assertRaises(AssertionError):
+            self.assertWithinQueryBudget('get', reverse('api_employee_list'))
+    
+    def test_response_headers(self):
+        response = self.client.get(reverse('api_employee_list'))
+        self.assertGreater(int(response['X-DB-Query-Count']), 0)
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertIn('SELECT', response['X-DB-Slowest-Query'])
+
+
+class EmployeeSearchTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='searcher', password='pass12345!')
+        cls.form_template = FormTemplate.objects.create(name='Searchable', created_by=cls.user)
+        cls.name = FormField.objects.create(form_template=cls.form_template, label='Name', field_type='text', order=0)
+        cls.title = FormField.objects.create(form_template=cls.form_template, label='Title', field_type='text', order=1)
+    
+    def setUp(self):
+        cache.clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        self.assertIsInstance(get_search_backend(), SQLiteFTSSearchBackend)
+    
+    def add(self, name, title):
+        schema = get_form_schema(self.form_template.id)
+        cleaned = clean_field_values(schema, {str(self.name.id): name, str(self.title.id): title})
+        return create_employee(schema, cleaned, self.user)
+    
+    def search(self, query, **params):
+        response = self.client.get(reverse('api_employee_list'), {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [employee['id'] for employee in response.json()['employees']]
+    
+    def test_terms_match_as_prefixes_and_all_must_match(self):
+        ada = self.add('Ada Lovelace', 'Engineer')
+        grace = self.add('Grace Hopper', 'Engineering manager')
+        self.add('Ada Byron', 'Analyst')
+        self.assertEqual(self.search('engin'), [grace.id, ada.id])
+        # Every term must match, in the same value
+        self.assertEqual(self.search('ada love'), [ada.id])
+        self.assertEqual(self.search('engineering man'), [grace.id])
+        self.assertEqual(self.search('ada hopper'), [])
+    
+    def test_search_fields_limit_the_match(self):
+        hopper = self.add('Grace Hopper', 'Admiral')
+        navy = self.add('Grace Murray', 'Hopper operator')
+        self.assertEqual(self.search('hopper'), [navy.id, hopper.id])
+        self.assertEqual(self.search('hopper', search_fields=str(self.name.id)), [hopper.id])
+        self.assertEqual(self.search('hopper', search_fields=f'{self.title.id},x'), [navy.id])
+    
+    def test_relevance_ordering(self):
+        exact = self.add('Python', '')
+        # Created later, so first by default, but the term is one of many words
+        loose = self.add('Knows Java, Go, Rust, C and some Python as well', '')
+        self.assertEqual(self.search('python'), [loose.id, exact.id])
+        self.assertEqual(self.search('python', ordering='relevance'), [exact.id, loose.id])
+    
+    def test_index_follows_updates_and_deletes(self):
+        employee = self.add('Ada Lovelace', 'Engineer')
+        schema = get_form_schema(self.form_template.id)
+        update_employee(employee, schema, clean_field_values(schema, {str(self.title.id): 'Countess'}))
+        self.assertEqual(self.search('engineer'), [])
+        self.assertEqual(self.search('countess'), [employee.id])
+        
+        employee.delete()
+        self.assertEqual(self.search('countess'), [])
+        self.assertEqual(self.search('lovelace'), [])
+    
+    def test_values_of_removed_fields_do_not_match(self):
+        employee = self.add('Ada Lovelace', 'Engineer')
+        FormField.all_objects.filter(pk=self.title.pk).update(deleted_at=timezone.now())
+        for backend in ('auto', 'icontains'):
+            with self.settings(EMPLOYEE_SEARCH_BACKEND=backend):
+                self.assertEqual(self.search('engineer'), [], backend)
+                self.assertEqual(self.search('lovelace'), [employee.id], backend)
+
+
+class EmployeeCursorPaginationTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='pager', password='pass12345!')
+        cls.form_template = FormTemplate.objects.create(name='Paged', created_by=cls.user)
+    
+    def setUp(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+    
+    def add_employees(self, count):
+        Employee.objects.bulk_create([
+            Employee(form_template=self.form_template, created_by=self.user, data={}) for _ in range(count)
+        ])
+        return list(Employee.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+    
+    def get(self, url=None, **params):
+        response = self.client.get(url or reverse('api_employee_list'), params)
+        return response.json() if response.status_code == 200 else response
+    
+    def ids(self, page):
+        return [employee['id'] for employee in page['employees']]
+    
+    def test_next_and_previous_links_round_trip(self):
+        ids = self.add_employees(5)
+        first = self.get(pagination='cursor', page_size=2, mode='snapshot')
+        self.assertNotIn('count', first)
+        self.assertEqual((self.ids(first), first['previous']), (ids[:2], None))
+        second = self.get(first['next'])
+        third = self.get(second['next'])
+        self.assertEqual((self.ids(second), self.ids(third), third['next']), (ids[2:4], ids[4:], None))
+        
+        back = self.get(third['previous'])
+        self.assertEqual(self.ids(back), ids[2:4])
+        start = self.get(back['previous'])
+        self.assertEqual((self.ids(start), start['previous']), (ids[:2], None))
+        self.assertEqual(self.ids(self.get(start['next'])), ids[2:4])
+    
+    def test_created_at_ties_are_broken_by_id(self):
+        self.add_employees(5)
+        Employee.objects.update(created_at=timezone.now())
+        page = self.get(pagination='cursor', page_size=2, mode='snapshot')
+        seen = self.ids(page)
+        while page['next']:
+            page = self.get(page['next'])
+            seen += self.ids(page)
+        self.assertEqual(seen, sorted(Employee.objects.values_list('id', flat=True), reverse=True))
+    
+    def test_invalid_cursors_are_not_found(self):
+        self.add_employees(1)
+        for payload in (b'[1]', b'{"c": "yesterday", "i": 1}', b'{"c": "2024-01-01T00:00:00Z", "i": "x"}', b'\xff'):
+            cursor = base64.urlsafe_b64encode(payload).decode()
+            self.assertEqual(self.get(cursor=cursor).status_code, 404, payload)
+        self.assertEqual(self.get(cursor='not base64!').status_code, 404)
+    
+    def test_page_size_is_capped(self):
+        self.add_employees(105)
+        self.assertEqual(len(self.get(pagination='cursor', page_size=500, mode='snapshot')['employees']), 100)
+        self.assertEqual(len(self.get(pagination='cursor', page_size=0, mode='snapshot')['employees']), 10)
+    
+    def test_relevance_ordering_needs_page_numbers(self):
+        response = self.get(search='ada', ordering='relevance', pagination='cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json()['errors'])
+        self.assertEqual(self.get(search='ada', ordering='relevance')['count'], 0)
+
+
+class EmployeeFieldFilterTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='filterer', password='pass12345!')
+        cls.form_template = FormTemplate.objects.create(name='Filtered', created_by=cls.user)
+        cls.salary = FormField.objects.create(form_template=cls.form_template, label='Salary', field_type='number', order=0)
+        cls.joined = FormField.objects.create(form_template=cls.form_template, label='Joined', field_type='date', order=1)
+        cls.city = FormField.objects.create(form_template=cls.form_template, label='City', field_type='text', order=2)
+        schema = get_form_schema(cls.form_template.id)
+        cls.employees = [
+            create_employee(schema, clean_field_values(schema, {
+                str(cls.salary.id): salary, str(cls.joined.id): joined, str(cls.city.id): city
+            }), cls.user).id
+            for salary, joined, city in [
+                ('30000', '2019-03-01', 'London'), ('55000.5', '2021-07-15', 'Berlin'), ('90000', '2024-01-10', 'London')
+            ]
+        ]
+    
+    def setUp(self):
+        cache.clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+    
+    def get(self, **params):
+        return self.client.get(reverse('api_employee_list'), {'mode': 'snapshot', **params})
+    
+    def ids(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(employee['id'] for employee in response.json()['employees'])
+    
+    def test_number_comparisons(self):
+        low, middle, high = self.employees
+        salary = f'field:{self.salary.id}'
+        self.assertEqual(self.ids(**{f'{salary}__gt': '30000'}), [middle, high])
+        self.assertEqual(self.ids(**{f'{salary}__lt': '55000.5'}), [low])
+        self.assertEqual(self.ids(**{f'{salary}__gte': '40000', f'{salary}__lte': '90000'}), [middle, high])
+        self.assertEqual(self.ids(**{salary: '55000.50'}), [middle])
+    
+    def test_date_comparisons(self):
+        low, middle, high = self.employees
+        joined = f'field:{self.joined.id}'
+        self.assertEqual(self.ids(**{f'{joined}__gt': '2019-03-01'}), [middle, high])
+        self.assertEqual(self.ids(**{f'{joined}__lt': '2024-01-10'}), [low, middle])
+        self.assertEqual(self.ids(**{f'{joined}__gte': '2020-01-01', f'{joined}__lte': '2023-12-31'}), [middle])
+        self.assertEqual(
+            self.ids(**{f'{joined}__gte': '2020-01-01', f'field:{self.city.id}__iexact': 'london'}), [high]
+        )
+    
+    def test_invalid_filters_are_rejected(self):
+        other_template = FormTemplate.objects.create(name='Other', created_by=self.user)
+        other_field = FormField.objects.create(form_template=other_template, label='Age', field_type='number')
+        response = self.get(**{
+            f'field:{self.salary.id}__icontains': '3',
+            f'field:{self.city.id}__gt': 'B',
+            f'field:{self.joined.id}__gte': '2024-13-01',
+            f'field:{self.salary.id}__lte': 'lots',
+            f'field:{other_field.id}': '30',
+            'form_template': self.form_template.id,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {
+            f'field:{self.salary.id}__icontains': 'Operator must be one of: exact, gt, gte, lt, lte',
+            f'field:{self.city.id}__gt': 'Operator must be one of: exact, iexact, icontains',
+            f'field:{self.joined.id}__gte': 'Invalid date value',
+            f'field:{self.salary.id}__lte': 'Invalid number value',
+            f'field:{other_field.id}': 'Unknown form field',
+        })
+
+
+class EmployeeExportTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='exporter', password='pass12345!')
+        cls.form_template = FormTemplate.objects.create(name='Exported', created_by=cls.user)
+        # Created out of order: columns follow the field order, not the ids
+        cls.city = FormField.objects.create(form_template=cls.form_template, label='City', field_type='text', order=2)
+        cls.name = FormField.objects.create(form_template=cls.form_template, label='Name', field_type='text', order=0)
+        cls.age = FormField.objects.create(form_template=cls.form_template, label='Age', field_type='number', order=1)
+        schema = get_form_schema(cls.form_template.id)
+        cls.employees = [
+            create_employee(schema, clean_field_values(schema, values), cls.user)
+            for values in [
+                {str(cls.name.id): 'Ada', str(cls.age.id): '36', str(cls.city.id): 'London'},
+                {str(cls.name.id): 'Grace'},
+                {str(cls.name.id): 'Alan', str(cls.city.id): 'Wilmslow'},
+            ]
+        ]
+    
+    def setUp(self):
+        cache.clear()
+    
+    def export(self, fmt, chunk_size=1000):
+        return ''.join(EmployeeExporter(self.form_template, chunk_size=chunk_size).stream(fmt))
+    
+    def test_csv_columns_follow_the_form_and_missing_values_are_blank(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv'))))
+        self.assertEqual(rows[0], ['id', 'created_at', 'Name', 'Age', 'City'])
+        self.assertEqual([row[:1] + row[2:] for row in rows[1:]], [
+            [str(self.employees[0].id), 'Ada', '36', 'London'],
+            [str(self.employees[1].id), 'Grace', '', ''],
+            [str(self.employees[2].id), 'Alan', '', 'Wilmslow'],
+        ])
+    
+    def test_jsonl_rows(self):
+        rows = [json.loads(line) for line in self.export('jsonl').splitlines()]
+        self.assertEqual(list(rows[0]), ['id', 'created_at', str(self.name.id), str(self.age.id), str(self.city.id)])
+        self.assertEqual(rows[1], {
+            'id': self.employees[1].id, 'created_at': self.employees[1].created_at.isoformat(),
+            str(self.name.id): 'Grace', str(self.age.id): None, str(self.city.id): None,
+        })
+    
+    def test_duplicate_labels_keep_every_value(self):
+        FormField.objects.filter(pk=self.age.pk).update(label='Name')
+        FormField.objects.filter(pk=self.city.pk).update(label='id')
+        cache.clear()
+        rows = [json.loads(line) for line in self.export('jsonl').splitlines()]
+        self.assertEqual(rows[0], {
+            'id': self.employees[0].id, 'created_at': self.employees[0].created_at.isoformat(),
+            str(self.name.id): 'Ada', str(self.age.id): '36', str(self.city.id): 'London',
+        })
+        csv_rows = list(csv.reader(io.StringIO(self.export('csv'))))
+        self.assertEqual(csv_rows[0], ['id', 'created_at', 'Name', 'Name', 'id'])
+        self.assertEqual(csv_rows[1][2:], ['Ada', '36', 'London'])
+    
+    def test_chunks_cover_every_employee_in_a_constant_number_of_queries(self):
+        self.assertEqual(len(self.export('csv', chunk_size=2).splitlines()), 4)
+        # Per chunk one query for the employees and one for their values, then one finding no more employees
+        with self.assertNumQueries(5):
+            csv_rows = self.export('csv', chunk_size=2).splitlines()
+        self.assertEqual(csv_rows[1:], self.export('csv').splitlines()[1:])
+        
+        FormField.objects.bulk_create([
+            FormField(form_template=self.form_template, label=f'Extra {i}', field_type='text', order=10 + i)
+            for i in range(20)
+        ])
+        cache.clear()
+        get_form_schema(self.form_template.id)
+        with self.assertNumQueries(5):
+            self.export('jsonl', chunk_size=2)
+    
+    def test_export_api_streams_the_file(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        response = self.client.get(reverse('api_employee_export'), {'form_template': self.form_template.id})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+
+
+class EmployeeSnapshotTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='snapper', password='pass12345!')
+        cls.form_template = make_template(cls.user, 3, 'Snapshots')
+        cls.first, cls.second, cls.third = FormField.objects.filter(form_template=cls.form_template).order_by('order')
+    
+    def setUp(self):
+        cache.clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        schema = get_form_schema(self.form_template.id)
+        self.employee = create_employee(schema, clean_field_values(schema, {
+            str(self.first.id): 'Ada', str(self.second.id): 'Engineer', str(self.third.id): 'London'
+        }), self.user)
+    
+    def field_values(self, **params):
+        response = self.client.get(reverse('api_employee_detail', args=[self.employee.id]), params)
+        return [
+            (value['form_field'], value['field_label'], value['field_type'], value['value'])
+            for value in response.json()['employee']['field_values']
+        ]
+    
+    def test_snapshot_mode_reads_the_same_values(self):
+        self.assertEqual(self.field_values(mode='snapshot'), self.field_values())
+        
+        self.second.label = 'Job title'
+        self.second.save()
+        self.assertIn((self.second.id, 'Job title', 'text', 'Engineer'), self.field_values(mode='snapshot'))
+        
+        self.third.deleted_at = timezone.now()
+        self.third.save()
+        self.assertEqual(self.field_values(mode='snapshot'), self.field_values())
+        self.assertEqual(len(self.field_values(mode='snapshot')), 2)
+        
+        response = self.client.get(reverse('api_employee_list'), {'mode': 'snapshot'})
+        self.assertEqual(response.json()['employees'][0]['field_values'][0]['value'], 'Ada')
+    
+    def test_verify_and_fix_drifted_snapshots(self):
+        schema = get_form_schema(self.form_template.id)
+        missing = create_employee(schema, clean_field_values(schema, {str(self.first.id): 'Grace'}), self.user)
+        Employee.objects.filter(pk=missing.pk).update(data=None)
+        Employee.objects.filter(pk=self.employee.pk).update(data={str(self.first.id): 'Stale'})
+        FormField.all_objects.filter(pk=self.third.pk).update(deleted_at=timezone.now())
+        
+        output = io.StringIO()
+        call_command('snapshot_employees', verify=True, stdout=output)
+        self.assertIn('Backfilled 1 snapshots', output.getvalue())
+        self.assertIn(f'Found 1 drifted snapshots: {self.employee.id}', output.getvalue())
+        self.assertEqual(Employee.objects.get(pk=missing.pk).data, {str(self.first.id): 'Grace'})
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).data, {str(self.first.id): 'Stale'})
+        
+        call_command('snapshot_employees', verify=True, fix=True, stdout=io.StringIO())
+        # Rebuilt without the value of the removed field
+        self.assertEqual(
+            Employee.objects.get(pk=self.employee.pk).data,
+            {str(self.first.id): 'Ada', str(self.second.id): 'Engineer'}
+        )
+        output = io.StringIO()
+        call_command('snapshot_employees', verify=True, stdout=output)
+        self.assertIn('All snapshots match the value rows', output.getvalue())
+    
+    def test_keys_of_removed_fields_are_not_drift(self):
+        FormField.all_objects.filter(pk=self.third.pk).update(deleted_at=timezone.now())
+        output = io.StringIO()
+        call_command('snapshot_employees', verify=True, fix=True, stdout=output)
+        self.assertIn('All snapshots match the value rows', output.getvalue())
+        # Left for purge_deleted_fields
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).data[str(self.third.id)], 'London')
+        
+        Employee.objects.filter(pk=self.employee.pk).update(data={
+            str(self.first.id): 'Stale', str(self.second.id): 'Engineer', str(self.third.id): 'London'
+        })
+        call_command('snapshot_employees', verify=True, fix=True, stdout=io.StringIO())
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).data, {
+            str(self.first.id): 'Ada', str(self.second.id): 'Engineer', str(self.third.id): 'London'
+        })
+
+
+class PurgeDeletedFieldsTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='purger', password='pass12345!')
+        cls.form_template = make_template(cls.user, 2, 'Purged')
+        cls.kept, cls.removed = FormField.objects.filter(form_template=cls.form_template).order_by('order')
+        other_template = make_template(cls.user, 1, 'Untouched')
+        schema = get_form_schema(cls.form_template.id)
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                create_employee(schema, clean_field_values(schema, {
+                    str(cls.kept.id): f'kept {i}', str(cls.removed.id): f'removed {i}'
+                }), cls.user)
+            other_schema = get_form_schema(other_template.id)
+            create_employee(other_schema, clean_field_values(other_schema, {
+                str(other_schema.fields[0].id): 'other'
+            }), cls.user)
+    
+    def test_values_history_and_snapshot_keys_go_in_chunks(self):
+        self.removed.deleted_at = timezone.now()
+        self.removed.save()
+        self.assertEqual(FieldChange.objects.filter(form_field=self.removed).count(), 5)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(purge_deleted_fields(chunk_size=2), {self.removed.id: 5})
+        
+        self.assertFalse(FormField.all_objects.filter(pk=self.removed.pk).exists())
+        self.assertFalse(EmployeeFieldValue.objects.filter(form_field_id=self.removed.id).exists())
+        self.assertFalse(FieldChange.objects.filter(form_field_id=self.removed.id).exists())
+        self.assertEqual(EmployeeFieldValue.objects.filter(form_field=self.kept).count(), 5)
+        self.assertEqual(FieldChange.objects.filter(form_field=self.kept).count(), 5)
+        for data in Employee.objects.filter(form_template=self.form_template).values_list('data', flat=True):
+            self.assertEqual(list(data), [str(self.kept.id)])
+        
+        # Every delete and snapshot scan is bounded to a chunk of ids
+        for query in queries:
+            sql = query['sql']
+            if sql.startswith('DELETE FROM "employees_') or 'JSON_TYPE' in sql:
+                self.assertIn(' IN (', sql)
+        # Three chunks of history, then the field's own cascade with nothing left to delete
+        self.assertEqual(
+            len([query for query in queries if query['sql'].startswith('DELETE FROM "employees_fieldchange"')]), 4
+        )
+
+
+class AsyncEmployeeAPITests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', password='pass12345!')
+        cls.form_template = make_template(cls.user, 5)
+        schema = get_form_schema(cls.form_template.id)
+        for i in range(3):
+            cleaned = clean_field_values(schema, {str(field.id): f'value {i}' for field in schema.fields})
+            create_employee(schema, cleaned, cls.user)
+    
+    def setUp(self):
+        self.authorization = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        self.client.defaults['HTTP_AUTHORIZATION'] = self.authorization
+        self.factory = AsyncRequestFactory()
+    
+    async def get(self, view, path, *args, **params):
+        return await view(self.factory.get(path, params, AUTHORIZATION=self.authorization), *args)
+    
+    async def test_list_matches_sync_view(self):
+        path = reverse('api_employee_list')
+        for params in ({}, {'mode': 'snapshot'}, {'pagination': 'cursor'}, {'search': 'value 1'}):
+            response = await self.get(async_api_views.employee_list, path, **params)
+            expected = await self.async_client.get(path, params, AUTHORIZATION=self.authorization)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), expected.json())
+    
+    async def test_detail_matches_sync_view(self):
+        employee = await Employee.objects.afirst()
+        path = reverse('api_employee_detail', args=[employee.pk])
+        for params in ({}, {'mode': 'snapshot'}):
+            response = await self.get(async_api_views.employee_detail, path, employee.pk, **params)
+            expected = await self.async_client.get(path, params, AUTHORIZATION=self.authorization)
+            self.assertEqual(json.loads(response.content), expected.json())
+    
+    async def test_errors(self):
+        response = await self.get(async_api_views.employee_detail, '/api/employees/0/', 0)
+        self.assertEqual(response.status_code, 404)
+        response = await self.get(async_api_views.employee_list, '/api/employees/', **{'field:0__exact': 'x'})
+        self.assertEqual(response.status_code, 400)
+        
+        request = self.factory.get('/api/employees/', AUTHORIZATION='Bearer not-a-token')
+        response = await async_api_views.employee_list(request)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+
+@override_settings(QUERY_INSTRUMENTATION=True)
+class EmployeeStatsTests(QueryBudgetMixin, TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', password='pass12345!')
+        cls.other = CustomUser.objects.create_user(username='writer', password='pass12345!')
+        cls.first = make_template(cls.user, 2, 'First')
+        cls.second = make_template(cls.user, 2, 'Second')
+    
+    def setUp(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    
+    def add(self, form_template, user, count=1):
+        schema = get_form_schema(form_template.id)
+        cleaned = clean_field_values(schema, {str(field.id): 'x' for field in schema.fields})
+        return [create_employee(schema, cleaned, user) for _ in range(count)]
+    
+    def test_counters_follow_every_write_path(self):
+        employees = self.add(self.first, self.user, 3)
+        self.add(self.second, self.other, 2)
+        Employee.objects.bulk_create([Employee(form_template=self.second, created_by=self.user) for _ in range(4)])
+        employees[0].delete()
+        self.assertEqual(reconcile(), {})
+        
+        stats = dashboard_stats()
+        self.assertEqual(stats['total_employees'], 8)
+        self.assertEqual(stats['created_recently'], 8)
+        self.assertEqual(
+            [(t['name'], t['employees']) for t in stats['templates']], [('First', 2), ('Second', 6)]
+        )
+        self.assertEqual(
+            [(c['username'], c['employees']) for c in stats['top_creators']], [('reader', 6), ('writer', 2)]
+        )
+        
+        # Cascade delete through the template
+        self.second.delete()
+        self.assertEqual(reconcile(), {})
+        self.assertEqual(dashboard_stats()['total_employees'], 2)
+    
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.add(self.first, self.user, 2)
+        EmployeeCounter.objects.filter(kind='template').update(count=10)
+        self.assertEqual(reconcile(), {('template', str(self.first.id)): (10, 2)})
+        reconcile(fix=True)
+        self.assertEqual(reconcile(), {})
+    
+    def test_stats_api_within_budget(self):
+        self.add(self.first, self.user, 2)
+        response = self.assertWithinQueryBudget('get', reverse('api_employee_stats'))
+        self.assertEqual(response.json()['stats']['total_employees'], 2)
+        
+        self.client.force_login(self.user)
+        self.assertWithinQueryBudget('get', reverse('dashboard'))
+
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', password='pass12345!')
+        cls.form_template = make_template(cls.user, 3)
+    
+    def setUp(self):
+        cache.clear()
+    
+    def route(self, request, write=False):
+        def view(request):
+            if write:
+                router.db_for_write(Employee)
+            return HttpResponse(f'{router.db_for_read(Employee)} {router.db_for_read(Session)}')
+        
+        response = ReplicaRoutingMiddleware(view)(request)
+        return response.content.decode().split(), response
+    
+    def test_reads_of_safe_requests_go_to_replicas(self):
+        factory = RequestFactory()
+        self.assertEqual(self.route(factory.get('/api/employees/'))[0], ['replica', 'default'])
+        self.assertEqual(self.route(factory.get('/api/employees/'), write=True)[0], ['default', 'default'])
+        self.assertEqual(router.db_for_read(Employee), 'default')
+    
+    def test_writes_make_the_client_sticky(self):
+        factory = RequestFactory()
+        databases, response = self.route(factory.post('/api/employees/'))
+        self.assertEqual(databases[0], 'default')
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 10)
+        
+        request = factory.get('/api/employees/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(self.route(request)[0][0], 'default')
+    
+    def test_cache_fills_read_from_primary(self):
+        # 'replica' is not a configured database: any query routed there would fail
+        with replica_reads():
+            self.assertEqual(len(get_form_schema(self.form_template.id).fields), 3)
+            token = RefreshToken.for_user(self.user).access_token
+            response = self.client.get(reverse('api_form_detail', args=[self.form_template.id]),
+                                       HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual(response.status_code, 200)
+
+
+
+@override_settings(QUERY_INSTRUMENTATION=True)
+class EmployeeHistoryTests(QueryBudgetMixin, TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='editor', password='pass12345!')
+        cls.form_template = make_template(cls.user, 3)
+        cls.schema = get_form_schema(cls.form_template.id)
+        cls.first, cls.second, cls.third = [str(field.id) for field in cls.schema.fields]
+    
+    def setUp(self):
+        cache.clear()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        with self.captureOnCommitCallbacks(execute=True):
+            cleaned = clean_field_values(self.schema, {self.first: 'Ada', self.second: 'Engineer', self.third: ''})
+            self.employee = create_employee(self.schema, cleaned, self.user)
+    
+    def update(self, field_values):
+        return self.client.put(reverse('api_employee_detail', args=[self.employee.pk]), {
+            'form_template': self.form_template.id,
+            'field_values': field_values
+        }, content_type='application/json')
+    
+    def test_changes_are_written_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.update({self.first: 'Ada', self.second: 'Manager', self.third: ''})
+        self.assertEqual(response.status_code, 200)
+        # Nothing written inside the transaction; one bulk insert per write once it commits
+        self.assertEqual(FieldChange.objects.count(), 2)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(FieldChange.objects.count(), 3)
+        
+        change = FieldChange.objects.first()
+        self.assertEqual((change.old_value, change.new_value), ('Engineer', 'Manager'))
+        self.assertEqual(change.changed_by, self.user)
+        self.assertEqual(FieldChange.objects.filter(form_field_id=self.third).count(), 0)
+    
+    def test_rolled_back_changes_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    update_employee(self.employee, self.schema, clean_field_values(self.schema, {
+                        self.first: 'Grace', self.second: 'Admiral', self.third: 'x'
+                    }), self.user)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(FieldChange.objects.count(), 2)
+    
+    def test_history_api(self):
+        for title in ('Lead', 'Director', 'CTO'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.update({self.first: 'Ada', self.second: title, self.third: ''})
+        
+        url = reverse('api_employee_history', args=[self.employee.pk])
+        response = self.assertWithinQueryBudget('get', url + '?page_size=2')
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(
+            [(change['old_value'], change['new_value']) for change in data['changes']],
+            [('Director', 'CTO'), ('Lead', 'Director')]
+        )
+        self.assertEqual(data['changes'][0]['changed_by'], 'editor')
+        
+        response = self.client.get(url + f'?form_field={self.first}&pagination=cursor')
+        self.assertEqual([change['new_value'] for change in response.json()['changes']], ['Ada'])
+        self.assertEqual(self.client.get(reverse('api_employee_history', args=[0])).status_code, 404)
+
+
+class EmployeeFileTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='uploader', password='pass12345!')
+        cls.form_template = FormTemplate.objects.create(name='Documents', created_by=cls.user)
+        cls.field = FormField.objects.create(form_template=cls.form_template, label='Contract', field_type='file', order=0)
+    
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    
+    def upload(self, content, name='contract.pdf'):
+        return self.client.post(reverse('api_employee_file_upload'), {'file': SimpleUploadedFile(name, content)})
+    
+    def create_employee_with(self, reference):
+        return self.client.post(reverse('api_employee_list'), {
+            'form_template': self.form_template.id,
+            'field_values': {str(self.field.id): reference}
+        }, content_type='application/json')
+    
+    def test_uploads_are_stored_once_per_content(self):
+        content = b'%PDF-1.7 signed contract'
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 201)
+        stored = response.json()['file']
+        self.assertEqual(stored['sha256'], hashlib.sha256(content).hexdigest())
+        self.assertEqual(stored['reference'], f"{stored['sha256']}/contract.pdf")
+        self.assertFalse(response.json()['deduplicated'])
+        
+        again = self.upload(content, 'copy of contract.pdf').json()
+        self.assertTrue(again['deduplicated'])
+        self.assertEqual(again['file']['reference'], f"{stored['sha256']}/copy of contract.pdf")
+        self.assertEqual(StoredFile.objects.count(), 1)
+    
+    @override_settings(EMPLOYEE_FILE_MAX_SIZE=10)
+    def test_too_large_uploads_are_rejected(self):
+        response = self.upload(b'x' * 100)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['file'], ['File is too large.'])
+        self.assertFalse(StoredFile.objects.exists())
+    
+    def test_field_value_must_reference_a_stored_file(self):
+        reference = self.upload(b'contract').json()['file']['reference']
+        self.assertEqual(self.create_employee_with(reference).status_code, 201)
+        self.assertEqual(Employee.objects.get().data[str(self.field.id)], reference)
+        
+        for value in ('contract.pdf', f'{"0" * 64}/contract.pdf'):
+            response = self.create_employee_with(value)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(Employee.objects.count(), 1)
+    
+    def test_references_are_resolved_in_one_query(self):
+        fields = [self.field] + [
+            FormField.objects.create(form_template=self.form_template, label=f'Scan {i}', field_type='file', order=i)
+            for i in range(1, 4)
+        ]
+        references = [self.upload(f'scan {i}'.encode()).json()['file']['reference'] for i in range(4)]
+        schema = get_form_schema(self.form_template.id)
+        with self.assertNumQueries(1):
+            clean_field_values(schema, {str(field.id): reference for field, reference in zip(fields, references)})
+    
+    def test_legacy_values_are_kept(self):
+        # A free-text value stored before uploads were
+        schema = get_form_schema(self.form_template.id)
+        employee = create_employee(schema, {schema.get_field(self.field.id): 'resumes/smith_1234.pdf'}, self.user)
+        
+        response = self.client.put(reverse('api_employee_detail', args=[employee.id]), {
+            'form_template': self.form_template.id, 'field_values': employee.data
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.post(reverse('api_employee_import'), {
+            'form_template': self.form_template.id,
+            'file': SimpleUploadedFile('employees.csv', b'Contract\nresumes/smith_1234.pdf\nresumes/new.pdf\n'),
+        })
+        report = response.json()['report']
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['row'], 3)
+        self.assertEqual(self.create_employee_with('resumes/new.pdf').status_code, 400)
+    
+    def test_seeded_file_values_refer_to_stored_files(self):
+        call_command('seed_ems', users=1, templates=1, employees=5, stdout=io.StringIO())
+        values = EmployeeFieldValue.objects.filter(form_field__field_type='file').values_list('value', flat=True)
+        self.assertEqual(len(values), 5)
+        schema = get_form_schema(Employee.objects.latest('id').form_template_id)
+        file_field = next(field for field in schema.fields if field.field_type == 'file')
+        self.assertFalse(unresolved_file_values([(file_field, value) for value in values]))
+    
+    def test_download_supports_ranges(self):
+        content = b'0123456789'
+        response = self.upload(content, 'notes.txt')
+        sha256 = response.json()['file']['sha256']
+        self.create_employee_with(response.json()['file']['reference'])
+        url = reverse('api_employee_file', args=[Employee.objects.get().id, self.field.id])
+        
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('filename="notes.txt"', response['Content-Disposition'])
+        
+        response = self.client.get(url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        
+        response = self.client.get(url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        
+        response = self.client.get(url, HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        
+        # A changed file (other ETag) gets the whole content, not the range
+        response = self.client.get(url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{sha256}"')
+        self.assertEqual(response.status_code, 304)
+
+
+class BenchmarkAPISmokeTests(TransactionTestCase):
+    """benchmark_api against a small seed; its login authenticates on other threads, so the data is committed."""
+    
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.output = os.path.join(media_root, 'benchmark.json')
+    
+    def test_every_scenario_succeeds(self):
+        call_command('seed_ems', users=1, templates=1, employees=5, stdout=io.StringIO())
+        # The test runner has set the test environment up already
+        with mock.patch('employees.management.commands.benchmark_api.setup_test_environment'), \
+                mock.patch('employees.management.commands.benchmark_api.teardown_test_environment'):
+            call_command('benchmark_api', repeat=1, warmup=0, output=self.output, stdout=io.StringIO())
+        
+        with open(self.output) as f:
+            report = json.load(f)
+        self.assertEqual(report['routes_without_scenario'], [])
+        failed = {label: result['status'] for label, result in report['results'].items()
+                  if not all(200 <= status < 300 for status in result['status'])}
+        self.assertEqual(failed, {})
+        routes = {result['route'] for result in report['results'].values()}
+        for route in ['api_employee_file_upload', 'api_employee_file', 'api_employee_history',
+                      'api_job_list', 'api_job_detail', 'api_job_download']:
+            self.assertIn(route, routes)
+        self.assertFalse(CustomUser.objects.filter(username='benchmark_login').exists())
+
+
+CONTENTION_SETUP = """
+from accounts.models import CustomUser
+from forms_builder.models import FormTemplate, FormField
+user = CustomUser.objects.create_user(username='writer')
+form_template = FormTemplate.objects.create(name='Contention', created_by=user)
+FormField.objects.bulk_create([
+    FormField(form_template=form_template, label=f'Field {i}', field_type='text', order=i) for i in range(5)
+])
+"""
+
+CONTENTION_WRITER = """
+from accounts.models import CustomUser
+from employees.services import clean_field_values, create_employee, update_employee
+from forms_builder.models import FormTemplate
+from forms_builder.schema import get_form_schema
+user = CustomUser.objects.get(username='writer')
+schema = get_form_schema(FormTemplate.objects.get(name='Contention').id)
+first = str(schema.fields[0].id)
+for i in range(%d):
+    employee = create_employee(schema, clean_field_values(schema, {str(f.id): str(i) for f in schema.fields}), user)
+    update_employee(employee, schema, clean_field_values(schema, {first: 'updated'}, partial=True))
+"""
+
+
+class SQLiteWriteContentionTests(SimpleTestCase):
+    """Several processes writing to one SQLite file with the production profile."""
+    
+    writers = 6
+    rows = 25
+    
+    def manage(self, env, *args):
+        return subprocess.Popen(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+    
+    def run_manage(self, env, *args):
+        process = self.manage(env, *args)
+        stdout, stderr = process.communicate(timeout=120)
+        self.assertEqual(process.returncode, 0, stderr)
+        return stdout
+    
+    def test_concurrent_writers_do_not_fail(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                'EMS_SQLITE_PATH': os.path.join(directory, 'db.sqlite3'),
+                'EMS_SQLITE_PRODUCTION': '1',
+            }
+            self.run_manage(env, 'migrate', '-v', '0')
+            self.run_manage(env, 'shell', '-c', CONTENTION_SETUP)
+            
+            processes = [
+                self.manage(env, 'shell', '-c', CONTENTION_WRITER % self.rows) for _ in range(self.writers)
+            ]
+            for process in processes:
+                stdout, stderr = process.communicate(timeout=120)
+                self.assertEqual(process.returncode, 0, stderr)
+            
+            counts = self.run_manage(env, 'shell', '-c', (
+                "from employees.models import Employee, EmployeeFieldValue; "
+                "print(Employee.objects.count(), EmployeeFieldValue.objects.filter(value='updated').count())"
+            ))
+            self.assertEqual(counts.splitlines()[-1].split(), [str(self.writers * self.rows)] * 2)
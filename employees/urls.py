@@ -1,5 +1,6 @@
 from django.urls import path
-from . import views, api_views
+from core.async_api import read_view
+from . import views, api_views, async_api_views
 
 urlpatterns = [
     # Web views
@@ -12,6 +13,14 @@ urlpatterns = [
 
 # API URL patterns
 api_urlpatterns = [
-    path('', api_views.EmployeeListAPIView.as_view(), name='api_employee_list'),
-    path('<int:pk>/', api_views.EmployeeDetailAPIView.as_view(), name='api_employee_detail'),
+    path('', read_view(api_views.EmployeeListAPIView.as_view(), async_api_views.employee_list),
+         name='api_employee_list'),
+    path('import/', api_views.EmployeeImportAPIView.as_view(), name='api_employee_import'),
+    path('export/', api_views.EmployeeExportAPIView.as_view(), name='api_employee_export'),
+    path('files/', api_views.EmployeeFileUploadAPIView.as_view(), name='api_employee_file_upload'),
+    path('stats/', api_views.EmployeeStatsAPIView.as_view(), name='api_employee_stats'),
+    path('<int:pk>/', read_view(api_views.EmployeeDetailAPIView.as_view(), async_api_views.employee_detail),
+         name='api_employee_detail'),
+    path('<int:pk>/history/', api_views.EmployeeHistoryAPIView.as_view(), name='api_employee_history'),
+    path('<int:pk>/files/<int:field_id>/', api_views.EmployeeFileDownloadAPIView.as_view(), name='api_employee_file'),
 ]
@@ -0,0 +1,99 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.utils.dateparse import parse_date
+
+
+CHECKBOX_TRUE = {'1', 'true', 'yes', 'on', 'y', 't'}
+CHECKBOX_FALSE = {'0', 'false', 'no', 'off', 'n', 'f'}
+
+
+# Shadow column holding the typed copy of a value, per field type
+TYPED_COLUMNS = {
+    'number': 'value_number',
+    'date': 'value_date',
+    'checkbox': 'value_bool',
+}
+
+
+def to_python(field_type, value):
+    """Convert stored text to the type of its shadow column, or None if it does not parse."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    if field_type == 'number':
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        # NaN and infinities cannot be range-compared
+        return number if number - number == 0 else None
+    if field_type == 'date':
+        try:
+            return parse_date(value)
+        except ValueError:
+            return None
+    if field_type == 'checkbox':
+        if value.lower() in CHECKBOX_TRUE:
+            return True
+        if value.lower() in CHECKBOX_FALSE:
+            return False
+    return None
+
+
+def typed_values(field_type, value):
+    """Shadow column values for a stored value; columns not used by the type are cleared."""
+    typed = {column: None for column in TYPED_COLUMNS.values()}
+    if field_type in TYPED_COLUMNS:
+        typed[TYPED_COLUMNS[field_type]] = to_python(field_type, value)
+    return typed
+
+
+def clean_field_value(field, value):
+    """
+    Validate a raw value against a form field and return it as stored text.
+    
+    File values are resolved against the stored files by the callers, for
+    all the values of a request or import chunk at once (see
+    ``employees.files.unresolved_file_values``).
+    """
+    if value is None:
+        value = ''
+    if not isinstance(value, str):
+        value = str(value)
+    value = value.strip()
+    
+    if not value:
+        if field.required:
+            raise ValidationError(f'{field.label} is required')
+        return ''
+    
+    if field.field_type == 'number':
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValidationError(f'{field.label} must be a number')
+        # NaN and infinities would be stored without a typed value (see to_python)
+        if number - number != 0:
+            raise ValidationError(f'{field.label} must be a finite number')
+    elif field.field_type == 'date':
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError(f'{field.label} must be a date (YYYY-MM-DD)')
+    elif field.field_type == 'email':
+        try:
+            validate_email(value)
+        except ValidationError:
+            raise ValidationError(f'{field.label} must be a valid email address')
+    elif field.field_type == 'checkbox':
+        if value.lower() not in CHECKBOX_TRUE | CHECKBOX_FALSE:
+            raise ValidationError(f'{field.label} must be true or false')
+    elif field.field_type == 'select' and field.options:
+        if value not in [str(option) for option in field.options]:
+            raise ValidationError(f'{field.label} must be one of: {", ".join(map(str, field.options))}')
+    
+    return value
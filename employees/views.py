@@ -2,58 +2,92 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.db.models import Q
-from django.db import transaction
+from django.core.exceptions import ValidationError
 import json
 
-from .models import Employee, EmployeeFieldValue
-from forms_builder.models import FormTemplate, FormField
+from .models import Employee
+from .files import parse_file_reference
+from .services import build_snapshot, clean_field_values, create_employee, delete_employee, update_employee
+from .search import search_employees
+from .stats import dashboard_stats
+from forms_builder.models import FormTemplate
+from forms_builder.schema import get_form_schema
 
 
 class DashboardView(LoginRequiredMixin, View):
     
     def get(self, request):
-        return render(request, 'dashboard.html')
+        return render(request, 'dashboard.html', {'stats': dashboard_stats()})
 
 
 class EmployeeListView(LoginRequiredMixin, View):
+    paginate_by = 25
+    max_paginate_by = 100
+    # Number of field values shown in the "Details" column
+    display_fields = 2
     
     def get(self, request):
-        employees = Employee.objects.all().prefetch_related('field_values__form_field')
-        form_templates = FormTemplate.objects.all()
+        employees = Employee.objects.only('id', 'form_template_id', 'created_at', 'data').order_by('-created_at', '-id')
+        form_templates = FormTemplate.objects.only('id', 'name')
         
         # Search functionality
         search = request.GET.get('search', '')
         form_filter = request.GET.get('form_template', '')
         
         if search:
-            # Search in field values
-            employee_ids = EmployeeFieldValue.objects.filter(
-                value__icontains=search
-            ).values_list('employee_id', flat=True)
-            employees = employees.filter(id__in=employee_ids)
+            # Full-text search in field values
+            employees = search_employees(employees, search)
         
         if form_filter:
             employees = employees.filter(form_template_id=form_filter)
         
-        # Prepare employee data with field values
-        employee_list = []
-        for emp in employees:
-            emp_data = {
-                'id': emp.id,
-                'form_template': emp.form_template.name,
-                'created_at': emp.created_at,
-                'fields': {fv.form_field.label: fv.value for fv in emp.field_values.all()}
-            }
-            employee_list.append(emp_data)
+        paginator = Paginator(employees, self.get_paginate_by(request))
+        page = paginator.get_page(request.GET.get('page'))
         
         return render(request, 'employees/employee_list.html', {
-            'employees': employee_list,
+            'employees': self.get_rows(page.object_list),
+            'page_obj': page,
             'form_templates': form_templates,
             'search': search,
             'form_filter': form_filter
         })
+    
+    def get_paginate_by(self, request):
+        try:
+            return max(1, min(int(request.GET['page_size']), self.max_paginate_by))
+        except (KeyError, ValueError):
+            return self.paginate_by
+    
+    def get_rows(self, employees):
+        """
+        Build the rows of one page from the employee snapshots and the cached schemas.
+        
+        Employees without a snapshot yet are filled in from their value rows
+        with a single query for the whole page.
+        """
+        employees = list(employees)
+        missing = build_snapshot([emp.id for emp in employees if emp.data is None])
+        
+        rows = []
+        for emp in employees:
+            data = missing.get(emp.id, emp.data)
+            schema = get_form_schema(emp.form_template_id)
+            fields = {}
+            for field in schema.fields if schema is not None else ():
+                if str(field.id) in data:
+                    fields[field.label] = data[str(field.id)]
+                    if len(fields) == self.display_fields:
+                        break
+            rows.append({
+                'id': emp.id,
+                'form_template': schema.name if schema is not None else '',
+                'created_at': emp.created_at,
+                'fields': fields
+            })
+        return rows
 
 
 class EmployeeCreateView(LoginRequiredMixin, View):
@@ -80,34 +114,17 @@ class EmployeeCreateView(LoginRequiredMixin, View):
             if not form_template_id:
                 return JsonResponse({'success': False, 'message': 'Form template is required'}, status=400)
             
-            form_template = get_object_or_404(FormTemplate, pk=form_template_id)
+            schema = get_form_schema(form_template_id)
+            if schema is None:
+                return JsonResponse({'success': False, 'message': 'Form template not found'}, status=404)
             
-            # Validate required fields
-            for field in form_template.fields.filter(required=True):
-                if str(field.id) not in field_values or not field_values[str(field.id)]:
-                    return JsonResponse({
-                        'success': False, 
-                        'message': f'{field.label} is required'
-                    }, status=400)
+            # Validate required fields and field ids
+            try:
+                cleaned = clean_field_values(schema, field_values)
+            except ValidationError as e:
+                return JsonResponse({'success': False, 'message': e.messages[0]}, status=400)
             
-            with transaction.atomic():
-                # Create employee
-                employee = Employee.objects.create(
-                    form_template=form_template,
-                    created_by=request.user
-                )
-                
-                # Create field values
-                for field_id, value in field_values.items():
-                    try:
-                        form_field = FormField.objects.get(id=int(field_id))
-                        EmployeeFieldValue.objects.create(
-                            employee=employee,
-                            form_field=form_field,
-                            value=value
-                        )
-                    except FormField.DoesNotExist:
-                        pass
+            employee = create_employee(schema, cleaned, request.user)
             
             return JsonResponse({
                 'success': True,
@@ -122,7 +139,7 @@ class EmployeeDetailView(LoginRequiredMixin, View):
     
     def get(self, request, pk):
         employee = get_object_or_404(Employee, pk=pk)
-        field_values = employee.field_values.all().select_related('form_field')
+        field_values = employee.field_values.current().select_related('form_field')
         
         if request.headers.get('Accept') == 'application/json':
             return JsonResponse({
@@ -141,6 +158,10 @@ class EmployeeDetailView(LoginRequiredMixin, View):
                 'created_at': employee.created_at.isoformat()
             })
         
+        field_values = list(field_values)
+        for fv in field_values:
+            reference = parse_file_reference(fv.value) if fv.form_field.field_type == 'file' else None
+            fv.file_name = reference[1] if reference else None
         return render(request, 'employees/employee_detail.html', {
             'employee': employee,
             'field_values': field_values
@@ -151,7 +172,7 @@ class EmployeeUpdateView(LoginRequiredMixin, View):
     
     def get(self, request, pk):
         employee = get_object_or_404(Employee, pk=pk)
-        field_values = {str(fv.form_field.id): fv.value for fv in employee.field_values.all()}
+        field_values = {str(fv.form_field_id): fv.value for fv in employee.field_values.current()}
         
         return render(request, 'employees/employee_edit.html', {
             'employee': employee,
@@ -163,27 +184,15 @@ class EmployeeUpdateView(LoginRequiredMixin, View):
             employee = get_object_or_404(Employee, pk=pk)
             data = json.loads(request.body)
             field_values = data.get('field_values', {})
+            schema = get_form_schema(employee.form_template_id)
             
-            # Validate required fields
-            for field in employee.form_template.fields.filter(required=True):
-                if str(field.id) not in field_values or not field_values[str(field.id)]:
-                    return JsonResponse({
-                        'success': False, 
-                        'message': f'{field.label} is required'
-                    }, status=400)
+            # Validate required fields and field ids
+            try:
+                cleaned = clean_field_values(schema, field_values)
+            except ValidationError as e:
+                return JsonResponse({'success': False, 'message': e.messages[0]}, status=400)
             
-            with transaction.atomic():
-                # Update field values
-                for field_id, value in field_values.items():
-                    try:
-                        form_field = FormField.objects.get(id=int(field_id))
-                        EmployeeFieldValue.objects.update_or_create(
-                            employee=employee,
-                            form_field=form_field,
-                            defaults={'value': value}
-                        )
-                    except FormField.DoesNotExist:
-                        pass
+            update_employee(employee, schema, cleaned, request.user)
             
             return JsonResponse({
                 'success': True,
@@ -198,7 +207,7 @@ class EmployeeDeleteView(LoginRequiredMixin, View):
     def post(self, request, pk):
         try:
             employee = get_object_or_404(Employee, pk=pk)
-            employee.delete()
+            delete_employee(employee)
             return JsonResponse({'success': True, 'message': 'Employee deleted successfully'})
         except Exception as e:
             return JsonResponse({'success': False, 'message': str(e)}, status=400)
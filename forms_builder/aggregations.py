@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Case, Count, F, IntegerField, Max, Min, When
+from django.db.models.functions import Floor, TruncDay, TruncMonth, TruncWeek, TruncYear
+
+from core.cache import get_version, invalidate_version
+from core.routers import primary_reads
+
+from .schema import get_form_schema
+
+
+AGGREGATION_CACHE_TIMEOUT = getattr(settings, 'FORM_AGGREGATION_CACHE_TIMEOUT', 5 * 60)
+
+HISTOGRAM_BINS = 10
+MAX_HISTOGRAM_BINS = 50
+DATE_BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+AGGREGATED_TYPES = ('select', 'checkbox', 'number', 'date')
+
+
+def version_key(template_id):
+    return f'form_aggregations:version:{template_id}'
+
+
+def invalidate_aggregations(template_id):
+    """Called by the employee write paths whenever values of a template change."""
+    invalidate_version(version_key(template_id))
+
+
+def value_counts(values, field_ids, column):
+    results = {field_id: {'count': 0, 'values': []} for field_id in field_ids}
+    answered = values.filter(form_field_id__in=field_ids, **{f'{column}__isnull': False}).exclude(value='')
+    rows = answered.values_list('form_field_id', column).annotate(
+        n=Count('id')
+    ).order_by('form_field_id', '-n', column)
+    for field_id, value, count in rows:
+        results[field_id]['count'] += count
+        results[field_id]['values'].append({'value': value, 'count': count})
+    return results
+
+
+def number_stats(values, field_ids, bins):
+    results = {
+        field_id: {'count': 0, 'min': None, 'max': None, 'avg': None, 'histogram': []}
+        for field_id in field_ids
+    }
+    numbers = values.filter(form_field_id__in=field_ids, value_number__isnull=False)
+    rows = numbers.values_list('form_field_id').annotate(
+        Count('id'), Min('value_number'), Max('value_number'), Avg('value_number')
+    ).order_by()
+    
+    widths = {}
+    for field_id, count, low, high, avg in rows:
+        results[field_id].update(count=count, min=low, max=high, avg=avg)
+        if high == low:
+            results[field_id]['histogram'] = [{'from': low, 'to': high, 'count': count}]
+            continue
+        width = widths[field_id] = (high - low) / bins
+        results[field_id]['histogram'] = [
+            {'from': low + i * width, 'to': low + (i + 1) * width, 'count': 0} for i in range(bins)
+        ]
+    
+    if widths:
+        bucket = Case(
+            *[
+                When(form_field_id=field_id, then=Floor((F('value_number') - results[field_id]['min']) / width))
+                for field_id, width in widths.items()
+            ],
+            output_field=IntegerField()
+        )
+        rows = numbers.filter(form_field_id__in=widths).annotate(bucket=bucket).values_list(
+            'form_field_id', 'bucket'
+        ).annotate(n=Count('id')).order_by()
+        for field_id, index, count in rows:
+            # The maximum itself falls on the upper edge of the last bucket
+            results[field_id]['histogram'][min(int(index), bins - 1)]['count'] += count
+    return results
+
+
+def date_buckets(values, field_ids, date_bucket):
+    results = {field_id: {'count': 0, 'bucket': date_bucket, 'buckets': []} for field_id in field_ids}
+    rows = values.filter(form_field_id__in=field_ids, value_date__isnull=False).annotate(
+        bucket=DATE_BUCKETS[date_bucket]('value_date')
+    ).values_list('form_field_id', 'bucket').annotate(n=Count('id')).order_by('form_field_id', 'bucket')
+    for field_id, bucket, count in rows:
+        results[field_id]['count'] += count
+        results[field_id]['buckets'].append({'date': bucket.isoformat(), 'count': count})
+    return results
+
+
+@primary_reads()
+def compute_aggregations(schema, date_bucket='month', bins=HISTOGRAM_BINS):
+    """
+    Per-field analytics for a template, computed in SQL over the value rows.
+    
+    Value counts for select and checkbox fields, count/min/max/avg and a
+    ``bins``-bucket histogram for number fields, and counts per
+    ``date_bucket`` for date fields. Number, date and checkbox fields use
+    the typed columns. At most five queries whatever the number of fields.
+    """
+    from employees.models import EmployeeFieldValue
+    
+    fields = [field for field in schema.fields if field.field_type in AGGREGATED_TYPES]
+    field_ids = {field_type: [] for field_type in AGGREGATED_TYPES}
+    for field in fields:
+        field_ids[field.field_type].append(field.id)
+    values = EmployeeFieldValue.objects.all()
+    
+    results = {}
+    if field_ids['select']:
+        results.update(value_counts(values, field_ids['select'], 'value'))
+    if field_ids['checkbox']:
+        results.update(value_counts(values, field_ids['checkbox'], 'value_bool'))
+    if field_ids['number']:
+        results.update(number_stats(values, field_ids['number'], bins))
+    if field_ids['date']:
+        results.update(date_buckets(values, field_ids['date'], date_bucket))
+    
+    return [
+        {'id': field.id, 'label': field.label, 'field_type': field.field_type, **results[field.id]}
+        for field in fields
+    ]
+
+
+def get_form_aggregations(template_id, date_bucket='month', bins=HISTOGRAM_BINS):
+    """
+    Cached ``compute_aggregations`` for a template, or None if it doesn't exist.
+    
+    Entries are keyed by the schema version, so field changes show at once,
+    and by a data version that the employee write paths bump through
+    ``invalidate_aggregations``. Writes that bypass them (deleting the
+    creating user) show after ``FORM_AGGREGATION_CACHE_TIMEOUT``.
+    """
+    schema = get_form_schema(template_id)
+    if schema is None:
+        return None
+    
+    key = (
+        f'form_aggregations:{template_id}:{schema.version}:'
+        f'{get_version(version_key(template_id))}:{date_bucket}:{bins}'
+    )
+    aggregations = cache.get(key)
+    if aggregations is None:
+        aggregations = compute_aggregations(schema, date_bucket, bins)
+        cache.set(key, aggregations, AGGREGATION_CACHE_TIMEOUT)
+    return aggregations
@@ -2,31 +2,34 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.http import Http404
+from django.core.exceptions import ValidationError as DjangoValidationError
 
-from .models import FormTemplate, FormField
+from .models import FormTemplate
 from .serializers import FormTemplateSerializer, FormTemplateCreateSerializer, FormFieldSerializer
+from .schema import get_form_schema
+from .aggregations import DATE_BUCKETS, HISTOGRAM_BINS, MAX_HISTOGRAM_BINS, get_form_aggregations
+from .services import reorder_fields
+from core.pagination import get_paginator
+from jobs.queue import enqueue
+from jobs.serializers import JobSerializer
 
 
 class FormTemplateListAPIView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        form_templates = FormTemplate.objects.all()
+        form_templates = FormTemplate.objects.select_related('created_by').prefetch_related('fields')
         
-        # Pagination
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
+        # Pagination (page numbers by default, keyset with ?cursor= or ?pagination=cursor)
+        paginator = get_paginator(request)
         paginated_templates = paginator.paginate_queryset(form_templates, request)
         serializer = FormTemplateSerializer(paginated_templates, many=True)
         
         return Response({
             'success': True,
-            'count': paginator.page.paginator.count,
-            'next': paginator.get_next_link(),
-            'previous': paginator.get_previous_link(),
+            **paginator.get_page_info(),
             'form_templates': serializer.data
         })
     
@@ -49,11 +52,12 @@ class FormTemplateDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, pk):
-        form_template = get_object_or_404(FormTemplate, pk=pk)
-        serializer = FormTemplateSerializer(form_template)
+        schema = get_form_schema(pk)
+        if schema is None:
+            raise Http404
         return Response({
             'success': True,
-            'form_template': serializer.data
+            'form_template': schema.representation()
         })
     
     def put(self, request, pk):
@@ -73,10 +77,42 @@ class FormTemplateDetailAPIView(APIView):
     
     def delete(self, request, pk):
         form_template = get_object_or_404(FormTemplate, pk=pk)
-        form_template.delete()
+        # Its employees are deleted in chunks by a background job; poll the job for progress
+        job = enqueue('forms.delete_template', created_by=request.user, unique=True, template_id=form_template.pk)
+        return Response({
+            'success': True,
+            'message': 'Form template is being deleted',
+            'job': JobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class FormTemplateAggregationAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        errors = {}
+        date_bucket = request.query_params.get('date_bucket', 'month')
+        if date_bucket not in DATE_BUCKETS:
+            errors['date_bucket'] = [f'Must be one of: {", ".join(DATE_BUCKETS)}.']
+        try:
+            bins = int(request.query_params.get('bins', HISTOGRAM_BINS))
+        except ValueError:
+            bins = 0
+        if not 1 <= bins <= MAX_HISTOGRAM_BINS:
+            errors['bins'] = [f'Must be a whole number between 1 and {MAX_HISTOGRAM_BINS}.']
+        if errors:
+            return Response({
+                'success': False,
+                'errors': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        aggregations = get_form_aggregations(pk, date_bucket=date_bucket, bins=bins)
+        if aggregations is None:
+            raise Http404
         return Response({
             'success': True,
-            'message': 'Form template deleted successfully'
+            'form_template': pk,
+            'aggregations': aggregations
         })
 
 
@@ -86,10 +122,19 @@ class FormFieldReorderAPIView(APIView):
     def post(self, request, pk):
         form_template = get_object_or_404(FormTemplate, pk=pk)
         field_order = request.data.get('field_order', [])
+        if not isinstance(field_order, list):
+            return Response({
+                'success': False,
+                'errors': {'field_order': ['Must be a list of field ids.']}
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        with transaction.atomic():
-            for index, field_id in enumerate(field_order):
-                FormField.objects.filter(id=field_id, form_template=form_template).update(order=index)
+        try:
+            reorder_fields(form_template, field_order)
+        except DjangoValidationError as e:
+            return Response({
+                'success': False,
+                'errors': e.message_dict
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'success': True,
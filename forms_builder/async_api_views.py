@@ -0,0 +1,33 @@
+from rest_framework.exceptions import NotFound
+
+from core.async_api import async_api_view
+from core.pagination import get_paginator
+
+from .models import FormTemplate
+from .schema import aget_form_schema
+from .serializers import FormTemplateSerializer
+
+
+@async_api_view
+async def form_template_list(request):
+    """Async ``GET /api/forms/``, same parameters and response as FormTemplateListAPIView."""
+    form_templates = FormTemplate.objects.select_related('created_by').prefetch_related('fields')
+    
+    paginator = get_paginator(request)
+    page = await paginator.apaginate_queryset(form_templates, request)
+    return {
+        'success': True,
+        **paginator.get_page_info(),
+        'form_templates': FormTemplateSerializer(page, many=True).data
+    }
+
+
+@async_api_view
+async def form_template_detail(request, pk):
+    schema = await aget_form_schema(pk)
+    if schema is None:
+        raise NotFound('No FormTemplate matches the given query.')
+    return {
+        'success': True,
+        'form_template': schema.representation()
+    }
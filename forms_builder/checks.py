@@ -0,0 +1,18 @@
+from django.core.checks import Error, Tags, register
+
+from core.cache import is_shared_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_schema_cache(app_configs, **kwargs):
+    # Schema invalidations would not reach the other worker processes
+    if not is_shared_cache():
+        return [Error(
+            'Compiled form schemas need a cache shared by all worker processes.',
+            hint=(
+                'Point CACHES["default"] at Redis or Memcached (EMS_REDIS_URL). With a per-process '
+                'cache, other workers keep validating against old fields for FORM_SCHEMA_LOCAL_TTL seconds.'
+            ),
+            id='forms_builder.E001',
+        )]
+    return []
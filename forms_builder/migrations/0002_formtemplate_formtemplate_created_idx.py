@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_builder', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='formtemplate',
+            index=models.Index(fields=['-created_at', '-id'], name='formtemplate_created_idx'),
+        ),
+    ]
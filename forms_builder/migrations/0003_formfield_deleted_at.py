@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_builder', '0002_formtemplate_formtemplate_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formfield',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
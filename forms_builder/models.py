@@ -16,11 +16,21 @@ class FormTemplate(models.Model):
     class Meta:
         db_table = 'forms_builder_formtemplate'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='formtemplate_created_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
 
+class FormFieldManager(models.Manager):
+    """Hides soft-deleted fields; their values are purged later by ``purge_deleted_fields``."""
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class FormField(models.Model):
     FIELD_TYPES = [
         ('text', 'Text'),
@@ -49,6 +59,10 @@ class FormField(models.Model):
     )
     required = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+    
+    objects = FormFieldManager()
+    all_objects = models.Manager()
     
     class Meta:
         db_table = 'forms_builder_formfield'
@@ -0,0 +1,160 @@
+import json
+from dataclasses import dataclass
+from functools import cached_property
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.cache import LocalLRUCache, get_version, invalidate_version, is_shared_cache
+from core.routers import primary_reads
+
+
+SCHEMA_CACHE_TIMEOUT = getattr(settings, 'FORM_SCHEMA_CACHE_TIMEOUT', 60 * 60)
+
+# Entries expire after a few seconds: the version counter can only tell this process
+# about changes made by others when the cache is shared
+_local_schemas = LocalLRUCache(
+    getattr(settings, 'FORM_SCHEMA_LRU_SIZE', 256), ttl=getattr(settings, 'FORM_SCHEMA_LOCAL_TTL', 5)
+)
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    id: int
+    label: str
+    field_type: str
+    placeholder: str
+    options: tuple
+    required: bool
+    order: int
+
+
+@dataclass(frozen=True)
+class FormSchema:
+    """
+    Immutable snapshot of a form template and its fields.
+    
+    Built once per template version and shared through a process-local LRU
+    and the Django cache, so hot write paths do not query the form tables.
+    """
+    template_id: int
+    version: int
+    name: str
+    fields: tuple
+    # FormTemplateSerializer output, kept as JSON so the cached copy can't be mutated
+    representation_json: str
+    
+    @cached_property
+    def fields_by_id(self):
+        return {field.id: field for field in self.fields}
+    
+    @cached_property
+    def required_fields(self):
+        return tuple(field for field in self.fields if field.required)
+    
+    @cached_property
+    def required_ids(self):
+        return frozenset(field.id for field in self.required_fields)
+    
+    def get_field(self, field_id):
+        try:
+            return self.fields_by_id.get(int(field_id))
+        except (TypeError, ValueError):
+            return None
+    
+    def representation(self):
+        return json.loads(self.representation_json)
+
+
+def version_key(template_id):
+    return f'form_schema:version:{template_id}'
+
+
+@primary_reads()
+def compile_form_schema(template_id, version):
+    from .models import FormTemplate
+    from .serializers import FormTemplateSerializer
+    
+    form_template = FormTemplate.objects.select_related('created_by').prefetch_related('fields').filter(
+        pk=template_id
+    ).first()
+    if form_template is None:
+        return None
+    
+    fields = tuple(
+        FieldSpec(
+            id=field.id,
+            label=field.label,
+            field_type=field.field_type,
+            placeholder=field.placeholder,
+            options=tuple(field.options) if isinstance(field.options, list) else (),
+            required=field.required,
+            order=field.order,
+        )
+        for field in form_template.fields.all()
+    )
+    return FormSchema(
+        template_id=form_template.id,
+        version=version,
+        name=form_template.name,
+        fields=fields,
+        representation_json=json.dumps(FormTemplateSerializer(form_template).data, cls=DjangoJSONEncoder),
+    )
+
+
+def get_form_schema(template_id):
+    """
+    Return the compiled schema of a template, or None if it does not exist.
+    
+    With a per-process cache (LocMemCache) a change made by another process
+    is only seen once the local copy expires, after ``FORM_SCHEMA_LOCAL_TTL``
+    seconds; the deploy check ``forms_builder.E001`` asks for a shared cache.
+    """
+    try:
+        template_id = int(template_id)
+    except (TypeError, ValueError):
+        return None
+    
+    version = get_version(version_key(template_id))
+    local_key = (template_id, version)
+    schema = _local_schemas.get(local_key)
+    if schema is not None:
+        return schema
+    
+    # A per-process cache would only hold what the local LRU has, without its expiry
+    shared = is_shared_cache()
+    shared_key = f'form_schema:{template_id}:{version}'
+    schema = cache.get(shared_key) if shared else None
+    if schema is None:
+        schema = compile_form_schema(template_id, version)
+        if schema is None:
+            return None
+        if shared:
+            cache.set(shared_key, schema, SCHEMA_CACHE_TIMEOUT)
+    
+    _local_schemas.set(local_key, schema)
+    return schema
+
+
+async def aget_form_schema(template_id):
+    """``get_form_schema`` for async views; only a cache miss leaves the event loop."""
+    try:
+        template_id = int(template_id)
+    except (TypeError, ValueError):
+        return None
+    
+    version = await cache.aget(version_key(template_id))
+    if version is not None:
+        schema = _local_schemas.get((template_id, version))
+        if schema is None and is_shared_cache():
+            schema = await cache.aget(f'form_schema:{template_id}:{version}')
+        if schema is not None:
+            _local_schemas.set((template_id, version), schema)
+            return schema
+    return await sync_to_async(get_form_schema)(template_id)
+
+
+def invalidate_form_schema(template_id):
+    invalidate_version(version_key(template_id))
@@ -1,9 +1,12 @@
 from rest_framework import serializers
-from django.db import transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
 from .models import FormTemplate, FormField
+from .services import create_form_template, update_form_template
 
 
 class FormFieldSerializer(serializers.ModelSerializer):
+    # Writable so that template updates can refer to existing fields
+    id = serializers.IntegerField(required=False)
     
     class Meta:
         model = FormField
@@ -27,27 +30,22 @@ class FormTemplateCreateSerializer(serializers.ModelSerializer):
         model = FormTemplate
         fields = ['id', 'name', 'description', 'fields']
     
-    @transaction.atomic
     def create(self, validated_data):
-        fields_data = validated_data.pop('fields', [])
-        form_template = FormTemplate.objects.create(**validated_data)
-        
-        for field_data in fields_data:
-            FormField.objects.create(form_template=form_template, **field_data)
-        
-        return form_template
+        return create_form_template(
+            validated_data.get('created_by'),
+            validated_data['name'],
+            validated_data.get('description', ''),
+            validated_data.get('fields', [])
+        )
     
-    @transaction.atomic
     def update(self, instance, validated_data):
-        fields_data = validated_data.pop('fields', [])
-        
-        instance.name = validated_data.get('name', instance.name)
-        instance.description = validated_data.get('description', instance.description)
-        instance.save()
-        
-        # Delete existing fields and recreate
-        instance.fields.all().delete()
-        for field_data in fields_data:
-            FormField.objects.create(form_template=instance, **field_data)
-        
-        return instance
+        # Only the difference is written; value rows of kept fields are never touched
+        try:
+            return update_form_template(
+                instance,
+                validated_data.get('name', instance.name),
+                validated_data.get('description', instance.description),
+                validated_data.get('fields')
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'fields': e.message_dict})
@@ -0,0 +1,187 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from core.db import retry_on_lock
+from jobs.queue import enqueue
+
+from .aggregations import invalidate_aggregations
+from .models import FormField, FormTemplate
+from .schema import invalidate_form_schema
+
+
+FIELD_ATTRIBUTES = ['label', 'field_type', 'placeholder', 'options', 'required', 'order']
+
+
+def field_attributes(field_data, order):
+    """Attributes given for a field; its position in the list is the default order."""
+    attributes = {name: field_data[name] for name in FIELD_ATTRIBUTES if name in field_data}
+    attributes.setdefault('order', order)
+    return attributes
+
+
+@retry_on_lock
+def sync_fields(form_template, fields_data):
+    """
+    Make the fields of a template match ``fields_data``, touching only what changed.
+    
+    Entries with the ``id`` of an existing field update it in place when any
+    of the given attributes differs, entries without one are inserted, and
+    fields that are no longer listed are soft-deleted; once that commits, the
+    ``employees.purge_deleted_fields`` job removes their values in chunks.
+    Changing the type of a field replaces it with a new one: values of the
+    old type would not fit. Ids of fields of other templates raise a
+    ValidationError.
+    
+    Returns ``{'created': n, 'updated': n, 'deleted': n}``.
+    """
+    with transaction.atomic():
+        existing = {field.id: field for field in form_template.fields.all()}
+        
+        errors = {}
+        to_create = []
+        to_update = []
+        kept = set()
+        for order, field_data in enumerate(fields_data):
+            attributes = field_attributes(field_data, order)
+            field_id = field_data.get('id')
+            if field_id in (None, ''):
+                to_create.append(FormField(form_template=form_template, **attributes))
+                continue
+            
+            try:
+                field = existing.get(int(field_id))
+            except (TypeError, ValueError):
+                field = None
+            if field is None or field.id in kept:
+                errors[str(field_id)] = f'Field {field_id} does not belong to this form template'
+                continue
+            
+            if attributes.get('field_type', field.field_type) != field.field_type:
+                to_create.append(FormField(form_template=form_template, **attributes))
+                continue
+            
+            kept.add(field.id)
+            if any(getattr(field, name) != value for name, value in attributes.items()):
+                for name, value in attributes.items():
+                    setattr(field, name, value)
+                to_update.append(field)
+        
+        if errors:
+            raise ValidationError(errors)
+        
+        removed = [field_id for field_id in existing if field_id not in kept]
+        if removed:
+            FormField.objects.filter(id__in=removed).update(deleted_at=timezone.now())
+            transaction.on_commit(lambda: enqueue('employees.purge_deleted_fields', unique=True))
+        if to_update:
+            FormField.objects.bulk_update(to_update, FIELD_ATTRIBUTES)
+        if to_create:
+            FormField.objects.bulk_create(to_create)
+        
+        # Bulk writes don't send the signals that normally invalidate the schema
+        if removed or to_update or to_create:
+            invalidate_form_schema(form_template.id)
+    
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(removed)}
+
+
+@retry_on_lock
+def reorder_fields(form_template, field_order):
+    """
+    Set the order of a template's fields from a list of all their ids.
+    
+    ``field_order`` must be a permutation of the template's current field
+    ids, otherwise a ValidationError is raised and nothing is written. All
+    positions that change are written with a single UPDATE.
+    """
+    with transaction.atomic():
+        fields = list(form_template.fields.select_for_update().only('id', 'order'))
+        
+        try:
+            field_order = [int(field_id) for field_id in field_order]
+        except (TypeError, ValueError):
+            raise ValidationError({'field_order': 'Field ids must be integers'})
+        
+        current_ids = {field.id for field in fields}
+        if len(field_order) != len(set(field_order)):
+            raise ValidationError({'field_order': 'Field ids must not repeat'})
+        if set(field_order) != current_ids:
+            unknown = sorted(set(field_order) - current_ids)
+            missing = sorted(current_ids - set(field_order))
+            message = 'Field order must list every field of this form template exactly once'
+            if unknown:
+                message += f'; unknown: {", ".join(map(str, unknown))}'
+            if missing:
+                message += f'; missing: {", ".join(map(str, missing))}'
+            raise ValidationError({'field_order': message})
+        
+        positions = {field_id: index for index, field_id in enumerate(field_order)}
+        changed = []
+        for field in fields:
+            if field.order != positions[field.id]:
+                field.order = positions[field.id]
+                changed.append(field)
+        
+        if changed:
+            FormField.objects.bulk_update(changed, ['order'])
+            invalidate_form_schema(form_template.id)
+    
+    return len(changed)
+
+
+@retry_on_lock
+def create_form_template(created_by, name, description='', fields_data=()):
+    """Create a template with its fields. Field ids are ignored: a copied template's would refer to the original."""
+    with transaction.atomic():
+        form_template = FormTemplate.objects.create(name=name, description=description, created_by=created_by)
+        sync_fields(form_template, [
+            {key: value for key, value in field_data.items() if key != 'id'} for field_data in fields_data
+        ])
+    return form_template
+
+
+@retry_on_lock
+def update_form_template(form_template, name, description, fields_data=None):
+    """Rename a template and, unless ``fields_data`` is None, sync its fields with ``sync_fields``."""
+    with transaction.atomic():
+        form_template.name = name
+        form_template.description = description
+        form_template.save()
+        if fields_data is not None:
+            sync_fields(form_template, fields_data)
+    return form_template
+
+
+@retry_on_lock
+def delete_template_row(template_id):
+    with transaction.atomic():
+        FormTemplate.objects.filter(pk=template_id).delete()
+
+
+def delete_form_template(template_id, chunk_size=1000, progress=None):
+    """
+    Delete a form template and its employees, ``chunk_size`` employees per transaction.
+    
+    A single cascading delete of a large template holds the write lock until
+    every row is gone. ``progress(deleted, total)`` is called after each
+    chunk. Safe to run again after failing half way. Returns the number of
+    employees deleted.
+    """
+    from employees.models import Employee
+    from employees.services import delete_employees
+    
+    employees = Employee.objects.filter(form_template_id=template_id).order_by('id')
+    total = employees.count()
+    deleted = 0
+    while True:
+        ids = list(employees.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            break
+        deleted += delete_employees(ids)
+        if progress is not None:
+            progress(deleted, max(total, deleted))
+    
+    delete_template_row(template_id)
+    invalidate_aggregations(template_id)
+    return deleted
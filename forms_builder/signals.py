@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import FormTemplate, FormField
+from .schema import invalidate_form_schema
+
+
+@receiver([post_save, post_delete], sender=FormTemplate)
+def form_template_changed(sender, instance, **kwargs):
+    invalidate_form_schema(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=FormField)
+def form_field_changed(sender, instance, **kwargs):
+    invalidate_form_schema(instance.form_template_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def form_owner_changed(sender, instance, update_fields=None, **kwargs):
+    # Compiled schemas embed the creator's username
+    if kwargs.get('created') or (update_fields is not None and 'username' not in update_fields):
+        return
+    for template_id in FormTemplate.objects.filter(created_by=instance).values_list('id', flat=True):
+        invalidate_form_schema(template_id)
@@ -0,0 +1,12 @@
+from jobs.queue import task
+
+from .services import delete_form_template
+
+
+@task('forms.delete_template')
+def delete_template(job, template_id):
+    deleted = delete_form_template(
+        template_id,
+        progress=lambda done, total: job.set_progress(done, total, f'Deleted {done} of {total} employees')
+    )
+    return {'employees_deleted': deleted}
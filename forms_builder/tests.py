@@ -1,3 +1,312 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+from core.testing import QueryBudgetMixin
+from employees.models import Employee
+from employees.services import clean_field_values, create_employee, delete_employee, update_employee
+from jobs.models import Job
+
+from .checks import check_schema_cache
+from .models import FormTemplate, FormField
+from .schema import get_form_schema
+from .serializers import FormTemplateCreateSerializer
+
+
+class FormTemplateAPIQueryBudgetTests(QueryBudgetMixin, TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='designer', password='pass12345!')
+        for i in range(5):
+            form_template = FormTemplate.objects.create(name=f'Template {i}', created_by=cls.user)
+            FormField.objects.bulk_create([
+                FormField(form_template=form_template, label=f'Field {j}', field_type='text', order=j)
+                for j in range(10)
+            ])
+    
+    def setUp(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    
+    def test_list_within_budget(self):
+        response = self.assertWithinQueryBudget('get', reverse('api_form_list'))
+        self.assertEqual(len(response.json()['form_templates']), 5)
+    
+    def test_detail_within_budget(self):
+        for form_template in FormTemplate.objects.all():
+            response = self.assertWithinQueryBudget('get', reverse('api_form_detail', args=[form_template.pk]))
+            self.assertEqual(len(response.json()['form_template']['fields']), 10)
+
+
+class FormTemplateUpdateTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='editor', password='pass12345!')
+    
+    def setUp(self):
+        self.form_template = FormTemplate.objects.create(name='Staff', created_by=self.user)
+        FormField.objects.bulk_create([
+            FormField(form_template=self.form_template, label=f'Field {i}', field_type='text', order=i)
+            for i in range(5)
+        ])
+        self.fields = list(self.form_template.fields.all())
+    
+    def update(self, fields, **data):
+        payload = {'name': 'Staff', 'description': '', 'fields': fields, **data}
+        serializer = FormTemplateCreateSerializer(self.form_template, data=payload)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+    
+    def current_fields(self):
+        return [
+            {'id': field.id, 'label': field.label, 'field_type': field.field_type, 'order': field.order}
+            for field in self.fields
+        ]
+    
+    def test_unchanged_fields_keep_their_ids_and_are_not_written(self):
+        # SAVEPOINT, UPDATE template, SAVEPOINT, SELECT fields, RELEASE, RELEASE
+        with self.assertNumQueries(6):
+            self.update(self.current_fields(), description='New description')
+        self.assertEqual(
+            list(self.form_template.fields.values_list('id', flat=True)),
+            [field.id for field in self.fields]
+        )
+    
+    def test_diff_updates_inserts_and_soft_deletes(self):
+        fields = self.current_fields()
+        fields[0]['label'] = 'Renamed'
+        removed = fields.pop()
+        fields.append({'label': 'New field', 'field_type': 'number'})
+        self.update(fields)
+        
+        current = {field.id: field for field in self.form_template.fields.all()}
+        self.assertEqual(current[self.fields[0].id].label, 'Renamed')
+        self.assertNotIn(removed['id'], current)
+        self.assertEqual(len(current), 5)
+        self.assertIsNotNone(FormField.all_objects.get(pk=removed['id']).deleted_at)
+    
+    @override_settings(JOBS_EAGER=False)
+    def test_removing_fields_queues_the_purge(self):
+        fields = self.current_fields()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.update(fields, description='Unchanged fields')
+        self.assertFalse(Job.objects.exists())
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.update(fields[:-1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.update(fields[:-2])
+        # One pending purge covers every removed field
+        self.assertEqual(list(Job.objects.values_list('task', 'status')), [('employees.purge_deleted_fields', Job.QUEUED)])
+    
+    def test_fields_of_other_templates_are_rejected(self):
+        other = FormTemplate.objects.create(name='Other', created_by=self.user)
+        foreign = FormField.objects.create(form_template=other, label='Foreign', field_type='text')
+        serializer = FormTemplateCreateSerializer(self.form_template, data={
+            'name': 'Staff', 'fields': [{'id': foreign.id, 'label': 'Foreign', 'field_type': 'text'}]
+        })
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(Exception):
+            serializer.save()
+        self.assertEqual(self.form_template.fields.count(), 5)
+
+
+
+class FormSchemaCacheTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='writer', password='pass12345!')
+    
+    def setUp(self):
+        cache.clear()
+        self.form_template = FormTemplate.objects.create(name='Staff', created_by=self.user)
+        self.field = FormField.objects.create(form_template=self.form_template, label='Name', field_type='text')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    
+    def form_queries(self, queries):
+        # Joins of the template to the employee row it belongs to cost nothing extra
+        return [query['sql'] for query in queries if 'FROM "forms_builder_' in query['sql']]
+    
+    def test_warm_writes_do_not_query_the_form_tables(self):
+        get_form_schema(self.form_template.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('api_employee_list'), {
+                'form_template': self.form_template.id, 'field_values': {str(self.field.id): 'Ada'}
+            }, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+            response = self.client.put(reverse('api_employee_detail', args=[response.json()['employee']['id']]), {
+                'form_template': self.form_template.id, 'field_values': {str(self.field.id): 'Grace'}
+            }, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.form_queries(queries), [])
+        
+        schema = get_form_schema(self.form_template.id)
+        with self.assertNumQueries(0):
+            cleaned = clean_field_values(schema, {str(self.field.id): 'Ada'})
+        with CaptureQueriesContext(connection) as queries:
+            employee = create_employee(schema, cleaned, self.user)
+            update_employee(employee, schema, clean_field_values(schema, {str(self.field.id): 'Grace'}))
+        self.assertEqual(self.form_queries(queries), [])
+    
+    def test_field_and_template_changes_invalidate(self):
+        self.assertEqual(len(get_form_schema(self.form_template.id).fields), 1)
+        
+        added = FormField.objects.create(form_template=self.form_template, label='Email', field_type='email')
+        self.assertEqual(len(get_form_schema(self.form_template.id).fields), 2)
+        
+        added.required = True
+        added.save()
+        self.assertEqual(get_form_schema(self.form_template.id).required_ids, {added.id})
+        
+        added.delete()
+        self.assertIsNone(get_form_schema(self.form_template.id).get_field(added.id))
+        
+        self.form_template.name = 'Employees'
+        self.form_template.save()
+        self.assertEqual(get_form_schema(self.form_template.id).name, 'Employees')
+    
+    @override_settings(FORM_SCHEMA_LOCAL_TTL=5)
+    def test_changes_of_other_processes_show_once_the_local_copy_expires(self):
+        get_form_schema(self.form_template.id)
+        # Another process makes the field required; an update sends no signal, like its version bump
+        # that never reaches this process's cache
+        FormField.objects.filter(pk=self.field.pk).update(required=True)
+        self.assertFalse(get_form_schema(self.form_template.id).required_ids)
+        
+        with mock.patch('core.cache.time.monotonic', return_value=time.monotonic() + 6):
+            self.assertEqual(get_form_schema(self.form_template.id).required_ids, {self.field.id})
+    
+    def test_deploy_check_requires_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_schema_cache(None)], ['forms_builder.E001'])
+
+
+class FormFieldReorderTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='sorter', password='pass12345!')
+        cls.form_template = FormTemplate.objects.create(name='Large', created_by=cls.user)
+        FormField.objects.bulk_create([
+            FormField(form_template=cls.form_template, label=f'Field {i}', field_type='text', order=i)
+            for i in range(50)
+        ])
+    
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('api_form_reorder', args=[self.form_template.pk])
+        self.ids = list(self.form_template.fields.values_list('id', flat=True))
+    
+    def test_reorder_is_one_update(self):
+        reversed_ids = self.ids[::-1]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'field_order': reversed_ids}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        updates = [query for query in ctx.captured_queries if query['sql'].startswith('UPDATE "forms_builder_formfield"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(list(self.form_template.fields.values_list('id', flat=True)), reversed_ids)
+    
+    def test_partial_or_foreign_ids_are_rejected(self):
+        other = FormTemplate.objects.create(name='Other', created_by=self.user)
+        foreign = FormField.objects.create(form_template=other, label='Foreign', field_type='text')
+        for field_order in (self.ids[:-1], self.ids + [foreign.id], self.ids[:-1] + [foreign.id], self.ids + self.ids[:1]):
+            response = self.client.post(self.url, {'field_order': field_order[::-1]}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(self.form_template.fields.values_list('id', flat=True)), self.ids)
+
+
+class FormAggregationTests(QueryBudgetMixin, TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='analyst', password='pass12345!')
+        cls.form_template = FormTemplate.objects.create(name='Staff', created_by=cls.user)
+        cls.team, cls.remote, cls.salary, cls.joined, cls.name = FormField.objects.bulk_create([
+            FormField(form_template=cls.form_template, label='Team', field_type='select',
+                      options=['Ops', 'Sales'], order=0),
+            FormField(form_template=cls.form_template, label='Remote', field_type='checkbox', order=1),
+            FormField(form_template=cls.form_template, label='Salary', field_type='number', order=2),
+            FormField(form_template=cls.form_template, label='Joined', field_type='date', order=3),
+            FormField(form_template=cls.form_template, label='Name', field_type='text', order=4),
+        ])
+        for team, remote, salary, joined in [
+            ('Ops', 'true', '100', '2024-01-05'),
+            ('Ops', 'false', '150', '2024-01-20'),
+            ('Sales', 'true', '200', '2024-03-01'),
+            ('', '', '', ''),
+        ]:
+            cls.add(team=team, remote=remote, salary=salary, joined=joined)
+    
+    @classmethod
+    def add(cls, **values):
+        schema = get_form_schema(cls.form_template.id)
+        return create_employee(schema, cls.clean(values), cls.user)
+    
+    @classmethod
+    def clean(cls, values, partial=False):
+        schema = get_form_schema(cls.form_template.id)
+        return clean_field_values(
+            schema, {str(getattr(cls, name).id): value for name, value in values.items()}, partial=partial
+        )
+    
+    def setUp(self):
+        cache.clear()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        self.url = reverse('api_form_aggregations', args=[self.form_template.pk])
+    
+    def aggregations(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {field['label']: field for field in response.json()['aggregations']}
+    
+    def test_aggregations_per_field_type(self):
+        response = self.assertWithinQueryBudget('get', self.url, {'bins': 2})
+        fields = {field['label']: field for field in response.json()['aggregations']}
+        self.assertNotIn('Name', fields)
+        self.assertEqual(fields['Team']['values'], [{'value': 'Ops', 'count': 2}, {'value': 'Sales', 'count': 1}])
+        self.assertEqual(fields['Remote']['values'], [{'value': True, 'count': 2}, {'value': False, 'count': 1}])
+        
+        salary = fields['Salary']
+        self.assertEqual((salary['count'], salary['min'], salary['max'], salary['avg']), (3, 100, 200, 150))
+        self.assertEqual(
+            salary['histogram'],
+            [{'from': 100, 'to': 150, 'count': 1}, {'from': 150, 'to': 200, 'count': 2}]
+        )
+        self.assertEqual(
+            fields['Joined']['buckets'],
+            [{'date': '2024-01-01', 'count': 2}, {'date': '2024-03-01', 'count': 1}]
+        )
+        self.assertEqual(self.aggregations(date_bucket='year')['Joined']['buckets'], [{'date': '2024-01-01', 'count': 3}])
+    
+    def test_cached_until_employees_change(self):
+        self.aggregations()
+        with self.assertNumQueries(0):
+            self.aggregations()
+        
+        employee = self.add(team='Sales')
+        self.assertEqual(self.aggregations()['Team']['values'][1], {'value': 'Sales', 'count': 2})
+        update_employee(employee, get_form_schema(self.form_template.id), self.clean({'team': 'Ops'}, partial=True))
+        self.assertEqual(self.aggregations()['Team']['values'], [{'value': 'Ops', 'count': 3}, {'value': 'Sales', 'count': 1}])
+        delete_employee(employee)
+        self.assertEqual(self.aggregations()['Team']['values'][0], {'value': 'Ops', 'count': 2})
+        
+        self.client.delete(reverse('api_employee_detail', args=[Employee.objects.order_by('pk').first().pk]))
+        self.assertEqual(self.aggregations()['Salary']['count'], 2)
+    
+    def test_invalid_parameters(self):
+        for params in ({'bins': 0}, {'bins': 'many'}, {'bins': 51}, {'date_bucket': 'hour'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['success'])
+        self.assertEqual(self.client.get(reverse('api_form_aggregations', args=[0])).status_code, 404)
@@ -1,5 +1,6 @@
 from django.urls import path
-from . import views, api_views
+from core.async_api import read_view
+from . import views, api_views, async_api_views
 
 urlpatterns = [
     # Web views
@@ -12,7 +13,10 @@ urlpatterns = [
 
 # API URL patterns
 api_urlpatterns = [
-    path('', api_views.FormTemplateListAPIView.as_view(), name='api_form_list'),
-    path('<int:pk>/', api_views.FormTemplateDetailAPIView.as_view(), name='api_form_detail'),
+    path('', read_view(api_views.FormTemplateListAPIView.as_view(), async_api_views.form_template_list),
+         name='api_form_list'),
+    path('<int:pk>/', read_view(api_views.FormTemplateDetailAPIView.as_view(), async_api_views.form_template_detail),
+         name='api_form_detail'),
+    path('<int:pk>/aggregations/', api_views.FormTemplateAggregationAPIView.as_view(), name='api_form_aggregations'),
     path('<int:pk>/reorder/', api_views.FormFieldReorderAPIView.as_view(), name='api_form_reorder'),
 ]
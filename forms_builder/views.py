@@ -3,10 +3,13 @@ from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.urls import reverse
 import json
 
-from .models import FormTemplate, FormField
+from .models import FormTemplate
+from .services import create_form_template, update_form_template
+from jobs.queue import enqueue
 
 
 class FormTemplateListView(LoginRequiredMixin, View):
@@ -31,25 +34,7 @@ class FormTemplateCreateView(LoginRequiredMixin, View):
             if not name:
                 return JsonResponse({'success': False, 'message': 'Form name is required'}, status=400)
             
-            with transaction.atomic():
-                # Create form template
-                form_template = FormTemplate.objects.create(
-                    name=name,
-                    description=description,
-                    created_by=request.user
-                )
-                
-                # Create fields
-                for i, field in enumerate(fields):
-                    FormField.objects.create(
-                        form_template=form_template,
-                        label=field.get('label', ''),
-                        field_type=field.get('field_type', 'text'),
-                        placeholder=field.get('placeholder', ''),
-                        options=field.get('options'),
-                        required=field.get('required', False),
-                        order=i
-                    )
+            form_template = create_form_template(request.user, name, description, fields)
             
             return JsonResponse({
                 'success': True,
@@ -95,6 +80,7 @@ class FormTemplateUpdateView(LoginRequiredMixin, View):
             'id': f.id,
             'label': f.label,
             'field_type': f.field_type,
+            'placeholder': f.placeholder,
             'required': f.required,
             'options': f.options
         } for f in form_template.fields.all()])
@@ -108,30 +94,20 @@ class FormTemplateUpdateView(LoginRequiredMixin, View):
             form_template = get_object_or_404(FormTemplate, pk=pk)
             data = json.loads(request.body)
             
-            with transaction.atomic():
-                form_template.name = data.get('name', form_template.name)
-                form_template.description = data.get('description', form_template.description)
-                form_template.save()
-                
-                # Update fields
-                fields = data.get('fields', [])
-                form_template.fields.all().delete()
-                
-                for i, field in enumerate(fields):
-                    FormField.objects.create(
-                        form_template=form_template,
-                        label=field.get('label', ''),
-                        field_type=field.get('field_type', 'text'),
-                        placeholder=field.get('placeholder', ''),
-                        options=field.get('options'),
-                        required=field.get('required', False),
-                        order=i
-                    )
+            # Update only the fields that changed, matched by id
+            update_form_template(
+                form_template,
+                data.get('name', form_template.name),
+                data.get('description', form_template.description),
+                data.get('fields', [])
+            )
             
             return JsonResponse({
                 'success': True,
                 'message': 'Form template updated successfully'
             })
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'message': e.messages[0]}, status=400)
         except Exception as e:
             return JsonResponse({'success': False, 'message': str(e)}, status=400)
 
@@ -141,7 +117,11 @@ class FormTemplateDeleteView(LoginRequiredMixin, View):
     def post(self, request, pk):
         try:
             form_template = get_object_or_404(FormTemplate, pk=pk)
-            form_template.delete()
-            return JsonResponse({'success': True, 'message': 'Form template deleted successfully'})
+            job = enqueue('forms.delete_template', created_by=request.user, unique=True, template_id=form_template.pk)
+            return JsonResponse({
+                'success': True,
+                'message': 'Form template is being deleted',
+                'job_url': reverse('api_job_detail', args=[job.pk])
+            })
         except Exception as e:
             return JsonResponse({'success': False, 'message': str(e)}, status=400)
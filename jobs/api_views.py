@@ -0,0 +1,58 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+
+from .models import Job
+from .serializers import JobSerializer
+from core.pagination import get_paginator
+
+
+def job_queryset(request):
+    """Users only see the jobs they queued."""
+    return Job.objects.filter(created_by=request.user)
+
+
+class JobListAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        jobs = job_queryset(request)
+        status_filter = request.query_params.get('status', '')
+        if status_filter:
+            jobs = jobs.filter(status=status_filter)
+        
+        paginator = get_paginator(request)
+        page = paginator.paginate_queryset(jobs.order_by('-created_at', '-id'), request)
+        return Response({
+            'success': True,
+            **paginator.get_page_info(),
+            'jobs': JobSerializer(page, many=True).data
+        })
+
+
+class JobDetailAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        job = get_object_or_404(job_queryset(request), pk=pk)
+        return Response({
+            'success': True,
+            'job': JobSerializer(job).data
+        })
+
+
+class JobDownloadAPIView(APIView):
+    """The file a finished job produced, e.g. a background export."""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        job = get_object_or_404(job_queryset(request), pk=pk, status=Job.SUCCEEDED)
+        name = (job.result or {}).get('file')
+        if not name or not default_storage.exists(name):
+            raise Http404
+        return FileResponse(
+            default_storage.open(name, 'rb'), as_attachment=True, filename=job.result.get('filename')
+        )
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+    
+    def ready(self):
+        # Tasks are registered by the ``tasks`` module of each app
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tasks')
+        from . import checks  # noqa: F401
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from django.db import DatabaseError
+from django.utils import timezone
+
+
+# Queued jobs due for longer than this suggest that no worker is running
+OVERDUE = timedelta(minutes=5)
+
+
+@register(Tags.database, deploy=True)
+def check_job_worker(app_configs, **kwargs):
+    # Template deletes and background exports only happen once a worker runs them
+    if getattr(settings, 'JOBS_EAGER', False):
+        return []
+    from .models import Job
+    
+    try:
+        overdue = Job.objects.filter(status=Job.QUEUED, run_after__lt=timezone.now() - OVERDUE).count()
+    except DatabaseError:
+        # Not migrated yet
+        return []
+    if overdue:
+        return [Warning(
+            f'{overdue} background jobs have been due for over {int(OVERDUE.total_seconds() // 60)} minutes.',
+            hint='Run a worker with `python manage.py run_jobs`, or set EMS_JOBS_EAGER=1 in development.',
+            id='jobs.W001',
+        )]
+    return []
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from jobs.queue import prune_jobs
+
+
+class Command(BaseCommand):
+    help = 'Delete finished background jobs, and the files they produced, after JOBS_RETENTION_DAYS'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Keep jobs that finished fewer days ago (default JOBS_RETENTION_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Jobs deleted per transaction')
+    
+    def handle(self, *args, **options):
+        jobs, files = prune_jobs(days=options['days'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {jobs} finished jobs and {files} files'))
@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import claim_jobs, requeue_stale, run_in_thread, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs on a pool of worker threads'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOBS_WORKERS', 2),
+                            help='Jobs run at the same time')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between looks at the queue while it is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of waiting for more')
+    
+    def handle(self, *args, **options):
+        # Several of these commands can share the queue, on one machine or more
+        worker = worker_name()
+        workers = max(options['workers'], 1)
+        self.stdout.write(f'Worker {worker} running jobs with {workers} threads')
+        
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jobs') as executor:
+            try:
+                while True:
+                    requeue_stale()
+                    for job in claim_jobs(worker, limit=workers - len(running)):
+                        self.stdout.write(f'Running job {job.pk} ({job.task})')
+                        running.add(executor.submit(run_in_thread, job))
+                    
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = future.result()
+                        self.stdout.write(f'Job {job.pk} ({job.task}): {job.status}')
+            except KeyboardInterrupt:
+                # Let the jobs that are running finish; the queued ones wait for the next worker
+                self.stdout.write(f'Stopping, waiting for {len(running)} running jobs')
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
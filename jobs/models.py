@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A queued call of a registered task (see jobs.queue), run by the ``run_jobs`` worker.
+    
+    Progress is ``progress`` out of ``total`` units, ``total`` being None
+    while unknown. ``message`` holds the latest progress note, or the error
+    of the last failed attempt.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(blank=True, null=True)
+    message = models.TextField(blank=True)
+    result = models.JSONField(blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Not picked up before this time; pushed back after a failed attempt
+    run_after = models.DateTimeField(default=timezone.now)
+    # Worker that runs the job, and when it last heard of it, to requeue jobs of workers that died
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'jobs_job'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # The worker polls for due queued jobs
+            models.Index(fields=['status', 'run_after'], name='job_due_idx'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='job_created_by_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Job #{self.id} {self.task} ({self.status})"
+    
+    @property
+    def finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+    
+    def set_progress(self, progress, total=None, message=None):
+        """
+        Save progress straight away, so that status requests see it while the task runs.
+        
+        Also tells that the worker is alive, so that long jobs that report
+        progress are not taken for stale.
+        """
+        self.progress = progress
+        fields = {'progress': progress, 'locked_at': timezone.now()}
+        if total is not None:
+            self.total = fields['total'] = total
+        if message is not None:
+            self.message = fields['message'] = message
+        Job.objects.filter(pk=self.pk).update(**fields)
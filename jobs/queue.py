@@ -0,0 +1,211 @@
+import logging
+import os
+import random
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from core.db import retry_on_lock
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Registered task functions by name, filled by the ``tasks`` modules of the apps
+TASKS = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(name, max_attempts=3):
+    """
+    Register a function as a task that can be queued with ``enqueue(name, **kwargs)``.
+    
+    The function is called with the Job as first argument, to report progress
+    with ``job.set_progress``, and the queued keyword arguments, which must be
+    JSON serializable. Its return value, also JSON serializable, becomes the
+    job's ``result``. A failed task is run again with backoff, so it must be
+    safe to run a second time after failing half way.
+    """
+    def register(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, created_by=None, unique=False, **kwargs):
+    """
+    Queue a task, to be run by the worker once the current transaction commits.
+    
+    With ``unique`` an unfinished job of the same task with the same arguments
+    is returned instead of queueing another one. With the ``JOBS_EAGER``
+    setting the job runs in this process right after the commit, without a
+    worker (for development).
+    """
+    if name not in TASKS:
+        raise UnknownTask(name)
+    if unique:
+        pending = Job.objects.filter(task=name, kwargs=kwargs, status__in=[Job.QUEUED, Job.RUNNING]).first()
+        if pending is not None:
+            return pending
+    
+    job = Job.objects.create(
+        task=name, kwargs=kwargs, created_by=created_by, max_attempts=TASKS[name].max_attempts
+    )
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: run_eagerly(job.pk))
+    return job
+
+
+def run_eagerly(job_id):
+    jobs = claim_jobs(worker_name('eager'), ids=[job_id])
+    if jobs:
+        run_job(jobs[0])
+
+
+def worker_name(suffix=''):
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    return f'{name}:{suffix}' if suffix else name
+
+
+def retry_delay(attempts):
+    """Seconds before attempt ``attempts + 1``: exponential, with jitter so that retries spread out."""
+    base = getattr(settings, 'JOBS_RETRY_DELAY', 10)
+    return base * 2 ** (attempts - 1) * random.uniform(0.5, 1.5)
+
+
+def claim_jobs(worker, limit=1, ids=None):
+    """
+    Take up to ``limit`` due queued jobs for ``worker`` and return them.
+    
+    SQLite has no SELECT ... FOR UPDATE SKIP LOCKED, so each candidate is
+    taken with an UPDATE that only matches while it is still queued; of
+    several workers racing for the same job exactly one gets it.
+    """
+    candidates = Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now())
+    if ids is not None:
+        candidates = candidates.filter(pk__in=ids)
+    candidate_ids = list(candidates.order_by('run_after', 'id').values_list('id', flat=True)[:limit])
+    claimed = [job_id for job_id in candidate_ids if take(job_id, worker)]
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_after', 'id'))
+
+
+@retry_on_lock
+def take(job_id, worker):
+    return Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+        status=Job.RUNNING, locked_by=worker, locked_at=timezone.now()
+    )
+
+
+@retry_on_lock
+def requeue_stale(timeout=None):
+    """
+    Queue again the running jobs whose worker has not been heard of for ``timeout`` seconds, presumably dead.
+    
+    This counts as a failed attempt: a job that kills or hangs its worker
+    is failed once it has used up its ``max_attempts``, rather than being
+    queued again forever. Returns the number of jobs requeued or failed.
+    """
+    timeout = timeout or getattr(settings, 'JOBS_STALE_TIMEOUT', 3600)
+    now = timezone.now()
+    # Evaluated against the row before the UPDATE, like every expression of it
+    used_up = Q(attempts__gte=F('max_attempts') - 1)
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=timeout)
+    ).update(
+        status=Case(When(used_up, then=Value(Job.FAILED)), default=Value(Job.QUEUED)),
+        finished_at=Case(When(used_up, then=Value(now)), default=F('finished_at')),
+        attempts=F('attempts') + 1,
+        message=Value(f'Worker stopped reporting progress for {timeout} seconds'),
+        locked_by='',
+        locked_at=None,
+    )
+
+
+def run_job(job):
+    """
+    Run a claimed job and record how it went.
+    
+    Failures are retried after ``retry_delay`` until ``max_attempts``
+    attempts have been made; then the job is failed with the error.
+    Returns the job as saved.
+    """
+    attempts = job.attempts + 1
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise UnknownTask(job.task)
+        result = func(job, **job.kwargs)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        if func is not None and attempts < job.max_attempts:
+            logger.warning('Job %s (%s) failed, attempt %d of %d: %s',
+                           job.pk, job.task, attempts, job.max_attempts, error)
+            fields = {
+                'status': Job.QUEUED,
+                'run_after': timezone.now() + timedelta(seconds=retry_delay(attempts)),
+            }
+        else:
+            logger.exception('Job %s (%s) failed', job.pk, job.task)
+            fields = {'status': Job.FAILED, 'finished_at': timezone.now()}
+        fields['message'] = error
+    else:
+        fields = {'status': Job.SUCCEEDED, 'result': result, 'finished_at': timezone.now()}
+    
+    fields.update(attempts=attempts, locked_by='', locked_at=None)
+    save_outcome(job.pk, fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return job
+
+
+@retry_on_lock
+def save_outcome(job_id, fields):
+    Job.objects.filter(pk=job_id).update(**fields)
+
+
+def prune_jobs(days=None, chunk_size=500):
+    """
+    Delete the jobs that finished more than ``days`` days ago, with the files they produced.
+    
+    ``days`` defaults to ``JOBS_RETENTION_DAYS``. Files named in a job's
+    result (exports) are deleted from storage before the job row, so a run
+    that fails half way leaves no file without its job. Returns
+    ``(jobs deleted, files deleted)``.
+    """
+    days = getattr(settings, 'JOBS_RETENTION_DAYS', 7) if days is None else days
+    finished = Job.objects.filter(
+        status__in=[Job.SUCCEEDED, Job.FAILED], finished_at__lt=timezone.now() - timedelta(days=days)
+    )
+    jobs_deleted = files_deleted = 0
+    while True:
+        jobs = list(finished.order_by('id').values_list('id', 'result')[:chunk_size])
+        if not jobs:
+            break
+        for job_id, result in jobs:
+            name = result.get('file') if isinstance(result, dict) else None
+            if name and default_storage.exists(name):
+                default_storage.delete(name)
+                files_deleted += 1
+        with transaction.atomic():
+            jobs_deleted += Job.objects.filter(id__in=[job_id for job_id, result in jobs]).delete()[0]
+    return jobs_deleted, files_deleted
+
+
+def run_in_thread(job):
+    """``run_job`` for the worker's thread pool."""
+    close_old_connections()
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    finished = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'task', 'status', 'finished', 'progress', 'total', 'message', 'result',
+            'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at'
+        ]
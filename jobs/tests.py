@@ -0,0 +1,223 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+from core.testing import QueryBudgetMixin
+from employees.models import Employee, EmployeeFieldValue
+from employees.services import clean_field_values, create_employee
+from forms_builder.models import FormTemplate, FormField
+from forms_builder.schema import get_form_schema
+
+from .checks import check_job_worker
+from .models import Job
+from .queue import TASKS, UnknownTask, claim_jobs, enqueue, requeue_stale, run_job, task
+
+
+def make_employees(user, count):
+    form_template = FormTemplate.objects.create(name='Staff', created_by=user)
+    field = FormField.objects.create(form_template=form_template, label='Name', field_type='text', order=0)
+    schema = get_form_schema(form_template.id)
+    for i in range(count):
+        create_employee(schema, clean_field_values(schema, {str(field.id): f'Employee {i}'}), user)
+    return form_template
+
+
+class JobQueueTests(TestCase):
+    
+    def setUp(self):
+        self.calls = []
+        
+        @task('tests.flaky', max_attempts=2)
+        def flaky(job, fail=False):
+            self.calls.append(job.pk)
+            job.set_progress(1, 2, 'half way')
+            if fail:
+                raise ValueError('boom')
+            return {'ok': True}
+        
+        self.addCleanup(TASKS.pop, 'tests.flaky')
+    
+    def test_claimed_job_runs_once(self):
+        job = enqueue('tests.flaky')
+        self.assertEqual([claimed.pk for claimed in claim_jobs('worker-1', limit=5)], [job.pk])
+        # Another worker racing for it gets nothing
+        self.assertEqual(claim_jobs('worker-2', limit=5), [])
+        
+        run_job(Job.objects.get(pk=job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), (Job.SUCCEEDED, {'ok': True}, 1))
+        self.assertEqual((job.progress, job.total, job.message), (1, 2, 'half way'))
+        self.assertEqual(self.calls, [job.pk])
+    
+    def test_unique_jobs_are_not_queued_twice(self):
+        job = enqueue('tests.flaky', unique=True, fail=False)
+        self.assertEqual(enqueue('tests.flaky', unique=True, fail=False).pk, job.pk)
+        self.assertNotEqual(enqueue('tests.flaky', unique=True, fail=True).pk, job.pk)
+        with self.assertRaises(UnknownTask):
+            enqueue('tests.missing')
+    
+    @override_settings(JOBS_RETRY_DELAY=60)
+    def test_failures_are_retried_with_backoff(self):
+        job = enqueue('tests.flaky', fail=True)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            run_job(claim_jobs('worker')[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.message), (Job.QUEUED, 1, 'ValueError: boom'))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+        # Not due yet
+        self.assertEqual(claim_jobs('worker'), [])
+        
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_job(claim_jobs('worker')[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+    
+    @override_settings(JOBS_EAGER=False)
+    def test_overdue_jobs_are_reported(self):
+        job = enqueue('tests.flaky')
+        self.assertEqual(check_job_worker(None), [])
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now() - timedelta(minutes=10))
+        self.assertEqual([warning.id for warning in check_job_worker(None)], ['jobs.W001'])
+        with self.settings(JOBS_EAGER=True):
+            self.assertEqual(check_job_worker(None), [])
+    
+    def test_jobs_of_dead_workers_are_requeued(self):
+        job = enqueue('tests.flaky')
+        claim_jobs('worker')
+        self.assertEqual(requeue_stale(timeout=60), 0)
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(requeue_stale(timeout=60), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+    
+    def test_jobs_that_keep_killing_their_worker_fail(self):
+        job = enqueue('tests.flaky')
+        for attempts, status in [(1, Job.QUEUED), (2, Job.FAILED)]:
+            claim_jobs('worker')
+            Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(minutes=5))
+            self.assertEqual(requeue_stale(timeout=60), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.locked_by), (status, attempts, ''))
+            self.assertIn('Worker stopped reporting progress', job.message)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(claim_jobs('worker'), [])
+
+
+@override_settings(QUERY_INSTRUMENTATION=True)
+class JobAPITests(QueryBudgetMixin, TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='owner', password='pass12345!')
+        cls.other = CustomUser.objects.create_user(username='other', password='pass12345!')
+    
+    def setUp(self):
+        cache.clear()
+        self.form_template = make_employees(self.user, 5)
+        self.login(self.user)
+    
+    def login(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    
+    def run_queued(self):
+        for job in claim_jobs('worker', limit=10):
+            run_job(job)
+    
+    def test_template_delete_runs_in_background(self):
+        response = self.client.delete(reverse('api_form_detail', args=[self.form_template.id]))
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job']['id']
+        self.assertTrue(FormTemplate.objects.filter(pk=self.form_template.id).exists())
+        
+        self.run_queued()
+        self.assertFalse(FormTemplate.objects.filter(pk=self.form_template.id).exists())
+        self.assertFalse(EmployeeFieldValue.objects.exists())
+        
+        response = self.assertWithinQueryBudget('get', reverse('api_job_detail', args=[job_id]))
+        job = response.json()['job']
+        self.assertEqual((job['status'], job['finished'], job['progress'], job['total']), ('succeeded', True, 5, 5))
+        self.assertEqual(job['result'], {'employees_deleted': 5})
+        
+        self.login(self.other)
+        self.assertEqual(self.client.get(reverse('api_job_detail', args=[job_id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_job_list')).json()['count'], 0)
+    
+    def test_background_export_download(self):
+        url = reverse('api_employee_export') + f'?form_template={self.form_template.id}&file_format=jsonl&background=1'
+        job_id = self.client.get(url).json()['job']['id']
+        download = reverse('api_job_download', args=[job_id])
+        self.assertEqual(self.client.get(download).status_code, 404)
+        
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with self.settings(MEDIA_ROOT=media_root):
+            self.run_queued()
+            response = self.client.get(download)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('filename="employees-', response['Content-Disposition'])
+            self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 5)
+
+
+class PruneJobsTests(TestCase):
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def finished_job(self, days_ago, status=Job.SUCCEEDED, file=None):
+        job = Job.objects.create(task='employees.export', status=status)
+        Job.objects.filter(pk=job.pk).update(
+            finished_at=timezone.now() - timedelta(days=days_ago),
+            result={'file': default_storage.save(file, ContentFile(b'id\n'))} if file else None
+        )
+        return Job.objects.get(pk=job.pk)
+    
+    def test_old_finished_jobs_and_their_files_are_deleted(self):
+        old_export = self.finished_job(10, file='exports/old/employees-1.csv')
+        old_failure = self.finished_job(10, status=Job.FAILED)
+        recent_export = self.finished_job(1, file='exports/recent/employees-1.csv')
+        running = Job.objects.create(task='employees.export', status=Job.RUNNING)
+        
+        output = StringIO()
+        with override_settings(JOBS_RETENTION_DAYS=7):
+            call_command('prune_jobs', chunk_size=1, stdout=output)
+        self.assertIn('Deleted 2 finished jobs and 1 files', output.getvalue())
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent_export.pk, running.pk})
+        self.assertFalse(default_storage.exists(old_export.result['file']))
+        self.assertTrue(default_storage.exists(recent_export.result['file']))
+        self.assertFalse(Job.objects.filter(pk=old_failure.pk).exists())
+
+
+class RunJobsCommandTests(TransactionTestCase):
+    """The worker command, with its thread pool, against committed data."""
+    
+    def test_worker_drains_the_queue(self):
+        user = CustomUser.objects.create_user(username='owner', password='pass12345!')
+        form_template = make_employees(user, 3)
+        jobs = [
+            enqueue('forms.delete_template', created_by=user, template_id=form_template.id),
+            enqueue('employees.purge_deleted_fields', created_by=user),
+        ]
+        
+        output = StringIO()
+        call_command('run_jobs', once=True, workers=2, stdout=output)
+        self.assertEqual(
+            [Job.objects.get(pk=job.pk).status for job in jobs], [Job.SUCCEEDED, Job.SUCCEEDED], output.getvalue()
+        )
+        self.assertFalse(Employee.objects.exists())
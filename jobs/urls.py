@@ -0,0 +1,9 @@
+from django.urls import path
+from . import api_views
+
+# API URL patterns
+api_urlpatterns = [
+    path('', api_views.JobListAPIView.as_view(), name='api_job_list'),
+    path('<int:pk>/', api_views.JobDetailAPIView.as_view(), name='api_job_detail'),
+    path('<int:pk>/download/', api_views.JobDownloadAPIView.as_view(), name='api_job_download'),
+]